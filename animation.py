@@ -0,0 +1,197 @@
+# animation.py
+import bisect
+import io
+import struct
+import threading
+from collections import OrderedDict
+
+import pygame
+
+MAX_FRAME_BYTES = 96 * 2 ** 20   # atlas + juegos escalados de una animación
+MIN_DELAY_MS = 20                # GIFs con demora 0 / 1 cs: como los navegadores
+
+
+# ================================
+# GIF → FRAMES
+# ================================
+# SDL_image sólo devuelve el primer frame de un GIF. Los bloques del archivo
+# se recorren en Python (sin descomprimir nada) y cada frame se arma como un
+# GIF de un solo frame (cabecera + paleta global + su extensión de control +
+# su imagen), que SDL_image decodifica en C.
+def _skip_blocks(data, pos):
+    while data[pos]:
+        pos += data[pos] + 1
+    return pos + 1
+
+
+def split_gif(data):
+    # [(gif de un frame, (x, y, w, h), disposición, demora ms)]
+    if data[:6] not in (b"GIF87a", b"GIF89a"):
+        raise ValueError("no es un GIF")
+    flags = data[10]
+    header_end = 13 + (3 * (2 << (flags & 7)) if flags & 0x80 else 0)
+    header = data[:header_end]
+
+    frames = []
+    pos, control = header_end, b""
+    while pos < len(data) and data[pos] != 0x3B:
+        if data[pos] == 0x21:                       # extensión
+            end = _skip_blocks(data, pos + 2)
+            if data[pos + 1] == 0xF9:               # control de gráfico
+                control = data[pos:end]
+            pos = end
+        elif data[pos] == 0x2C:                     # imagen
+            x, y, w, h, local = struct.unpack("<HHHHB", data[pos + 1:pos + 10])
+            start = pos + 10 + (3 * (2 << (local & 7)) if local & 0x80 else 0)
+            end = _skip_blocks(data, start + 1)
+            disposal, delay = 0, 0
+            if control:
+                disposal = (control[3] >> 2) & 7
+                delay = struct.unpack("<H", control[4:6])[0] * 10
+            frames.append((header + control + data[pos:end] + b";", (x, y, w, h),
+                           disposal, max(delay, MIN_DELAY_MS)))
+            pos, control = end, b""
+        else:
+            raise ValueError(f"bloque GIF desconocido en {pos}")
+    return frames
+
+
+def decode_gif(path):
+    # compone los frames según su disposición y los recorta a la caja que
+    # ocupa la animación entera; devuelve (atlas, rects, demoras)
+    with open(path, "rb") as f:
+        data = f.read()
+    width, height = struct.unpack("<HH", data[6:10])
+    canvas = pygame.Surface((width, height), pygame.SRCALPHA)
+    frames, delays = [], []
+    for gif, rect, disposal, delay in split_gif(data):
+        img = pygame.image.load(io.BytesIO(gif), "frame.gif")
+        before = canvas.copy() if disposal == 3 else None
+        canvas.blit(img, (0, 0) if img.get_size() == (width, height) else rect[:2])
+        frames.append(canvas.copy())
+        delays.append(delay)
+        if disposal == 2:
+            canvas.fill((0, 0, 0, 0), rect)
+        elif disposal == 3:
+            canvas = before
+
+    box = frames[0].get_bounding_rect().unionall([f.get_bounding_rect() for f in frames[1:]])
+    cols = max(1, int(len(frames) ** 0.5))
+    rows = -(-len(frames) // cols)
+    atlas = pygame.Surface((cols * box.w, rows * box.h), pygame.SRCALPHA)
+    rects = []
+    for i, frame in enumerate(frames):
+        cell = pygame.Rect((i % cols) * box.w, (i // cols) * box.h, box.w, box.h)
+        atlas.blit(frame, cell, box)
+        rects.append(cell)
+    return atlas, rects, delays
+
+
+# ================================
+# ANIMATED SPRITE
+# ================================
+# Los frames se decodifican una sola vez, en un hilo, a un atlas (una sola
+# superficie con todos los frames en grilla). Para cada tamaño en pantalla
+# se guarda un juego de frames ya escalados; cada frame se escala la primera
+# vez que se muestra, así que después de una vuelta reproducir es un blit.
+#
+# Atlas + juegos escalados no pasan de max_bytes: se descarta el juego menos
+# usado, y si un juego entero no entraría se guarda uno de cada `stride`
+# frames (la rotación se ve a saltos pero la memoria queda acotada).
+class Animation:
+    def __init__(self, path, max_bytes=MAX_FRAME_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.atlas = None
+        self.rects = []
+        self.error = None
+        self._ends = []           # fin de cada frame (ms desde el inicio)
+        self._sets = OrderedDict()    # tamaño → (stride, [superficie o None])
+        self._bytes = 0
+        self._done = threading.Event()
+        self._thread = None
+
+    # ---- carga ----
+    def load_async(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._decode, name="animation-decode", daemon=True)
+            self._thread.start()
+        return self
+
+    def _decode(self):
+        try:
+            self.atlas, self.rects, delays = decode_gif(self.path)
+            ends, t = [], 0
+            for d in delays:
+                t += d
+                ends.append(t)
+            self._ends = ends
+        except (pygame.error, OSError, ValueError) as e:
+            self.error = e
+        self._done.set()
+
+    @property
+    def ready(self):
+        return self._done.is_set() and self.error is None
+
+    def wait(self):
+        self.load_async()
+        self._done.wait()
+        return self.ready
+
+    @property
+    def duration(self):
+        return self._ends[-1] if self._ends else 0
+
+    @property
+    def memory(self):
+        return self._atlas_bytes() + self._bytes
+
+    def _atlas_bytes(self):
+        return self.atlas.get_width() * self.atlas.get_height() * 4 if self.atlas is not None else 0
+
+    # ---- reproducción ----
+    def index_at(self, t_ms):
+        return bisect.bisect_right(self._ends, t_ms % self.duration)
+
+    def frame(self, size, t_ms):
+        # superficie del frame en t_ms escalada a size x size (None si
+        # todavía se está decodificando)
+        if not self.ready:
+            return None
+        size = max(1, int(size))
+        stride, frames = self._frame_set(size)
+        i = self.index_at(t_ms) // stride
+        surf = frames[i]
+        if surf is None:
+            surf = pygame.transform.scale(self.atlas.subsurface(self.rects[i * stride]), (size, size))
+            if pygame.display.get_surface() is not None:
+                surf = surf.convert_alpha()
+            frames[i] = surf
+            self._bytes += size * size * 4
+            self._evict(keep=size)
+        return surf
+
+    def _frame_set(self, size):
+        entry = self._sets.get(size)
+        if entry is None:
+            fits = max(1, (self.max_bytes - self._atlas_bytes()) // (size * size * 4))
+            count = len(self.rects)
+            stride = -(-count // min(count, fits))
+            entry = self._sets[size] = (stride, [None] * -(-count // stride))
+        else:
+            self._sets.move_to_end(size)
+        return entry
+
+    def _evict(self, keep):
+        while self.memory > self.max_bytes and len(self._sets) > 1:
+            size = next(iter(self._sets))
+            if size == keep:
+                self._sets.move_to_end(size)
+                continue
+            _, frames = self._sets.pop(size)
+            self._bytes -= sum(1 for f in frames if f is not None) * size * size * 4
+
+    def clear(self):
+        self._sets.clear()
+        self._bytes = 0
@@ -0,0 +1,146 @@
+# assets.py
+import threading
+from collections import OrderedDict
+
+import pygame
+from animation import Animation
+
+# ================================
+# ASSET MANAGER
+# ================================
+# Cada imagen se lee y decodifica una sola vez, la primera vez que se pide.
+# Las variantes escaladas se guardan por tamaño destino con desalojo LRU,
+# así un frame sin cambios de slider no escala nada.
+#
+# También es el registro de fuentes del proceso: SysFont recorre las fuentes
+# del sistema y abre el archivo en cada llamada, así que cada (familia,
+# tamaño, bold, italic) se resuelve una sola vez y todos comparten el mismo
+# Font (y por lo tanto las mismas entradas de text_cache).
+#
+# preload(paths) decodifica imágenes en un hilo (SDL_image suelta el GIL):
+# el menú presenta su primer frame sin esperar al JPEG de fondo, y image()
+# sólo espera si alguien pide la imagen antes de que termine.
+#
+# animation(path) hace lo mismo con GIFs animados (ver animation.py): se
+# decodifican una vez, en segundo plano, y todas las escenas comparten los
+# frames ya escalados.
+MAX_SCALED_SURFACES = 48
+
+
+class AssetManager:
+    def __init__(self, max_scaled=MAX_SCALED_SURFACES):
+        self.max_scaled = max_scaled
+        self._images = {}
+        self._scaled = OrderedDict()
+        self._fonts = {}
+        self._animations = {}
+        self._decoded = {}     # path → superficie (o error) leída por preload()
+        self._loading = {}     # path → threading.Event
+
+    def image(self, path, fallback_radius=None):
+        img = self._images.get(path)
+        if img is None:
+            try:
+                img = self._load(path)
+                if pygame.display.get_surface() is not None:
+                    # las opacas (JPEG) con convert(): más rápido y blit sin alpha
+                    img = img.convert_alpha() if img.get_flags() & pygame.SRCALPHA else img.convert()
+            except (pygame.error, FileNotFoundError):
+                if fallback_radius is None:
+                    raise
+                r = fallback_radius
+                img = pygame.Surface((r * 2, r * 2), pygame.SRCALPHA)
+                pygame.draw.circle(img, (100, 150, 255), (r, r), r)
+            self._images[path] = img
+        return img
+
+    def _load(self, path):
+        pending = self._loading.pop(path, None)
+        if pending is None:
+            return pygame.image.load(path)
+        pending.wait()
+        img = self._decoded.pop(path)
+        if isinstance(img, Exception):
+            raise img
+        return img
+
+    def preload(self, paths):
+        paths = [p for p in paths if p not in self._images and p not in self._loading]
+        if not paths:
+            return
+        jobs = [(path, threading.Event()) for path in paths]
+        self._loading.update(jobs)
+        threading.Thread(target=self._decode, args=(jobs,), name="asset-preload", daemon=True).start()
+
+    def _decode(self, jobs):
+        for path, done in jobs:
+            try:
+                self._decoded[path] = pygame.image.load(path)
+            except (pygame.error, FileNotFoundError) as e:
+                self._decoded[path] = e
+            done.set()
+
+    def ready(self, path):
+        # True si image(path) no va a tener que esperar al hilo de preload
+        pending = self._loading.get(path)
+        return pending is None or pending.is_set()
+
+    def scaled(self, path, size, smooth=False, fallback_radius=None):
+        size = (max(1, int(size[0])), max(1, int(size[1])))
+        key = (path, size, smooth)
+        surf = self._scaled.get(key)
+        if surf is None:
+            src = self.image(path, fallback_radius)
+            scale = pygame.transform.smoothscale if smooth else pygame.transform.scale
+            surf = scale(src, size)
+            self._remember(key, surf)
+        else:
+            self._scaled.move_to_end(key)
+        return surf
+
+    def fit(self, path, max_w, max_h, smooth=True):
+        # mantiene proporción dentro de max_w x max_h
+        w, h = self.image(path).get_size()
+        scale = min(max_w / w, max_h / h)
+        return self.scaled(path, (w * scale, h * scale), smooth)
+
+    def surface(self, key, build):
+        # superficies generadas (glows, sprites procedurales) con la misma LRU
+        key = ("generated", key)
+        surf = self._scaled.get(key)
+        if surf is None:
+            surf = build()
+            self._remember(key, surf)
+        else:
+            self._scaled.move_to_end(key)
+        return surf
+
+    def font(self, family, size, bold=False, italic=False):
+        key = (family.lower(), int(size), bool(bold), bool(italic))
+        font = self._fonts.get(key)
+        if font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            font = self._fonts[key] = pygame.font.SysFont(family, size, bold, italic)
+        return font
+
+    def animation(self, path):
+        anim = self._animations.get(path)
+        if anim is None:
+            anim = self._animations[path] = Animation(path).load_async()
+        return anim
+
+    def _remember(self, key, surf):
+        self._scaled[key] = surf
+        if len(self._scaled) > self.max_scaled:
+            self._scaled.popitem(last=False)
+
+    def clear(self):
+        self._images.clear()
+        self._scaled.clear()
+        self._fonts.clear()
+        for anim in self._animations.values():
+            anim.clear()
+
+
+ASSETS = AssetManager()
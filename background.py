@@ -0,0 +1,47 @@
+# background.py
+import pygame
+import numpy as np
+
+# ================================
+# CACHED RADIAL GRADIENT
+# ================================
+# La clave es (tamaño, color interior, color exterior): si la ventana cambia
+# de tamaño, la siguiente llamada construye un gradiente nuevo.
+MAX_CACHED_GRADIENTS = 8
+
+_gradients = {}
+
+
+def build_radial_gradient(size, inner_color, outer_color):
+    w, h = size
+    radius = max(w, h)
+
+    # distancia de cada píxel al centro (misma geometría que los círculos de antes)
+    xs = np.arange(w, dtype=np.float32) - w // 2
+    ys = np.arange(h, dtype=np.float32) - h // 2
+    dist = np.sqrt(xs[:, None] ** 2 + ys[None, :] ** 2)
+    t = np.clip(dist / radius, 0.0, 1.0)[:, :, None]
+
+    inner = np.asarray(inner_color[:3], dtype=np.float32)
+    outer = np.asarray(outer_color[:3], dtype=np.float32)
+    rgb = (inner * t + outer * (1 - t)).astype(np.uint8)
+
+    surf = pygame.surfarray.make_surface(rgb)
+    if pygame.display.get_surface() is not None:
+        surf = surf.convert()
+    return surf
+
+
+def radial_gradient(size, inner_color, outer_color):
+    key = (tuple(size), tuple(inner_color), tuple(outer_color))
+    surf = _gradients.get(key)
+    if surf is None:
+        if len(_gradients) >= MAX_CACHED_GRADIENTS:
+            _gradients.clear()
+        surf = build_radial_gradient(size, inner_color, outer_color)
+        _gradients[key] = surf
+    return surf
+
+
+def draw_background(surface, inner_color, outer_color):
+    surface.blit(radial_gradient(surface.get_size(), inner_color, outer_color), (0, 0))
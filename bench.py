@@ -0,0 +1,199 @@
+# bench.py
+# Benchmark headless de los simuladores: corre N frames con el driver
+# "dummy" de SDL, sin límite de fps, moviendo los sliders con un guion fijo.
+#
+#   python bench.py --frames 600 --sizes 1000x700,1920x1080,3840x2160
+#
+# Con --checkpoint cada escena arranca desde un estado guardado (F5 en la
+# escena o --save-checkpoint de una corrida anterior), p.ej. con estelas ya
+# largas en vez de vacías:
+#
+#   python bench.py --scenes perihelio-swarm --frames 3000 --save-checkpoint swarm.ckpt
+#   python bench.py --checkpoint swarm.ckpt --sizes 1920x1080
+#
+# La calidad (quality.py) queda fija en el nivel 0 para que las corridas se
+# puedan comparar; --quality N fija otro nivel y --quality auto deja actuar
+# al gobernador (el resultado dice cuántos frames pasó en cada nivel):
+#
+#   python bench.py --scenes perihelio-swarm --sizes 3840x2160 --quality auto
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+import pygame
+import checkpoint
+from profiler import CSV_ENV, close_csv
+
+FRAME_DT = 1000 / 60   # ms simulados por frame, independiente del tiempo real
+DEFAULT_SIZES = "1000x700,1920x1080,3840x2160"
+
+
+# ================================
+# GUIONES DE SLIDERS
+# ================================
+# Cada slider recorre su rango ida y vuelta (onda triangular) con su propio
+# periodo en frames, así el benchmark ejercita valores cambiantes. Los valores
+# se mantienen SCRIPT_HOLD frames, como cuando un usuario suelta el slider.
+SCRIPT_HOLD = 30
+
+
+def perihelio_scene(screen):
+    from perihelio import PerihelioSim
+    sim = PerihelioSim(screen)
+    script = [(sim.slider_warp, 240), (sim.slider_precision, 400), (sim.slider_mass, 700)]
+    return sim, script
+
+
+def perihelio_swarm_scene(screen):
+    from perihelio import PerihelioSim
+    sim = PerihelioSim(screen, mode="swarm")
+    script = [(sim.slider_warp, 240), (sim.slider_precision, 400), (sim.slider_mass, 700)]
+    return sim, script
+
+
+def gps_scene(screen):
+    from gps import GPSSim
+    sim = GPSSim(screen)
+    script = [(sim.slider_radius, 300), (sim.slider_mass, 200), (sim.slider_distance, 500)]
+    return sim, script
+
+
+def gps_constellation_scene(screen):
+    from gps import GPSSim
+    sim = GPSSim(screen, satellites=10000)
+    script = [(sim.slider_radius, 300), (sim.slider_mass, 200), (sim.slider_distance, 500)]
+    return sim, script
+
+
+SCENES = {
+    "perihelio": perihelio_scene,
+    "perihelio-swarm": perihelio_swarm_scene,
+    "gps": gps_scene,
+    "gps-constellation": gps_constellation_scene,
+}
+
+
+def apply_script(script, frame):
+    frame -= frame % SCRIPT_HOLD
+    for slider, period in script:
+        phase = (frame % period) / period
+        t = 1 - abs(2 * phase - 1)
+        slider.value = slider.min + t * (slider.max - slider.min)
+
+
+def parse_size(text):
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+
+# ================================
+# MEDICIÓN
+# ================================
+def summarize(times_ms):
+    t = np.asarray(times_ms)
+    return {
+        "frames": len(t),
+        "mean_ms": round(float(t.mean()), 4),
+        "p50_ms": round(float(np.percentile(t, 50)), 4),
+        "p95_ms": round(float(np.percentile(t, 95)), 4),
+        "p99_ms": round(float(np.percentile(t, 99)), 4),
+        "max_ms": round(float(t.max()), 4),
+        "fps": round(1000 / float(t.mean()), 2),
+    }
+
+
+def bench_scene(name, size, frames, warmup, start=None, save=None, quality="0"):
+    screen = pygame.display.set_mode(size)
+    sim, script = SCENES[name](screen)
+    if start:
+        sim.load_checkpoint(start)
+    if quality == "auto":
+        sim.quality.set_level(0, enabled=True)
+    else:
+        sim.quality.set_level(int(quality), enabled=False)
+    sim.profiler.reset(window=frames)
+
+    for i in range(warmup):
+        apply_script(script, i)
+        sim.frame([], FRAME_DT)
+        sim.present()
+
+    times = []
+    levels = {}
+    for i in range(frames):
+        t0 = time.perf_counter()
+        apply_script(script, warmup + i)
+        sim.frame(pygame.event.get(), FRAME_DT)
+        sim.present()
+        sim.profiler.mark("flip")
+        sim.quality.record(sim.profiler.end_frame())
+        times.append((time.perf_counter() - t0) * 1000)
+        levels[sim.quality.name] = levels.get(sim.quality.name, 0) + 1
+
+    result = {"scene": name, "size": f"{size[0]}x{size[1]}"}
+    if start:
+        result["checkpoint"] = start
+    if save:
+        result["saved_checkpoint"] = sim.save_checkpoint(save.format(scene=name, size=result["size"]))
+    result.update(summarize(times))
+    result["quality"] = dict(sim.quality.report(), frames_per_level=levels)
+    result["stages_ms"] = {k: round(v, 4) for k, v in sim.profiler.averages().items()}
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark headless de los simuladores")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--warmup", type=int, default=30)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help="lista separada por comas, p.ej. 1000x700,1920x1080")
+    parser.add_argument("--scenes",
+                        help="escenas separadas por comas: " + ", ".join(SCENES)
+                        + " (por defecto todas, o la del --checkpoint)")
+    parser.add_argument("--checkpoint", help="arrancar cada escena desde este checkpoint")
+    parser.add_argument("--save-checkpoint",
+                        help="guardar el estado final; admite {scene} y {size}, p.ej. out/{scene}.ckpt")
+    parser.add_argument("--output", help="archivo JSON de salida (por defecto stdout)")
+    parser.add_argument("--profile-csv", help="guardar los tiempos por etapa de cada frame en CSV")
+    parser.add_argument("--quality", default="0",
+                        help="nivel de calidad fijo (0 = alta) o 'auto' para el gobernador adaptativo")
+    args = parser.parse_args(argv)
+    if args.profile_csv:
+        os.environ[CSV_ENV] = args.profile_csv
+
+    scenes = args.scenes
+    if scenes is None:
+        scenes = checkpoint.load(args.checkpoint).scene if args.checkpoint else ",".join(SCENES)
+
+    pygame.init()
+    results = []
+    for size in map(parse_size, args.sizes.split(",")):
+        for name in scenes.split(","):
+            results.append(bench_scene(name.strip(), size, args.frames, args.warmup,
+                                       args.checkpoint, args.save_checkpoint, args.quality))
+
+    report = {
+        "pygame": pygame.version.ver,
+        "video_driver": os.environ["SDL_VIDEODRIVER"],
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    close_csv()
+    pygame.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
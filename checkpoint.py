@@ -0,0 +1,128 @@
+# checkpoint.py
+# Guarda y restaura el estado completo de una escena (física, estelas,
+# sliders, vista) en un archivo binario:
+#
+#   MAGIC | largo de la cabecera (uint32) | cabecera JSON | arrays crudos
+#
+# La cabecera tiene los escalares y el índice de arrays (dtype, forma,
+# offset); cada array empieza alineado a ALIGN bytes. Al cargar, el archivo
+# se mapea con np.memmap y los arrays son vistas sobre el mapa: no se lee
+# nada hasta usarlo, así reanudar una escena con millones de puntos de
+# estela cuesta lo que copiar esos puntos a su lugar (milisegundos).
+#
+#   python checkpoint.py checkpoints/perihelio.ckpt     # muestra el contenido
+import json
+import os
+import struct
+import sys
+from contextlib import contextmanager
+
+import numpy as np
+
+MAGIC = b"RELCKPT1"
+ALIGN = 64
+CHECKPOINT_DIR = "checkpoints"    # F5 / F9 en las escenas
+
+
+class Checkpoint:
+    def __init__(self, scene, state, arrays):
+        self.scene = scene      # "perihelio" / "gps"
+        self.state = state      # dict JSON
+        self.arrays = arrays    # nombre → ndarray (memmap de sólo lectura al cargar)
+
+
+def default_path(scene):
+    return os.path.join(CHECKPOINT_DIR, f"{scene}.ckpt")
+
+
+def _align(n):
+    return -(-n // ALIGN) * ALIGN
+
+
+# ================================
+# ESCRITURA / LECTURA
+# ================================
+def save(path, scene, state, arrays):
+    arrays = {name: np.ascontiguousarray(a) for name, a in arrays.items()}
+    index = {}
+    offset = 0
+    for name, a in arrays.items():
+        index[name] = {"dtype": a.dtype.str, "shape": list(a.shape), "offset": offset}
+        offset = _align(offset + a.nbytes)
+    header = json.dumps({"scene": scene, "state": state, "arrays": index}).encode()
+    start = _align(len(MAGIC) + 4 + len(header))
+
+    # se escribe al lado y se reemplaza: quien tenga mapeado el archivo
+    # viejo sigue viendo el viejo (otro inodo)
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(header)) + header)
+        for name, a in arrays.items():
+            f.seek(start + index[name]["offset"])
+            a.tofile(f)
+        f.truncate(start + offset)
+    os.replace(tmp, path)
+    return path
+
+
+def load(path):
+    with open(path, "rb") as f:
+        head = f.read(len(MAGIC) + 4)
+        if head[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path}: no es un checkpoint ({MAGIC.decode()})")
+        (size,) = struct.unpack("<I", head[len(MAGIC):])
+        header = json.loads(f.read(size))
+    start = _align(len(MAGIC) + 4 + size)
+
+    arrays = {}
+    index = header["arrays"]
+    if index:
+        data = np.memmap(path, dtype=np.uint8, mode="r")
+        for name, info in index.items():
+            dtype = np.dtype(info["dtype"])
+            shape = tuple(info["shape"])
+            first = start + info["offset"]
+            count = int(np.prod(shape)) * dtype.itemsize
+            arrays[name] = data[first:first + count].view(dtype).reshape(shape)
+    return Checkpoint(header["scene"], header["state"], arrays)
+
+
+def load_scene(path, scene):
+    ckpt = load(path)
+    if ckpt.scene != scene:
+        raise ValueError(f"{path}: checkpoint de la escena {ckpt.scene!r}, no de {scene!r}")
+    return ckpt
+
+
+@contextmanager
+def paused(sim):
+    # el hilo de física no puede avanzar mientras se copia o se pisa su
+    # estado: se detiene (aplicando los comandos pendientes) y se relanza
+    running = sim.worker is not None
+    sim.stop_worker()
+    try:
+        yield
+    finally:
+        if running:
+            sim.start_worker()
+
+
+def main(argv=None):
+    paths = sys.argv[1:] if argv is None else argv
+    if not paths:
+        print("uso: python checkpoint.py ARCHIVO.ckpt ...", file=sys.stderr)
+        return 2
+    for path in paths:
+        ckpt = load(path)
+        print(f"{path}: escena {ckpt.scene}, {os.path.getsize(path) / 1e6:,.1f} MB")
+        print("  " + json.dumps(ckpt.state, ensure_ascii=False))
+        for name, a in ckpt.arrays.items():
+            print(f"  {name:>16}: {a.dtype} {a.shape}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+# constellation.py
+import math
+from itertools import repeat
+
+import numpy as np
+import pygame
+
+from drift import relativistic_drift, solve_kepler
+
+# ================================
+# CONSTELACIÓN DE SATÉLITES (ARRAYS)
+# ================================
+# Todos los satélites viven en arrays: radio orbital relativo a la altura
+# elegida en el slider, plano orbital (inclinación + nodo), fase y velocidad
+# angular. Un solo paso vectorizado los avanza a todos, y un solo
+# Surface.blits los dibuja con el mismo sprite ya escalado.
+#
+# Con excentricidad la fase es la anomalía media: al proyectar se resuelve
+# la ecuación de Kepler para todos juntos (perigeo sobre el nodo).
+GPS_INCLINATION = math.radians(55)
+BASE_RATE = 0.01          # rad/frame del satélite que está en el radio del slider
+SHELL_SPREAD = 0.15       # las capas se reparten en ±15 % del radio elegido
+
+# tamaños que recorre la tecla C (1 = modo clásico de un satélite)
+SIZES = (1, 24, 240, 2400, 10000)
+
+
+class Constellation:
+    def __init__(self, n, planes=None, shells=None, seed=0):
+        self.n = n
+        if n == 1:
+            planes, shells = 1, 1
+        planes = planes or min(6 if n <= 24 else 12, n)
+        shells = shells or min(max(1, n // 60), 8)
+        rng = np.random.default_rng(seed)
+
+        idx = np.arange(n)
+        plane = idx % planes
+        shell = (idx // planes) % shells
+
+        # plano orbital: nodo repartido en 360°, inclinación tipo GPS
+        raan = 2 * np.pi * plane / planes
+        inc = np.full(n, GPS_INCLINATION if n > 1 else 0.0)
+        if n > 24:
+            inc += rng.normal(0, math.radians(3), n)
+        self.px, self.py = np.cos(raan), np.sin(raan)
+        self.qx, self.qy = -np.sin(raan) * np.cos(inc), np.cos(raan) * np.cos(inc)
+        self.qz = np.sin(inc)
+
+        # capas de altura alrededor del radio del slider
+        if shells > 1:
+            self.radius_factor = 1 + SHELL_SPREAD * (2 * shell / (shells - 1) - 1)
+        else:
+            self.radius_factor = np.ones(n)
+        self.rate = BASE_RATE * self.radius_factor ** -1.5    # Kepler: w ~ r^-1.5
+
+        # fase: repartidos a lo largo de cada plano, con los planos desfasados
+        # entre sí (las más pobladas además con una fase al azar)
+        per_plane = np.bincount(plane, minlength=planes)[plane]
+        slot = idx // planes
+        self.phase = 2 * np.pi * (slot + plane / planes) / per_plane
+        if n > 24:
+            self.phase += rng.uniform(0, 2 * np.pi, n)
+
+        self.eccentricity = 0.0
+        self.drift_total = np.zeros(n)
+        self.drift_grav = np.zeros(n)
+        self.drift_vel = np.zeros(n)
+
+    # ---- física ----
+    def step(self, frames=1):
+        # forma cerrada: cualquier cantidad de frames cuesta lo mismo
+        self.phase += self.rate * frames
+        np.remainder(self.phase, 2 * np.pi, out=self.phase)
+
+    def update_drift(self, mass_earths, orbit_r_km, planet_r_km):
+        self.drift_total, self.drift_grav, self.drift_vel = relativistic_drift(
+            mass_earths, orbit_r_km * self.radius_factor, planet_r_km)
+
+    # ---- proyección ----
+    def _in_plane(self, lead=0.0, index=slice(None)):
+        # posición en el plano orbital desde el foco, en unidades del semieje;
+        # `lead` son frames de adelanto para interpolar entre pasos del reloj
+        phase = self.phase[index]
+        if lead:
+            phase = phase + self.rate[index] * lead
+        e = self.eccentricity
+        if e:
+            E = solve_kepler(phase, e)
+            return np.cos(E) - e, math.sqrt(1 - e * e) * np.sin(E), E
+        return np.cos(phase), np.sin(phase), phase
+
+    def positions_3d(self, a_km, index=slice(None)):
+        # (k, 3) en km con z hacia la pantalla, y la anomalía excéntrica
+        c, s, E = self._in_plane(index=index)
+        r = a_km * self.radius_factor[index]
+        pos = np.column_stack((r * (c * self.px[index] + s * self.qx[index]),
+                               r * (c * self.py[index] + s * self.qy[index]),
+                               r * s * self.qz[index]))
+        return pos, E
+
+    def positions(self, center, r_px, planet_r_px=0, lead=0.0):
+        # coordenadas de pantalla (n, 2) y máscara de satélites visibles
+        # (los que pasan por detrás del planeta quedan ocultos)
+        c, s, _ = self._in_plane(lead)
+        r = r_px * self.radius_factor
+        x = center[0] + r * (c * self.px + s * self.qx)
+        y = center[1] + r * (c * self.py + s * self.qy)
+        z = r * s * self.qz
+        hidden = (z < 0) & ((x - center[0]) ** 2 + (y - center[1]) ** 2 < planet_r_px ** 2)
+        return np.column_stack((x, y)), ~hidden
+
+    @staticmethod
+    def draw(surface, sprite, coords):
+        # un único blits con el sprite compartido; coords son centros.
+        # `sprite` viene premultiplicado (Surface.premul_alpha): con 10k
+        # satélites BLEND_PREMULTIPLIED mezcla ~40 % más rápido que el alpha
+        # común (difiere en ±2 por redondeo)
+        w, h = sprite.get_size()
+        x, y = (coords - (w // 2, h // 2)).astype(np.int32).T.tolist()
+        surface.blits(zip(repeat(sprite), zip(x, y), repeat(None), repeat(pygame.BLEND_PREMULTIPLIED)),
+                      doreturn=False)
@@ -0,0 +1,210 @@
+# dirty.py
+import pygame
+
+# ================================
+# DIRTY-RECTANGLE RENDERER
+# ================================
+# La pantalla se arma con tres capas:
+#
+#   base     fondo opaco (gradiente, estrellas, geometría fija); se pinta una
+#            vez y luego sólo se repinta por zonas con repaint_base(rect)
+#   layers   superficies SRCALPHA intermedias que la escena mantiene (estelas);
+#            la escena avisa con touch(rect) qué zona cambió
+#   overlay  UI (paneles, sliders, botones) en SRCALPHA; cada región tiene una
+#            clave y sólo se repinta cuando la clave cambia
+#
+# Entre layers y overlay van los sprites móviles: (rect, draw). En cada frame
+# sólo se recomponen los rects sucios (posición vieja y nueva de cada sprite
+# más las zonas tocadas) y se presentan con pygame.display.update(rects).
+#
+# Con downscale > 1 (calidad reducida, ver quality.py) base y layers se
+# componen a 1/downscale de la resolución y cada rect sucio se amplía a la
+# pantalla con una copia sin mezcla; sprites y overlay siguen nítidos. Las
+# layers tienen que ser de ese tamaño (low_size) y los rects se alinean a
+# celdas enteras de downscale px.
+#
+# `mark` (opcional) es FrameProfiler.mark: el repintado completo de la base
+# se cuenta como "background" y no dentro de la composición.
+class DirtyRenderer:
+    def __init__(self, screen, paint_base, paint_overlay, layers=(), mark=None):
+        self.screen = screen
+        self.paint_base = paint_base        # fn(surface)
+        self.paint_overlay = paint_overlay  # fn(surface)
+        self.layers = list(layers)
+        self.mark = mark or (lambda stage: None)
+
+        self.base = None
+        self.overlay = None
+        self.downscale = 1
+        self.base_low = None          # base reducida (downscale > 1)
+        self.low = None               # base + layers reducidas, antes de ampliar
+        self.full = True
+        self._size = None
+        self._regions = {}
+        self._changed = []
+        self._prev_sprites = []
+        self._updates = []
+        self._presented_full = True
+
+    # ---- estado ----
+    def invalidate(self):
+        self.full = True
+
+    def set_downscale(self, factor):
+        if factor != self.downscale:
+            self.downscale = factor
+            self._size = None
+            self.full = True
+
+    def low_size(self):
+        w, h = self.screen.get_size()
+        f = self.downscale
+        return -(-w // f), -(-h // f)
+
+    def set_layers(self, layers):
+        layers = list(layers)
+        if layers != self.layers:
+            self.layers = layers
+            self.full = True
+
+    def touch(self, rect):
+        if rect:
+            self._changed.append(pygame.Rect(rect))
+
+    def repaint_base(self, rect):
+        if self.full or self.base is None:
+            return
+        rect = self._snap(pygame.Rect(rect))
+        self.base.set_clip(rect)
+        self.paint_base(self.base)
+        self.base.set_clip(None)
+        if self.downscale > 1:
+            self._shrink_base(rect)
+        self.touch(rect)
+
+    def region(self, name, rect, key):
+        # zona del overlay con contenido `key`; se repinta si la clave cambió
+        if self._regions.get(name) == key:
+            return
+        self._regions[name] = key
+        if self.full or self.overlay is None:
+            return
+        rect = pygame.Rect(rect)
+        self.overlay.set_clip(rect)
+        self.overlay.fill((0, 0, 0, 0))
+        self.paint_overlay(self.overlay)
+        self.overlay.set_clip(None)
+        self.touch(rect)
+
+    def _ensure_surfaces(self):
+        size = self.screen.get_size()
+        if size != self._size:
+            self._size = size
+            self.base = self._opaque(size)
+            self.overlay = pygame.Surface(size, pygame.SRCALPHA)
+            if self.downscale > 1:
+                self.base_low = self._opaque(self.low_size())
+                self.low = self._opaque(self.low_size())
+            else:
+                self.base_low = self.low = None
+            self.full = True
+
+    def _opaque(self, size):
+        surf = pygame.Surface(size)
+        return surf.convert() if pygame.display.get_surface() is not None else surf
+
+    # ---- resolución reducida ----
+    def _snap(self, rect):
+        # rect de pantalla agrandado a celdas enteras de downscale px
+        f = self.downscale
+        if f == 1:
+            return rect
+        x, y = rect.left // f * f, rect.top // f * f
+        return pygame.Rect(x, y, -(-rect.right // f) * f - x, -(-rect.bottom // f) * f - y)
+
+    def _low_rect(self, rect):
+        f = self.downscale
+        return pygame.Rect(rect.left // f, rect.top // f, -(-rect.width // f), -(-rect.height // f))
+
+    def _shrink_base(self, rect):
+        # rect (ya alineado) de la base a base_low, un píxel por celda: más
+        # barato que promediar y da lo mismo en repintados parciales o totales
+        low = self._low_rect(rect).clip(self.base_low.get_rect())
+        f = self.downscale
+        src = pygame.Rect(low.x * f, low.y * f, low.w * f, low.h * f).clip(self.base.get_rect())
+        if low and src:
+            pygame.transform.scale(self.base.subsurface(src), low.size, self.base_low.subsurface(low))
+
+    def _compose_low(self, rect):
+        low = self._low_rect(rect).clip(self.low.get_rect())
+        if not low:
+            return
+        self.low.blit(self.base_low, low, low)
+        for layer in self.layers:
+            self.low.blit(layer, low, low)
+        pygame.transform.scale(self.low.subsurface(low), rect.size, self.screen.subsurface(rect))
+
+    # ---- frame ----
+    def render(self, sprites=()):
+        self._ensure_surfaces()
+        screen = self.screen
+        sprite_rects = [pygame.Rect(r) for r, _ in sprites]
+
+        if self.full:
+            self.paint_base(self.base)
+            if self.downscale > 1:
+                self._shrink_base(self.base.get_rect())
+            self.mark("background")
+            self.overlay.fill((0, 0, 0, 0))
+            self.paint_overlay(self.overlay)
+            rects = [screen.get_rect()]
+        else:
+            rects = merge_rects(self._prev_sprites + sprite_rects + self._changed,
+                                screen.get_rect())
+
+        if self.downscale > 1:
+            # alineados pueden volver a solaparse: se unen otra vez
+            rects = merge_rects([self._snap(r) for r in rects], screen.get_rect())
+            for r in rects:
+                self._compose_low(r)
+        else:
+            for r in rects:
+                screen.blit(self.base, r, r)
+                for layer in self.layers:
+                    screen.blit(layer, r, r)
+
+        for rect, draw in sprites:
+            screen.set_clip(rect)
+            draw(screen)
+        screen.set_clip(None)
+
+        for r in rects:
+            screen.blit(self.overlay, r, r)
+
+        self._presented_full = self.full
+        self._updates = rects
+        self._prev_sprites = sprite_rects
+        self._changed = []
+        self.full = False
+        return rects
+
+    def present(self):
+        if self._presented_full:
+            pygame.display.flip()
+        elif self._updates:
+            pygame.display.update(self._updates)
+
+
+def merge_rects(rects, bounds):
+    # une los rects que se solapan: así ninguna zona del overlay se mezcla dos veces
+    out = []
+    for r in rects:
+        r = pygame.Rect(r).clip(bounds)
+        if r.width <= 0 or r.height <= 0:
+            continue
+        i = r.collidelist(out)
+        while i != -1:
+            r.union_ip(out.pop(i))
+            i = r.collidelist(out)
+        out.append(r)
+    return out
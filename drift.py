@@ -0,0 +1,173 @@
+# drift.py
+# Deriva relativista de relojes en órbita, vectorizada con NumPy.
+# Además de usarse desde GPSSim, sirve para generar tablas sin la UI:
+#
+#   python drift.py --mass 0.5:3:251 --radius 0.3:3:271 --orbit 1.1:6:491 \
+#                   --units earth --out tabla.npy
+import argparse
+import sys
+
+import numpy as np
+
+# ---------- CONSTANTES ----------
+RE = 6371  # Radio terrestre en km
+G = 6.67430e-11
+M_earth = 5.972e24
+C = 299792458
+US_PER_DAY = 86400 * 1e6
+
+COLUMNS = ("mass_earths", "planet_r_km", "orbit_r_km", "total_us_day", "grav_us_day", "vel_us_day")
+DEFAULT_CHUNK = 1_000_000
+
+
+def earth_masses_to_kg(m):
+    return m * M_earth
+
+
+# ================================
+# MODELO (broadcasting de arrays)
+# ================================
+def relativistic_drift(mass_earths, orbit_r_km, planet_r_km):
+    # devuelve (total, gravitacional, velocidad) en µs/día; acepta escalares
+    # o arrays con shapes compatibles para broadcasting
+    M = earth_masses_to_kg(np.asarray(mass_earths, dtype=float))
+    r = np.asarray(orbit_r_km, dtype=float) * 1000
+    R = np.asarray(planet_r_km, dtype=float) * 1000
+    GM = G * M
+
+    # dilataciones respecto de un reloj en la superficie: el potencial más
+    # alto adelanta al satélite, la velocidad orbital (v² = GM/r) lo atrasa
+    dt_grav = GM / (C * C) * (1 / R - 1 / r)
+    dt_vel = -GM / (2 * C * C * r)
+
+    total = dt_grav + dt_vel
+    return total * US_PER_DAY, dt_grav * US_PER_DAY, dt_vel * US_PER_DAY
+
+
+# ================================
+# ÓRBITA EXCÉNTRICA
+# ================================
+# Con excentricidad e la deriva promedio es la misma que en órbita circular
+# de radio a (<1/r> = 1/a y <v²> = GM/a), más un término periódico:
+#
+#     Δt_r = F e √a sin E,   F = −2 √(GM) / c²   (IS-GPS-200)
+#
+# con E la anomalía excéntrica. El offset acumulado es cerrado en t:
+# deriva_media · t + Δt_r(E(t)) − Δt_r(E(0)).
+KEPLER_TOL = 1e-12
+KEPLER_MAX_ITER = 16
+
+
+def solve_kepler(mean_anomaly, e, tol=KEPLER_TOL, max_iter=KEPLER_MAX_ITER):
+    # anomalía excéntrica E de M = E − e sin E, con Newton sobre arrays; el
+    # arranque M + e sin M (π para e altas) converge en 3-6 iteraciones
+    M = np.remainder(np.asarray(mean_anomaly, dtype=float), 2 * np.pi)
+    e = np.asarray(e, dtype=float)
+    E = np.where(e < 0.8, M + e * np.sin(M), np.pi)
+    for _ in range(max_iter):
+        dE = (E - e * np.sin(E) - M) / (1 - e * np.cos(E))
+        E = E - dE
+        if np.all(np.abs(dE) < tol):
+            break
+    return E
+
+
+def orbital_period(mass_earths, a_km):
+    # segundos
+    GM = G * earth_masses_to_kg(np.asarray(mass_earths, dtype=float))
+    return 2 * np.pi * np.sqrt((np.asarray(a_km, dtype=float) * 1000) ** 3 / GM)
+
+
+def eccentric_term(mass_earths, a_km, e, E):
+    # Δt_r en µs (amplitud: e = ±1 con sin E = ∓1)
+    GM = G * earth_masses_to_kg(np.asarray(mass_earths, dtype=float))
+    F = -2 * np.sqrt(GM) / (C * C)
+    return F * e * np.sqrt(np.asarray(a_km, dtype=float) * 1000) * np.sin(E) * 1e6
+
+
+def iter_grid(masses, planet_radii, orbit_radii, chunk=DEFAULT_CHUNK):
+    # recorre el producto cartesiano en bloques de `chunk` filas sin
+    # materializar la grilla completa; cada bloque es un array (n, 6)
+    masses = np.asarray(masses, dtype=float).ravel()
+    planet_radii = np.asarray(planet_radii, dtype=float).ravel()
+    orbit_radii = np.asarray(orbit_radii, dtype=float).ravel()
+    shape = (len(masses), len(planet_radii), len(orbit_radii))
+    total = int(np.prod(shape))
+
+    for start in range(0, total, chunk):
+        flat = np.arange(start, min(start + chunk, total))
+        i, j, k = np.unravel_index(flat, shape)
+        block = np.empty((len(flat), len(COLUMNS)))
+        block[:, 0] = masses[i]
+        block[:, 1] = planet_radii[j]
+        block[:, 2] = orbit_radii[k]
+        block[:, 3], block[:, 4], block[:, 5] = relativistic_drift(block[:, 0], block[:, 2], block[:, 1])
+        yield block
+
+
+def grid_size(masses, planet_radii, orbit_radii):
+    return len(np.ravel(masses)) * len(np.ravel(planet_radii)) * len(np.ravel(orbit_radii))
+
+
+# ================================
+# SALIDA POR BLOQUES
+# ================================
+def write_csv(path, blocks):
+    rows = 0
+    with open(path, "w") as f:
+        f.write(",".join(COLUMNS) + "\n")
+        for block in blocks:
+            np.savetxt(f, block, delimiter=",", fmt="%.9g")
+            rows += len(block)
+    return rows
+
+
+def write_npy(path, blocks, rows):
+    # el archivo .npy se crea con su tamaño final y se llena bloque a bloque
+    out = np.lib.format.open_memmap(path, mode="w+", dtype=np.float64, shape=(rows, len(COLUMNS)))
+    pos = 0
+    for block in blocks:
+        out[pos:pos + len(block)] = block
+        pos += len(block)
+    out.flush()
+    del out
+    return pos
+
+
+def parse_values(text, scale=1.0):
+    # "a:b:n" → linspace(a, b, n); "a,b,c" → lista; "a" → un valor
+    if ":" in text:
+        start, stop, num = text.split(":")
+        values = np.linspace(float(start), float(stop), int(num))
+    else:
+        values = np.array([float(v) for v in text.split(",")])
+    return values * scale
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Barrido de deriva relativista de relojes GPS")
+    parser.add_argument("--mass", required=True, help="masa del planeta (M_e): a:b:n o lista")
+    parser.add_argument("--radius", required=True, help="radio del planeta: a:b:n o lista")
+    parser.add_argument("--orbit", required=True, help="radio orbital: a:b:n o lista")
+    parser.add_argument("--units", choices=("km", "earth"), default="km",
+                        help="unidades de --radius y --orbit (km o radios terrestres)")
+    parser.add_argument("--out", required=True, help="archivo .csv o .npy")
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK)
+    args = parser.parse_args(argv)
+
+    scale = RE if args.units == "earth" else 1.0
+    masses = parse_values(args.mass)
+    radii = parse_values(args.radius, scale)
+    orbits = parse_values(args.orbit, scale)
+
+    blocks = iter_grid(masses, radii, orbits, args.chunk)
+    if args.out.endswith(".npy"):
+        rows = write_npy(args.out, blocks, grid_size(masses, radii, orbits))
+    else:
+        rows = write_csv(args.out, blocks)
+    print(f"{rows} filas → {args.out}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+# drift_timeline.py
+import math
+
+import numpy as np
+
+from drift import relativistic_drift, solve_kepler, orbital_period, eccentric_term
+from ring_buffer import RingBuffer
+
+SAMPLES_PER_ORBIT = 32       # muestras del offset por vuelta (resuelven el término periódico)
+TIMELINE_CAPACITY = 65536    # ~2048 vueltas: casi 3 años de GPS en 1 MB
+SOLVE_CHUNK = 8192           # muestras por llamada a solve_kepler
+SECONDS_PER_DAY = 86400
+
+
+def format_span(days):
+    if days < 2:
+        return f"{days * 24:.1f} h"
+    if days < 730:
+        return f"{days:,.1f} días"
+    return f"{days / 365.25:,.2f} años"
+
+
+# ================================
+# OFFSET ACUMULADO DEL RELOJ
+# ================================
+# Offset del reloj de un satélite respecto de uno en la superficie, en una
+# órbita excéntrica (ver drift.py). El tiempo avanza en anomalía media (lo
+# que avanza la fase del satélite del slider), así la curva sigue al dibujo
+# a cualquier warp. Cada 2π / SAMPLES_PER_ORBIT de anomalía se guarda una
+# fila (días, µs) en un RingBuffer de tamaño fijo: la memoria no crece con
+# la duración y los saltos grandes de warp sólo calculan las muestras que
+# entran en el buffer, de a SOLVE_CHUNK por vez.
+#
+# El offset es cerrado dentro de cada tramo de parámetros constantes; al
+# cambiar un slider se abre un tramo nuevo que arranca del offset actual.
+class DriftTimeline:
+    def __init__(self, capacity=TIMELINE_CAPACITY, samples_per_orbit=SAMPLES_PER_ORBIT):
+        self.samples = RingBuffer(capacity, width=2)    # (días, µs)
+        self.sample_step = 2 * math.pi / samples_per_orbit
+        self.anomaly = 0.0        # anomalía media acumulada (rad, sin envolver)
+        self.params = None        # (M, R, a, e)
+        self.origin = (0.0, 0.0, 0.0)    # (anomalía, s, µs) donde empieza el tramo
+
+        self._rate = 0.0          # µs por segundo
+        self._motion = 0.0        # rad por segundo
+        self._term0 = 0.0         # término periódico al inicio del tramo
+        self._envelope = None     # (total, columnas, envolvente) ya calculada
+
+    def set_params(self, mass, planet_r, a, e):
+        params = (float(mass), float(planet_r), float(a), float(e))
+        if params == self.params:
+            return
+        if self.params is not None:
+            t, offset = self.at(self.anomaly)
+            self.origin = (self.anomaly, float(t), float(offset))
+        self.params = params
+        self._rate = float(relativistic_drift(mass, a, planet_r)[0]) / SECONDS_PER_DAY
+        self._motion = 2 * math.pi / float(orbital_period(mass, a))
+        self._term0 = self._term(self.origin[0])
+
+    def _term(self, anomaly):
+        mass, _, a, e = self.params
+        if not e:
+            return 0.0 if np.ndim(anomaly) == 0 else np.zeros(np.shape(anomaly))
+        return eccentric_term(mass, a, e, solve_kepler(anomaly, e))
+
+    def at(self, anomaly):
+        # (segundos, µs) en una anomalía del tramo actual; acepta arrays
+        start, t0, offset0 = self.origin
+        t = t0 + (anomaly - start) / self._motion
+        return t, offset0 + self._rate * (t - t0) + self._term(anomaly) - self._term0
+
+    @property
+    def elapsed(self):
+        return self.at(self.anomaly)[0] if self.params is not None else 0.0
+
+    @property
+    def offset(self):
+        return self.at(self.anomaly)[1] if self.params is not None else 0.0
+
+    def advance(self, d_anomaly):
+        if d_anomaly <= 0:
+            return
+        step = self.sample_step
+        first = math.floor(self.anomaly / step) + 1
+        self.anomaly += d_anomaly
+        if self.params is None:
+            return
+        last = math.floor(self.anomaly / step)
+        first = max(first, last - self.samples.capacity + 1)
+        for k in range(first, last + 1, SOLVE_CHUNK):
+            anomalies = np.arange(k, min(k + SOLVE_CHUNK, last + 1)) * step
+            t, offset = self.at(anomalies)
+            self.samples.extend(np.column_stack((t / SECONDS_PER_DAY, offset)))
+
+    def clear(self):
+        self.samples.clear()
+        self.anomaly = 0.0
+        self.origin = (0.0, 0.0, 0.0)
+        if self.params is not None:
+            self._term0 = self._term(0.0)
+        self._envelope = None
+
+    # ---- gráfico ----
+    def envelope(self, columns):
+        # (días, mínimo, máximo) por columna: como mucho `columns` puntos por
+        # curva, sin importar cuántas muestras haya; se recalcula sólo si
+        # llegaron muestras nuevas
+        key = (self.samples.total, columns)
+        if self._envelope is not None and self._envelope[0] == key:
+            return self._envelope[1]
+        data = self.samples.view()
+        days, offset = data[:, 0], data[:, 1]
+        if len(data) <= columns:
+            out = (days, offset, offset)
+        else:
+            edges = days[0] + (days[-1] - days[0]) * np.arange(columns) / columns
+            starts = np.searchsorted(days, edges)
+            starts = starts[np.concatenate(([True], starts[1:] != starts[:-1]))]    # columnas vacías
+            out = (days[starts], np.minimum.reduceat(offset, starts), np.maximum.reduceat(offset, starts))
+        self._envelope = (key, out)
+        return out
+
+    # ---- checkpoints ----
+    def checkpoint(self):
+        state = {"anomaly": self.anomaly, "params": self.params, "origin": list(self.origin),
+                 "total": self.samples.total}
+        return state, {"timeline": self.samples.view()}
+
+    def restore(self, state, arrays):
+        self.anomaly = state["anomaly"]
+        self.params = None
+        self.origin = tuple(state["origin"])
+        if state["params"] is not None:
+            self.set_params(*state["params"])
+        self.samples.restore(arrays["timeline"], state["total"])
+        self._envelope = None
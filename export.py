@@ -0,0 +1,350 @@
+# export.py
+# Exporta una corrida de los simuladores a video sin capturar pantalla:
+# renderiza fuera de pantalla a cualquier resolución y fps, y un pool de
+# hilos codifica los frames mientras el bucle de render sigue adelante.
+#
+#   python export.py --scene perihelio --size 1920x1080 --fps 60 --seconds 20 \
+#                    --out frames/peri_%05d.png
+#   python export.py --scene gps-constellation --out gps.y4m
+#   python export.py --checkpoint checkpoints/perihelio.ckpt --out peri.y4m
+#   ffmpeg -i gps.y4m -c:v libx264 gps.mp4
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import math
+import queue
+import struct
+import sys
+import threading
+import time
+import zlib
+
+import numpy as np
+import pygame
+import checkpoint
+
+DEFAULT_QUEUE = 32
+EXPORT_MAX_STEPS = 4096      # pasos de física por frame como máximo (ver prepare_export)
+
+
+# ================================
+# CODIFICADORES
+# ================================
+# Trabajan sobre bytes RGB24 (Y4M sobre RGBX, ver FRAME_LAYOUT) y usan
+# NumPy/zlib, que liberan el GIL: varios hilos codifican en paralelo sin
+# copiar los frames entre procesos.
+def encode_png(rgb, size, level=6):
+    w, h = size
+    rows = np.frombuffer(rgb, dtype=np.uint8).reshape(h, w * 3)
+    raw = np.empty((h, w * 3 + 1), dtype=np.uint8)
+    raw[:, 0] = 0                  # filtro "None" en cada fila
+    raw[:, 1:] = rows
+
+    def chunk(tag, data):
+        body = tag + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", w, h, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(raw.tobytes(), level)) + chunk(b"IEND", b""))
+
+
+def encode_y4m_frame(rgbx, size):
+    # RGB → YCbCr BT.601 de rango completo (C420jpeg) en punto fijo, con
+    # los coeficientes ×256. Cada píxel se lee como un uint32 (R en el byte
+    # bajo) y R, B quedan en carriles de 16 bits: una multiplicación da
+    # 77·R + 29·B en la mitad alta y 150·G se suma en el mismo lugar, así
+    # Y sale en el byte alto (77+150+29 = 256, no desborda).
+    #
+    # La conversión es lineal, así que el croma se calcula después de sumar
+    # cada bloque 2x2 en RGB (hasta 4·255, entra en el carril): un cuarto de
+    # los píxeles
+    w, h = size
+    px = np.frombuffer(rgbx, dtype="<u4").reshape(h, w)
+    rb = px & 0x00FF00FF
+    gg = px & 0x0000FF00
+
+    def quad(c):
+        rows = c[0::2] + c[1::2]
+        return rows[:, 0::2] + rows[:, 1::2]
+
+    rb4, g4 = quad(rb), quad(gg)
+    r4 = (rb4 & 0xFFFF).astype(np.int32)
+    b4 = (rb4 >> 16).astype(np.int32)
+    g4 = (g4 >> 8).astype(np.int32)
+    # ×256 por el coeficiente y ×4 por la suma: se redondea y divide por 1024
+    cb = (b4 * 128 - r4 * 43 - g4 * 85 + (128 * 1024 + 512)) >> 10
+    cr = (r4 * 128 - g4 * 107 - b4 * 21 + (128 * 1024 + 512)) >> 10
+
+    rb *= 29 + (77 << 16)
+    gg *= 150 << 8
+    rb += gg
+    rb += 128 << 16                # redondeo
+    y = rb.view(np.uint8).reshape(h, w, 4)[..., 3]
+    planes = [y] + [np.clip(c, 0, 255).astype(np.uint8) for c in (cb, cr)]
+    return b"FRAME\n" + b"".join(p.tobytes() for p in planes)
+
+
+# bytes por frame que pide cada formato a pygame: RGBX es una copia directa
+# del framebuffer de 32 bits, RGB24 lo reordena pygame (más rápido que
+# recortar RGBX con NumPy, pero ~8 veces más lento que la copia)
+FRAME_LAYOUT = {"png": "RGB", "raw": "RGB", "y4m": "RGBX"}
+
+
+def y4m_header(size, fps):
+    return f"YUV4MPEG2 W{size[0]} H{size[1]} F{fps}:1 Ip A1:1 C420jpeg\n".encode()
+
+
+def output_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".png":
+        return "png"
+    if ext == ".y4m":
+        return "y4m"
+    if ext in (".rgb", ".raw"):
+        return "raw"
+    raise ValueError(f"formato de salida no soportado: {path} (usar .png, .y4m o .rgb)")
+
+
+# ================================
+# EXPORTADOR (COLA ACOTADA + POOL)
+# ================================
+# submit() sólo copia el framebuffer y lo encola; si los codificadores van
+# atrasados la cola llena frena al render (así la memoria queda acotada),
+# pero el render nunca toca el disco. Los PNG los escribe cada hilo por su
+# cuenta; los streams (.y4m / .rgb) pasan por un escritor que respeta el
+# orden de los frames.
+class FrameExporter:
+    def __init__(self, out, size, fps, workers=None, queue_size=DEFAULT_QUEUE, png_level=6):
+        self.out = out
+        self.size = tuple(size)
+        self.fps = fps
+        self.format = output_format(out)
+        self.png_level = png_level
+        if self.format == "y4m" and (self.size[0] % 2 or self.size[1] % 2):
+            raise ValueError("Y4M 4:2:0 necesita ancho y alto pares")
+        if self.format == "png" and "%" not in out:
+            root, ext = os.path.splitext(out)
+            self.out = root + "_%05d" + ext
+
+        self.frames = 0
+        self.written = 0
+        self._frames = queue.Queue(maxsize=queue_size)
+        self._encoded = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._lock = threading.Lock()
+
+        folder = os.path.dirname(self.out)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self._stream = None
+        self._writer = None
+        if self.format != "png":
+            self._stream = open(self.out, "wb")
+            if self.format == "y4m":
+                self._stream.write(y4m_header(self.size, fps))
+            self._writer = threading.Thread(target=self._write_stream, daemon=True)
+            self._writer.start()
+
+        count = workers or max(1, (os.cpu_count() or 2) - 1)
+        self._workers = [threading.Thread(target=self._work, daemon=True) for _ in range(count)]
+        for t in self._workers:
+            t.start()
+
+    def submit(self, surface):
+        if self._error:
+            raise self._error
+        data = pygame.image.tobytes(surface, FRAME_LAYOUT[self.format])
+        self._frames.put((self.frames, data))
+        self.frames += 1
+
+    def _encode(self, data):
+        if self.format == "png":
+            return encode_png(data, self.size, self.png_level)
+        if self.format == "y4m":
+            return encode_y4m_frame(data, self.size)
+        return data
+
+    def _work(self):
+        while True:
+            item = self._frames.get()
+            if item is None:
+                return
+            if self._error:
+                continue             # ya falló un frame: se vacía la cola sin codificar
+            index, data = item
+            try:
+                payload = self._encode(data)
+                if self.format == "png":
+                    with open(self.out % index, "wb") as f:
+                        f.write(payload)
+                    with self._lock:
+                        self.written += 1
+                else:
+                    self._encoded.put((index, payload))
+            except Exception as e:   # se informa en el próximo submit/close
+                self._error = e
+                if self.format != "png":
+                    self._encoded.put((index, None))
+
+    def _write_stream(self):
+        # escribe en orden de frame. Si uno no se pudo codificar (payload
+        # None) los siguientes ya no pueden ir al archivo: se descartan al
+        # llegar en vez de acumularse esperando el que falta
+        pending = {}
+        nxt = 0
+        failed = False
+        while True:
+            item = self._encoded.get()
+            if item is None:
+                break
+            index, payload = item
+            if payload is None:
+                failed = True
+                pending.clear()
+            if failed:
+                continue
+            pending[index] = payload
+            try:
+                while nxt in pending:
+                    self._stream.write(pending.pop(nxt))
+                    nxt += 1
+                    self.written += 1
+            except Exception as e:
+                self._error = e
+                failed = True
+                pending.clear()
+
+    def close(self):
+        for _ in self._workers:
+            self._frames.put(None)
+        for t in self._workers:
+            t.join()
+        if self._writer is not None:
+            self._encoded.put(None)
+            self._writer.join()
+            self._stream.close()
+        if self._error:
+            raise self._error
+        return self.written
+
+
+# ================================
+# ESCENAS
+# ================================
+def make_scene(name, screen):
+    if name == "perihelio":
+        from perihelio import PerihelioSim
+        return PerihelioSim(screen)
+    if name == "perihelio-swarm":
+        from perihelio import PerihelioSim
+        return PerihelioSim(screen, mode="swarm")
+    if name == "gps":
+        from gps import GPSSim
+        return GPSSim(screen)
+    if name == "gps-constellation":
+        from gps import GPSSim
+        return GPSSim(screen, satellites=2400)
+    raise ValueError(f"escena desconocida: {name}")
+
+
+SCENE_NAMES = ("perihelio", "perihelio-swarm", "gps", "gps-constellation")
+
+
+def set_warp(sim, warp):
+    if hasattr(sim, "slider_warp"):
+        sim.slider_warp.value = math.log10(warp)
+    else:
+        sim.sim_clock.set_warp(warp)
+
+
+def prepare_export(sim):
+    # sin reloj de pared: sin presupuesto de tiempo y con tope fijo de pasos
+    # por frame, como al grabar (prepare_replay). Acá no hay que llegar a
+    # tiempo real, así que el tope es más alto: sólo hace más lento el export
+    sim.prepare_replay()
+    if sim.sim_clock.max_steps is not None:
+        sim.sim_clock.max_steps = EXPORT_MAX_STEPS
+
+
+def max_export_warp(clock, fps):
+    # warp más alto que entra en el tope de pasos por frame (None = sin tope)
+    if clock.max_steps is None:
+        return None
+    return clock.max_steps * clock.step * fps / clock.rate
+
+
+def export_scene(sim, exporter, frames, fps):
+    # cada frame avanza exactamente 1/fps de tiempo simulado con un número
+    # de pasos que no depende de la máquina, así el video es siempre el mismo
+    prepare_export(sim)
+    dt = 1000 / fps
+    for _ in range(frames):
+        sim.frame([], dt)
+        exporter.submit(sim.screen)
+
+
+def parse_size(text):
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exportar una corrida del simulador a PNG o video")
+    parser.add_argument("--scene", choices=SCENE_NAMES,
+                        help="por defecto perihelio, o la del --checkpoint")
+    parser.add_argument("--checkpoint", help="arrancar desde un estado guardado (F5 en la escena)")
+    parser.add_argument("--size", default="1920x1080")
+    parser.add_argument("--fps", type=int, default=60)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--warp", type=float, help="factor de warp del reloj de simulación")
+    parser.add_argument("--out", required=True, help="patrón .png (p.ej. out/f_%%05d.png), .y4m o .rgb")
+    parser.add_argument("--workers", type=int, help="hilos codificadores (por defecto núcleos - 1)")
+    parser.add_argument("--queue", type=int, default=DEFAULT_QUEUE, help="frames en cola como máximo")
+    parser.add_argument("--png-level", type=int, default=6, help="compresión zlib de los PNG (0-9)")
+    args = parser.parse_args(argv)
+
+    size = parse_size(args.size)
+    frames = int(round(args.seconds * args.fps))
+
+    scene = args.scene
+    if scene is None:
+        scene = checkpoint.load(args.checkpoint).scene if args.checkpoint else "perihelio"
+
+    pygame.init()
+    screen = pygame.display.set_mode(size)
+    sim = make_scene(scene, screen)
+    if args.checkpoint:
+        sim.load_checkpoint(args.checkpoint)
+    if args.warp:
+        set_warp(sim, args.warp)
+    prepare_export(sim)
+    warp = args.warp or sim.sim_clock.warp
+    limit = max_export_warp(sim.sim_clock, args.fps)
+    if limit is not None and warp > limit:
+        parser.error(f"warp ×{warp:,.0f}: a {args.fps} fps el integrador llega a ×{limit:,.0f} "
+                     f"({sim.sim_clock.max_steps} pasos por frame)")
+
+    exporter = FrameExporter(args.out, size, args.fps, args.workers, args.queue, args.png_level)
+    t0 = time.perf_counter()
+    try:
+        export_scene(sim, exporter, frames, args.fps)
+    finally:
+        written = exporter.close()
+    elapsed = time.perf_counter() - t0
+
+    speed = frames / args.fps / elapsed if elapsed > 0 else float("inf")
+    print(f"{written} frames {size[0]}x{size[1]} @ {args.fps} fps → {exporter.out} "
+          f"({elapsed:.1f} s, {speed:.1f}× tiempo real)", file=sys.stderr)
+    if exporter.format == "raw":
+        print(f"ffmpeg -f rawvideo -pix_fmt rgb24 -s {size[0]}x{size[1]} -r {args.fps} "
+              f"-i {exporter.out} salida.mp4", file=sys.stderr)
+    pygame.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,112 +1,265 @@
 import pygame
 import math
-import random
-import sys
-from ui_elements import BackButtonUI
 
-# ---------- CONSTANTES ----------
-RE = 6371  # Radio terrestre en km
-G = 6.67430e-11
-M_earth = 5.972e24
-
-
-def earth_masses_to_kg(m):
-    return m * M_earth
+import numpy as np
+from ui_elements import Slider, WidgetGroup
+from background import draw_background
+from text_cache import render_text
+from assets import ASSETS
+from drift import RE, relativistic_drift, eccentric_term
+from drift_timeline import DriftTimeline, format_span
+from positioning import (HEAT_COLORS, HEAT_EXTENT, HEAT_RES, HEAT_STOPS, clock_errors, error_colors,
+                         format_distance, line_of_sight, observe, receiver_grid, solve_positions,
+                         solver_subset)
+from dirty import DirtyRenderer
+from constellation import Constellation, BASE_RATE, SIZES as CONSTELLATION_SIZES
+from sim_clock import SimClock, warp_from_key
+from viewport import Viewport
+from trail_canvas import plot_pixels
+from scene import Scene, draw_stars
+from replay import INPUT
+
+KM_PER_PX = 100          # escala base: 1 px = 100 km
+PLANET_ANIMATION = "earth.gif"   # rotación; earth.png mientras se decodifica
+ZOOM_RANGE = (0.25, 8.0)
+ECCENTRICITIES = (0.0, 0.01, 0.1, 0.3, 0.6)   # tecla E (0.01 ≈ GPS real)
+TIMELINE_COLUMNS = 150                         # puntos por curva del gráfico de offset
+SAT_FLAT_COLOR = (170, 200, 235)               # satélites sin sprite (calidad mínima)
+POSITION_HZ = 60                               # soluciones del mapa de error por segundo real (calidad alta)
 
 
 # ============================================================
-# ★★★ VISUALS: ESTRELLAS + GRADIENT + GLOW (igual a perihelio)
+# ★★★ VISUALS (estrellas en scene.py, gradiente en background.py)
 # ============================================================
-def draw_radial_gradient(surface, center, radius, inner, outer):
-    cx, cy = center
-    for r in range(radius, 0, -1):
-        t = r / radius
-        color = (
-            int(inner[0] * t + outer[0] * (1 - t)),
-            int(inner[1] * t + outer[1] * (1 - t)),
-            int(inner[2] * t + outer[2] * (1 - t)),
-        )
-        pygame.draw.circle(surface, color, (cx, cy), r)
-
-
-def gen_stars(w, h, n=120):
-    return [(random.randint(0, w), random.randint(0, h),
-             random.choice([1, 1, 2])) for _ in range(n)]
-
-
-def draw_stars(surface, stars, phase):
-    for x, y, s in stars:
-        tw = 0.5 + 0.5 * math.sin((x * 11 + y * 5 + phase) * 0.002)
-        size = max(1, int(s * tw))
-        pygame.draw.circle(surface, (255, 255, 255), (x, y), size)
+def sat_sprite_size(n):
+    # 38 px para un satélite; más chico cuanto más poblada la constelación
+    return 38 if n == 1 else max(6, int(22 / math.sqrt(max(1, n / 24))))
+
+
+def heat_legend(width, height):
+    # barra de colores del mapa de error, de 1 m (izquierda) a 100 km
+    level = np.linspace(HEAT_STOPS[0], HEAT_STOPS[-1], width)
+    colors = np.stack([np.interp(level, HEAT_STOPS, HEAT_COLORS[:, ch]) for ch in range(3)], axis=-1)
+    surf = pygame.Surface((width, height))
+    pygame.surfarray.blit_array(surf, np.repeat(colors[:, None, :], height, axis=1).astype(np.uint8))
+    return surf
+
+
+def draw_timeline(surface, rect, timeline, font):
+    # offset acumulado vs tiempo: banda mínimo-máximo por columna (el término
+    # periódico se ve como grosor) y el valor actual arriba
+    total, days, lo, hi = timeline
+    x, y, w, h = rect
+    if not total:
+        surface.blit(render_text(font, "Reloj: esperando la primera vuelta", (230, 230, 250)), (x, y))
+        return
+    surface.blit(render_text(font, f"Reloj: {hi[-1]:+,.3f} µs en {format_span(days[-1])}",
+                             (230, 230, 250)), (x, y))
+    plot = pygame.Rect(x, y + 24, w, h - 40)
+    pygame.draw.rect(surface, (12, 12, 28), plot)
+    low, high = float(lo.min()), float(hi.max())
+    if high - low < 1e-9:
+        low, high = low - 1e-3, high + 1e-3
+    t0, t1 = float(days[0]), float(days[-1])
+    px = plot.x + (days - t0) / max(t1 - t0, 1e-12) * (plot.w - 1)
+    y_of = lambda v: plot.bottom - 1 - (v - low) / (high - low) * (plot.h - 1)
+    if low < 0 < high:
+        pygame.draw.line(surface, (70, 70, 100), (plot.x, y_of(0.0)), (plot.right - 1, y_of(0.0)))
+    top = np.column_stack((px, y_of(hi)))
+    if len(top) > 1:
+        bottom = np.column_stack((px, y_of(lo)))[::-1]
+        pygame.draw.polygon(surface, (90, 130, 220), np.concatenate((top, bottom)).tolist())
+        pygame.draw.lines(surface, (160, 200, 255), False, top.tolist())
+    small = lambda text: render_text(font, text, (150, 160, 200))
+    surface.blit(small(f"{high:+,.3g} µs"), (plot.x + 4, plot.y + 2))
+    label = small(f"{low:+,.3g} µs")
+    surface.blit(label, (plot.x + 4, plot.bottom - label.get_height() - 2))
+    span = small(f"{format_span(t0)} … {format_span(t1)}")
+    surface.blit(span, (plot.right - span.get_width(), plot.bottom + 2))
+
+
+SLIDER_LABEL = (220, 230, 255)
+SLIDER_TICK = (140, 150, 200)
+
+# panel de información: líneas de texto (INFO_ROWS como máximo, de INFO_LINE
+# px) y debajo el error de posición y el gráfico del offset
+INFO_LINE = 19
+INFO_ROWS = 15
+EXPLANATION = [
+    "• Campo gravitacional acelera",
+    "  el reloj del satélite.",
+    "• La velocidad orbital lo retarda.",
+    "• GPS corrige esta diferencia.",
+]
 
 
 # ============================================================
-# ★★★ SLIDER (gps-style, mismo al de perihelio)
+# ★★★ MODELO FÍSICO (sin pygame; lo puede correr un SimWorker)
 # ============================================================
-class Slider:
-    def __init__(self, x, y, w, min_val, max_val, start_val,
-                 step=0.1, label="", ticks=None):
-
-        self.rect = pygame.Rect(x, y, w, 12)
-        self.grab_rect = pygame.Rect(x, y - 12, w, 36)
-
-        self.min = min_val
-        self.max = max_val
-        self.value = start_val
-        self.label = label
-        self.step = step
-        self.ticks = ticks or []
-        self.font = pygame.font.SysFont("arial", 18)
-        self.grabbed = False
-
-    def handle(self, event):
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            if self.grab_rect.collidepoint(event.pos):
-                self.grabbed = True
-        elif event.type == pygame.MOUSEBUTTONUP:
-            self.grabbed = False
-        elif event.type == pygame.MOUSEMOTION and self.grabbed:
-            mx = max(self.rect.left, min(event.pos[0], self.rect.right))
-            t = (mx - self.rect.left) / self.rect.width
-            raw = self.min + t * (self.max - self.min)
-            self.value = round(raw / self.step) * self.step
-
-    def draw(self, screen):
-        # label
-        txt = f"{self.label}: {self.value:.2f}"
-        screen.blit(self.font.render(txt, True, (220, 230, 255)),
-                    (self.rect.x, self.rect.y - 25))
-
-        # baseline
-        pygame.draw.rect(screen, (220, 220, 240), self.rect)
-
-        # ticks
-        for tval in self.ticks:
-            px = self.rect.x + (tval - self.min) / (self.max - self.min) * self.rect.width
-            pygame.draw.line(screen, (140, 150, 200),
-                             (px, self.rect.y - 6),
-                             (px, self.rect.y + 6), 2)
-
-        # handle
-        t = (self.value - self.min) / (self.max - self.min)
-        hx = self.rect.x + int(t * self.rect.width)
-        pygame.draw.circle(screen, (100, 150, 255), (hx, self.rect.y + 6), 10)
+class GPSPhysics:
+    def __init__(self, satellites=1):
+        # reloj de simulación: un paso = un frame de 1/60 s a warp 1; el avance
+        # de la constelación es cerrado, así que no hace falta presupuesto
+        self.clock = SimClock(1.0, rate=60.0, budget_ms=None)
+        self.constellation = Constellation(satellites)
+        self.drift = (0.0, 0.0, 0.0)
+        self.params = None           # (M, R, D) de los sliders
+        self.eccentricity = 0.0      # pedida con la tecla E
+        self.orbit_e = 0.0           # la que se usa: el perigeo no baja de la superficie
+        self.timeline = DriftTimeline()
+
+        # posicionamiento sin corrección relativista (tecla H, positioning.py)
+        self.positioning = True
+        self.position_hz = POSITION_HZ
+        self.fix = None              # último mapa de error (ver locate)
+        self._receivers = None       # (R, posiciones, máscara en la grilla)
+        self._sight = None           # (posiciones de los satélites, line_of_sight)
+        self._guess = None           # solución anterior: arranque de Gauss-Newton
+        self._fix_due = 0.0
+        self._fix_version = 0
+        self.view = None             # (centro, radio de órbita px, radio del planeta px)
+
+    def apply(self, name, value):
+        if name == "satellites":
+            self.constellation = Constellation(value)
+            self.params_changed()
+        elif name == "params":
+            self.params = value
+            self.params_changed()
+        elif name == "eccentricity":
+            self.eccentricity = value
+            self.params_changed()
+        elif name == "positioning":
+            self.positioning = value
+            self.locate()
+        elif name == "position_hz":
+            self.position_hz = value
+        elif name == "view":
+            self.view = value
+        elif name == "warp":
+            self.clock.set_warp(value)
+
+    def params_changed(self):
+        if self.params is None:
+            return
+        M, R, D = self.params
+        total, grav, vel = relativistic_drift(M, D, R)
+        self.drift = (float(total), float(grav), float(vel))
+        self.constellation.update_drift(M, D, R)
+        self.orbit_e = min(self.eccentricity, max(0.0, 1 - R / D))
+        self.constellation.eccentricity = self.orbit_e
+        self.timeline.set_params(M, R, D, self.orbit_e)
+        self._fix_due = 1 / self.position_hz      # el mapa sigue a los sliders en el próximo paso
+
+    def advance(self, real_dt):
+        # el reloj del satélite del slider avanza lo mismo que su fase; el
+        # mapa de error se rehace position_hz veces por segundo real (a
+        # calidad alta, una por frame)
+        steps = self.clock.tick(real_dt)
+        self.constellation.step(steps)
+        self.timeline.advance(steps * BASE_RATE)
+        period = 1 / self.position_hz
+        self._fix_due += real_dt
+        if self._fix_due >= period:
+            # lo que sobra pasa al siguiente: con frames de 16 y 17 ms no se saltea ninguno
+            self._fix_due = min(self._fix_due - period, period)
+            self.locate()
+
+    def locate(self):
+        # receptores alrededor del planeta → pseudodistancias con los relojes
+        # sin corregir → posición por Gauss-Newton → error por receptor
+        sats = self.constellation
+        if not self.positioning or sats.n < 4 or self.params is None:
+            self.fix = None
+            return
+        M, R, D = self.params
+        if self._receivers is None or self._receivers[0] != R:
+            grid, inside = receiver_grid(R)
+            self._receivers = (R, grid[inside], inside)
+            self._sight = None
+        _, receivers, inside = self._receivers
+
+        subset = solver_subset(sats.n)
+        sat_pos, E = sats.positions_3d(D, subset)
+        # con la constelación quieta (warp 0, sliders de masa) sólo cambian los relojes
+        if self._sight is None or not np.array_equal(self._sight[0], sat_pos):
+            self._sight = (sat_pos, line_of_sight(receivers, sat_pos))
+        clock = clock_errors(sats.drift_total[subset], M, D * sats.radius_factor[subset],
+                             self.orbit_e, E, self.timeline.elapsed)
+        fix, ok = solve_positions(self._sight[1], observe(clock), self._guess)
+        self._guess = fix
+
+        error = np.sqrt((fix[:, :3] ** 2).sum(axis=1))
+        rgba = np.zeros((inside.size, 4), dtype=np.uint8)
+        rgba[inside] = error_colors(error, ok)
+        valid = error[ok]
+        self._fix_version += 1
+        self.fix = {"version": self._fix_version, "rgba": rgba.reshape(HEAT_RES, HEAT_RES, 4),
+                    "median": float(np.median(valid)) if len(valid) else None,
+                    "max": float(valid.max()) if len(valid) else None}
+
+    # ---- checkpoints ----
+    def checkpoint(self):
+        # la constelación se rehace igual a partir de n; sólo cambia la fase
+        timeline, arrays = self.timeline.checkpoint()
+        state = {"satellites": self.constellation.n, "params": self.params,
+                 "eccentricity": self.eccentricity, "positioning": self.positioning, "timeline": timeline,
+                 "clock": self.clock.checkpoint()}
+        return state, dict(arrays, phase=self.constellation.phase)
+
+    def restore(self, state, arrays):
+        self.constellation = Constellation(state["satellites"])
+        self.constellation.phase[:] = arrays["phase"]
+        self.params = tuple(state["params"]) if state["params"] is not None else None
+        self.eccentricity = state["eccentricity"]
+        self.positioning = state["positioning"]
+        self.timeline.restore(state["timeline"], arrays)
+        self.params_changed()
+        self._guess = None
+        self.locate()
+        self.clock.restore(state["clock"])
+
+    def make_snapshot(self):
+        return {}
+
+    def write_snapshot(self, snap):
+        # proyección a pantalla incluida: con 10k satélites es la parte cara
+        sats = self.constellation
+        coords = None
+        if self.view is not None:
+            center, r_px, planet_r_px = self.view
+            coords, visible = sats.positions(center, r_px, planet_r_px, lead=self.clock.alpha)
+            coords = coords[visible]
+        # gráfico: sólo la envolvente ya reducida (copia: el buffer sigue llenándose)
+        timeline = self.timeline
+        days, lo, hi = (a.copy() for a in timeline.envelope(TIMELINE_COLUMNS))
+        amplitude = 0.0
+        if self.params is not None and self.orbit_e:
+            M, R, D = self.params
+            amplitude = abs(float(eccentric_term(M, D, self.orbit_e, np.pi / 2))) * 1e3
+        snap.update(n=sats.n, coords=coords, drift=self.drift,
+                    drift_range=(float(sats.drift_total.min()), float(sats.drift_total.max())),
+                    params=self.params, warp=self.clock.warp,
+                    eccentricity=(self.eccentricity, self.orbit_e), eccentric_ns=amplitude,
+                    positioning=self.positioning, fix=self.fix,
+                    timeline=(timeline.samples.total, days, lo, hi))
 
 
 # ============================================================
 # ★★★ SIMULACIÓN GPS
 # ============================================================
-class GPSSim:
-    def __init__(self, screen):
-        self.screen = screen
-        self.W, self.H = screen.get_size()
-        self.clock = pygame.time.Clock()
-        self.btn_back = BackButtonUI()
+class GPSSim(Scene):
+    SCENE = "gps"
+    CHECKPOINT_SLIDERS = ("slider_radius", "slider_mass", "slider_distance")
+    STAR_TWINKLE = (11, 5)
+
+    def __init__(self, screen, satellites=1):
+        super().__init__(screen)
+        self.init_stars(150)
 
-        # estrellas
-        self.stars = gen_stars(self.W, self.H, 150)
-        self.star_phase = 0
+        # satélites (1 = modo clásico; la tecla C recorre constellation.SIZES)
+        self.physics = GPSPhysics(satellites)
+        self.sim_clock = self.physics.clock
 
         # ----- sliders -----
         self.slider_radius = Slider(
@@ -114,7 +267,8 @@ class GPSSim:
             0.3 * RE, 3.0 * RE, 1.0 * RE,
             step=0.05 * RE,
             label="Radio (km)",
-            ticks=[0.5*RE, 1*RE, 1.5*RE, 2*RE, 2.5*RE, 3*RE]
+            ticks=[0.5*RE, 1*RE, 1.5*RE, 2*RE, 2.5*RE, 3*RE],
+            label_color=SLIDER_LABEL, tick_color=SLIDER_TICK
         )
 
         self.slider_mass = Slider(
@@ -122,7 +276,8 @@ class GPSSim:
             0.5, 3.0, 1.0,
             step=0.1,
             label="Masa (M_e)",
-            ticks=[0.5, 1, 1.5, 2, 2.5, 3]
+            ticks=[0.5, 1, 1.5, 2, 2.5, 3],
+            label_color=SLIDER_LABEL, tick_color=SLIDER_TICK
         )
 
         self.slider_distance = Slider(
@@ -130,132 +285,295 @@ class GPSSim:
             1.1 * RE, 6.0 * RE, 4.0 * RE,
             step=0.1 * RE,
             label="Altura satélite (km)",
-            ticks=[1.5*RE, 2*RE, 3*RE, 4*RE, 5*RE, 6*RE]
+            ticks=[1.5*RE, 2*RE, 3*RE, 4*RE, 5*RE, 6*RE],
+            label_color=SLIDER_LABEL, tick_color=SLIDER_TICK
         )
-
-        # imágenes
-        self.planet_img = self.safe_load("earth.png", 50)
-        self.sat_img = self.safe_load("sat.png", 20)
-
-        self.font = pygame.font.SysFont("arial", 20)
-        self.small = pygame.font.SysFont("arial", 16)
+        self.ui = WidgetGroup([self.slider_radius, self.slider_mass, self.slider_distance, self.btn_back])
+
+        # imágenes (se decodifican una sola vez por proceso, ver assets.py);
+        # el GIF del planeta se decodifica en segundo plano la primera vez
+        self.planet_path = "earth.png"
+        self.sat_path = "sat.png"
+        self.safe_load(self.planet_path, 50)
+        self.safe_load(self.sat_path, 20)
+        self.planet_anim = ASSETS.animation(PLANET_ANIMATION)
+        if INPUT.deterministic:
+            self.planet_anim.wait()    # grabando / repitiendo: sin carrera con el hilo
+        self.spin_ms = 0.0
+
+        self.font = ASSETS.font("arial", 20)
+        self.small = ASSETS.font("arial", 16)
+
+        # layout fijo
+        self.center = (self.W//3, self.H//2)
+        # vista en km: el planeta está en el origen del mundo
+        self.viewport = Viewport(self.center, 1 / KM_PER_PX, ZOOM_RANGE, (self.W, self.H))
+        self.info_rect = pygame.Rect(self.W - 360, 250, 330, self.H - 260)
+        top = self.info_rect.y + 10 + INFO_ROWS * INFO_LINE     # debajo de las líneas de texto
+        self.fix_rect = pygame.Rect(self.info_rect.x + 10, top, self.info_rect.w - 20, 44)
+        self.legend = heat_legend(150, 8)
+        self._heat = (None, None)    # (clave, (rect, superficie)) del mapa escalado
+        top = self.fix_rect.bottom
+        self.timeline_rect = pygame.Rect(self.info_rect.x + 10, top, self.info_rect.w - 20,
+                                         self.info_rect.bottom - 10 - top)
+
+        self._base_key = None
+        self.renderer = DirtyRenderer(screen, self.paint_base, self.paint_overlay, mark=self.profiler.mark)
+        self.send_params()
+        self.snapshot = self.physics.make_snapshot()
+        self.physics.write_snapshot(self.snapshot)
 
     def safe_load(self, path, r):
-        try:
-            im = pygame.image.load(path).convert_alpha()
-            return im
-        except:
-            surf = pygame.Surface((r*2, r*2), pygame.SRCALPHA)
-            pygame.draw.circle(surf, (100, 150, 255), (r, r), r)
-            return surf
-
-    # ----------------- FÍSICA RELATIVISTA -----------------
-    def compute_relativistic_drift(self, mass_earths, r_km, planet_r_km):
-        M = earth_masses_to_kg(mass_earths)
-        r = r_km * 1000
-        c = 299792458
-
-        # velocidad orbital newtoniana
-        v = math.sqrt(G * M / r)
-
-        # dilataciones
-        dt_grav = G*M/(c*c) * (1/r - 1/(planet_r_km*1000))
-        dt_vel = -v*v/(2*c*c)
-
-        total = dt_grav + dt_vel
-        return total*86400*1e6, dt_grav*86400*1e6, dt_vel*86400*1e6
-
-    # ----------------- MAIN LOOP -----------------
-    def run(self):
-        running = True
-        angle = 0
-
-        while running:
-            for ev in pygame.event.get():
-                if ev.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                if ev.type == pygame.KEYDOWN and ev.key == pygame.K_ESCAPE:
-                    return
-                if self.btn_back.handle(ev):
-                    return
-
-                self.slider_mass.handle(ev)
-                self.slider_radius.handle(ev)
-                self.slider_distance.handle(ev)
-
-            # ==== fondo estrellado ====
-            draw_radial_gradient(
-                self.screen,
-                (self.W//2, self.H//2),
-                max(self.W, self.H),
-                (15, 15, 30),
-                (5, 5, 15)
-            )
-
-            self.star_phase += 0.35
-            draw_stars(self.screen, self.stars, self.star_phase)
-
-            # ==== valores ====
-            R = self.slider_radius.value
-            M = self.slider_mass.value
-            D = self.slider_distance.value
-
-            # ==== planeta ====
-            cx, cy = self.W//3, self.H//2
-            scale = int(R / 100)
-            planet = pygame.transform.scale(self.planet_img, (scale, scale))
-            self.screen.blit(planet, planet.get_rect(center=(cx, cy)))
-
-            # ==== órbita ====
-            r_px = int(D / 100)
-            pygame.draw.circle(self.screen, (120, 120, 160), (cx, cy), r_px, 1)
-
-            angle += 0.01
-            sx = cx + r_px*math.cos(angle)
-            sy = cy + r_px*math.sin(angle)
-
-            sat = pygame.transform.scale(self.sat_img, (38, 38))
-            self.screen.blit(sat, sat.get_rect(center=(sx, sy)))
-
-            # ==== relatividad ====
-            total, grav, vel = self.compute_relativistic_drift(M, D, R)
-
-            # ==== panel info ====
-            box_x, box_y = self.W - 360, 260
-            box_w, box_h = 330, 380
-            pygame.draw.rect(self.screen, (20, 20, 40, 220),
-                             (box_x, box_y, box_w, box_h), border_radius=12)
-
-            info = [
-                f"Masa planeta: {M:.1f} M_e",
-                f"Radio planeta: {R:,.0f} km",
-                f"Altura satélite: {D-R:,.0f} km",
-                "",
-                "Ajuste relativista:",
-                f"{total: .3f} µs/día",
-                "",
-                "Desglose:",
-                f"  Grav.:  {grav: .3f} µs/día",
-                f"  Vel.:   {vel: .3f} µs/día",
-                "",
-                "• Campo gravitacional acelera",
-                "  el reloj del satélite.",
-                "• La velocidad orbital lo retarda.",
-                "• GPS corrige esta diferencia."
-            ]
-
-            y = box_y + 15
-            for line in info:
-                self.screen.blit(self.small.render(line, True, (230, 230, 250)),
-                                 (box_x + 10, y))
-                y += 22
-
-            # ==== sliders ====
-            self.slider_radius.draw(self.screen)
-            self.slider_mass.draw(self.screen)
-            self.slider_distance.draw(self.screen)
-
-            self.btn_back.draw(self.screen)
-            pygame.display.flip()
-            self.clock.tick(60)
+        return ASSETS.image(path, fallback_radius=r)
+
+    # ----------------- COMANDOS A LA FÍSICA -----------------
+    def send_params(self):
+        R = self.slider_radius.value
+        M = self.slider_mass.value
+        D = self.slider_distance.value
+        view = self.viewport
+        self.command("params", (M, R, D))
+        self.command("view", (view.point((0, 0)), int(D * view.scale), int(R * view.scale) // 2))
+
+    # ----------------- EVENTOS -----------------
+    def scene_event(self, ev):
+        if self.viewport.handle_event(ev):
+            return
+        if ev.type == pygame.KEYDOWN and ev.key == pygame.K_c:
+            self.cycle_constellation()
+        elif ev.type == pygame.KEYDOWN and ev.key == pygame.K_e:
+            self.cycle_eccentricity()
+        elif ev.type == pygame.KEYDOWN and ev.key == pygame.K_h:
+            self.command("positioning", not self._sent.get("positioning", self.snapshot["positioning"]))
+        else:
+            warp = warp_from_key(ev, self._sent.get("warp", self.snapshot["warp"]))
+            if warp is not None:
+                self.command("warp", warp)
+
+    def cycle_constellation(self):
+        n = self.snapshot["n"]
+        bigger = [k for k in CONSTELLATION_SIZES if k > n]
+        self.command("satellites", bigger[0] if bigger else CONSTELLATION_SIZES[0], force=True)
+
+    def cycle_eccentricity(self):
+        e = self._sent.get("eccentricity", self.snapshot["eccentricity"][0])
+        bigger = [k for k in ECCENTRICITIES if k > e]
+        self.command("eccentricity", bigger[0] if bigger else ECCENTRICITIES[0])
+
+    # ----------------- ACTUALIZACIÓN -----------------
+    def apply_quality(self, q):
+        # nivel nuevo del gobernador: estrellas, resolución del fondo (no
+        # hay capas de estela: sólo la base se compone reducida), frecuencia
+        # y suavizado del mapa de error
+        self.command("position_hz", q["position_hz"])
+        self.show_stars(q["stars"])
+        self._heat = (None, None)
+        self.renderer.set_downscale(q["downscale"])
+        self.renderer.invalidate()
+
+    def update(self, dt):
+        self.star_phase += 0.35
+        self.spin_ms += dt
+        self.send_params()
+
+        if self.worker is None:
+            self.physics.advance(dt / 1000)
+            self.physics.write_snapshot(self.snapshot)
+        else:
+            self.snapshot = self.worker.latest() or self.snapshot
+
+    # ----------------- CHECKPOINTS -----------------
+    def save_state(self, state, arrays):
+        state["spin_ms"] = self.spin_ms
+
+    def restore_state(self, state, arrays):
+        self.spin_ms = state["spin_ms"]
+        self._sent = {"warp": self.physics.clock.warp, "eccentricity": self.physics.eccentricity,
+                      "positioning": self.physics.positioning}
+        self.send_params()
+        self.physics.write_snapshot(self.snapshot)
+
+    # ----------------- DIBUJO -----------------
+    def paint_base(self, surface):
+        # ==== fondo estrellado ====
+        draw_background(surface, (15, 15, 30), (5, 5, 15))
+        draw_stars(surface, self.view_stars, self.star_sizes)
+
+        # ==== órbita (el planeta gira: es un sprite, ver planet_sprite) ====
+        # elipse con el planeta en un foco y el perigeo a la derecha
+        D = self.slider_distance.value
+        e = self.snapshot["eccentricity"][1]
+        view = self.viewport
+        orbit = pygame.Rect(0, 0, 2 * int(D * view.scale), 2 * int(D * math.sqrt(1 - e * e) * view.scale))
+        orbit.center = view.point((-D * e, 0))
+        pygame.draw.ellipse(surface, (120, 120, 160), orbit, 1)
+
+    def planet_sprite(self):
+        # frame actual ya escalado al radio (un blit); la imagen fija hasta
+        # que el GIF termine de decodificarse
+        view = self.viewport
+        size = max(1, int(self.slider_radius.value * view.scale))
+        planet = self.planet_anim.frame(size, self.spin_ms)
+        if planet is None:
+            planet = ASSETS.scaled(self.planet_path, (size, size))
+        rect = planet.get_rect(center=view.point((0, 0)))
+        return rect, lambda s: s.blit(planet, rect)
+
+    def heat_sprite(self):
+        # mapa de error (positioning.py) sobre el planeta: sólo se escala la
+        # parte que cae en pantalla, así con zoom no se arma una superficie
+        # de miles de píxeles por lado en cada solución
+        fix = self.snapshot["fix"]
+        if fix is None:
+            return None
+        view = self.viewport
+        size = max(1, int(HEAT_EXTENT * self.slider_radius.value * view.scale))
+        full = pygame.Rect(0, 0, size, size)
+        full.center = view.point((0, 0))
+        key = (fix["version"], tuple(full))
+        if key != self._heat[0]:
+            shown = full.clip(self.screen.get_rect())
+            sprite = None
+            if shown:
+                k = HEAT_RES / size
+                x0, y0 = int((shown.left - full.left) * k), int((shown.top - full.top) * k)
+                x1 = min(HEAT_RES, math.ceil((shown.right - full.left) * k))
+                y1 = min(HEAT_RES, math.ceil((shown.bottom - full.top) * k))
+                source = pygame.image.frombuffer(fix["rgba"].tobytes(), (HEAT_RES, HEAT_RES), "RGBA")
+                source = source.subsurface((x0, y0, x1 - x0, y1 - y0))
+                rect = pygame.Rect(full.left + int(x0 / k), full.top + int(y0 / k), 0, 0)
+                rect.size = (max(1, full.left + int(x1 / k) - rect.left), max(1, full.top + int(y1 / k) - rect.top))
+                scale = pygame.transform.smoothscale if self.quality.settings["glow"] else pygame.transform.scale
+                # al formato de la pantalla: el RGBA de frombuffer se blitea lento
+                sprite = (rect, scale(source, rect.size).convert_alpha())
+            self._heat = (key, sprite)
+        if self._heat[1] is None:
+            return None
+        rect, heat = self._heat[1]
+        return rect, lambda s: s.blit(heat, rect)
+
+    def fix_text(self):
+        snap = self.snapshot
+        if not snap["positioning"]:
+            return "Mapa de error apagado  (tecla H)"
+        if snap["n"] < 4:
+            return "Posición: hacen falta 4 satélites  (tecla C)"
+        fix = snap["fix"]
+        if fix is None or fix["median"] is None:
+            return "Posición: sin solución  (tecla H)"
+        return f"Error: {format_distance(fix['median'])} (máx. {format_distance(fix['max'])})  (H)"
+
+    def paint_overlay(self, surface):
+        R = self.slider_radius.value
+        M = self.slider_mass.value
+        D = self.slider_distance.value
+        snap = self.snapshot
+        total, grav, vel = snap["drift"]
+        low, high = snap["drift_range"]
+        e = snap["eccentricity"][1]
+        periodic = f"  ±{snap['eccentric_ns']:,.1f} ns" if e else ""
+
+        # ==== panel info ====
+        box_x, box_y, box_w, box_h = self.info_rect
+        pygame.draw.rect(surface, (20, 20, 40),
+                         (box_x, box_y, box_w, box_h), border_radius=12)
+
+        info = [
+            f"Masa planeta: {M:.1f} M_e",
+            f"Radio planeta: {R:,.0f} km",
+            f"Altura satélite: {D-R:,.0f} km",
+            f"Satélites: {snap['n']}  (tecla C)",
+            f"Excentricidad: {e:.2f}  (tecla E){periodic}",
+            f"Warp: ×{snap['warp']:,.0f}  (teclas , y .)",
+            f"Zoom: ×{self.viewport.zoom:.2f}  (rueda, clic der., 0)",
+            "F5 guarda el estado, F9 lo recupera",
+            f"Deriva media: {total:+.3f} µs/día",
+            f"  grav. {grav:+.2f}, vel. {vel:+.2f} µs/día",
+        ]
+        if snap["n"] > 1:
+            info.append(f"  rango: {low: .3f} … {high: .3f} µs/día")
+        info += EXPLANATION
+
+        y = box_y + 10
+        for line in info:
+            surface.blit(render_text(self.small, line, (230, 230, 250)),
+                         (box_x + 10, y))
+            y += INFO_LINE
+
+        # ==== error de posición sin corrección relativista ====
+        fx, fy = self.fix_rect.topleft
+        surface.blit(render_text(self.small, self.fix_text(), (230, 230, 250)), (fx, fy))
+        if snap["positioning"]:
+            surface.blit(self.legend, (fx + 40, fy + 28))
+            surface.blit(render_text(self.small, "1 m", (180, 180, 200)), (fx, fy + 23))
+            surface.blit(render_text(self.small, "100 km", (180, 180, 200)), (fx + 196, fy + 23))
+
+        # ==== offset acumulado (drift_timeline.py) ====
+        draw_timeline(surface, self.timeline_rect, snap["timeline"], self.small)
+
+        self.profiler.mark("panels")
+
+        # ==== sliders y botón (superficies cacheadas) ====
+        self.ui.draw(surface)
+        self.profiler.mark("sliders")
+
+    def draw(self):
+        prof = self.profiler
+        r = self.renderer
+        R = self.slider_radius.value
+        M = self.slider_mass.value
+        D = self.slider_distance.value
+
+        # la órbita es parte del fondo: sólo cambia con el slider de altura,
+        # la excentricidad o al mover la vista
+        view = self.viewport
+        snap = self.snapshot
+        if (D, snap["eccentricity"][1], view.version) != self._base_key:
+            if self._base_key is None or view.version != self._base_key[2]:
+                self.place_stars()
+            self._base_key = (D, snap["eccentricity"][1], view.version)
+            r.invalidate()
+        prof.mark("background")
+
+        self.twinkle()
+        prof.mark("stars")
+
+        r.region("info", self.info_rect,
+                 (M, R, D, snap["n"], snap["warp"], snap["drift"], snap["drift_range"], view.zoom,
+                  snap["eccentricity"][1]))
+        r.region("fix", self.fix_rect, (snap["positioning"], self.fix_text()))
+        timeline = snap["timeline"]
+        r.region("timeline", self.timeline_rect, (timeline[0], float(timeline[1][-1]) if timeline[0] else None))
+        prof.mark("panels")
+        for w in self.ui.widgets:
+            r.region(w, w.bounds(), w.state())
+        prof.mark("sliders")
+
+        # ==== satélites: un solo sprite escalado y un solo blits ====
+        # (las coordenadas ya vienen proyectadas en el snapshot, sin los que
+        # pasan por detrás del planeta). Los que caen fuera de pantalla no van
+        # a blits, y el rect sucio es la caja de los dibujados, no la órbita
+        n, coords = snap["n"], snap["coords"]
+        size = sat_sprite_size(n)
+        sat = ASSETS.surface(("premul", self.sat_path, size),
+                             lambda: ASSETS.scaled(self.sat_path, (size, size)).premul_alpha())
+        half = size // 2
+        x, y = coords.T
+        coords = coords[(x > -half) & (x < self.W + half) & (y > -half) & (y < self.H + half)]
+        if len(coords):
+            x, y = coords.T
+            left, top = int(x.min()) - half - 1, int(y.min()) - half - 1
+            sat_rect = pygame.Rect(left, top, int(x.max()) + half + 2 - left, int(y.max()) + half + 2 - top)
+        else:
+            sat_rect = pygame.Rect(0, 0, 0, 0)
+        if n > 1 and not self.quality.settings["glow"]:
+            # calidad mínima: un cuadrado por satélite, todos en un solo scatter
+            flat = max(2, size // 2)
+            draw_sats = lambda s: plot_pixels(s, coords - flat // 2, SAT_FLAT_COLOR, flat)
+        else:
+            draw_sats = lambda s: Constellation.draw(s, sat, coords)
+        sprites = [self.planet_sprite(), self.heat_sprite(), (sat_rect, draw_sats), prof.sprite()]
+        sprites = [sprite for sprite in sprites if sprite]
+
+        r.render(sprites)
+        prof.mark("compose")
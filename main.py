@@ -1,43 +1,45 @@
+import time
+STARTED = time.perf_counter()
+
 import pygame
 import sys
-from ui_elements import Button
-from perihelio import PerihelioSim
-from gps import GPSSim
+from assets import ASSETS
+from text_cache import render_text, wrap_text
+from profiler import FrameProfiler, StartupTimer
+from dirty import DirtyRenderer
+from replay import INPUT
+
+# las escenas (perihelio, gps) se importan recién al abrirlas: el menú no
+# paga ni sus imports ni sus fuentes. RELATIVITY_STARTUP_REPORT=1 muestra
+# cuánto tarda el primer frame del menú.
+STARTUP = StartupTimer(STARTED)
+STARTUP.mark("imports")
+
+# --record / --replay (ver replay.py); repitiendo no se abre ventana
+if __name__ == "__main__":
+    INPUT.configure(sys.argv[1:])
 
 pygame.init()
 
 WIDTH, HEIGHT = 1000, 700
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("Simulador de Relatividad General")
+STARTUP.mark("display")
 
 # --------------------------
-# FUENTES
+# FUENTES (registro compartido, ver assets.py)
 # --------------------------
-
-TITLE_FONT = pygame.font.SysFont("lucida sans", 54, bold=True)
-SMALL = pygame.font.SysFont("lucida sans", 24)
+TITLE_FONT = ("lucida sans", 54, True)
 
 # --------------------------
-# Imagen con aspect ratio fijo
+# Imágenes (carga diferida, ver assets.py)
 # --------------------------
-def load_img_keep_ratio(path, max_w, max_h):
-    img = pygame.image.load(path).convert_alpha()
-    w, h = img.get_size()
-
-    scale = min(max_w / w, max_h / h)  # mantiene proporción
-    new_size = (int(w * scale), int(h * scale))
+BG_PATH = "space_bg.jpg"
+PERI_IMG_PATH = "p.png"
+GPS_IMG_PATH = "gps.png"
+SCENE_IMAGES = ("earth.png", "sat.png")
+MENU_FILL = (8, 8, 20)   # mientras el fondo se decodifica
 
-    return pygame.transform.smoothscale(img, new_size)
-
-
-# --------------------------
-# Cargar imágenes
-# --------------------------
-bg_space = pygame.image.load("space_bg.jpg")
-bg_space = pygame.transform.scale(bg_space, (WIDTH, HEIGHT))
-
-peri_img = load_img_keep_ratio("p.png", 130, 130)
-gps_img = load_img_keep_ratio("gps.png", 130, 130)
 
 # --------------------------
 # Botón estilizado con glow
@@ -47,7 +49,7 @@ class ImageButton:
         self.rect = pygame.Rect(x, y, w, h)
         self.text = text
         self.img = img
-        self.font = pygame.font.SysFont("lucida sans", 20, bold=True)
+        self.font = ASSETS.font("lucida sans", 20, bold=True)
 
         # Glow
         self.glow = pygame.Surface((w + 40, h + 40), pygame.SRCALPHA)
@@ -56,27 +58,7 @@ class ImageButton:
 
     # ----------- NEW: función para dividir texto -----------
     def wrap_text(self, text, max_width):
-        words = text.replace("\n", " \n ").split(" ")
-        lines = []
-        current = ""
-
-        for w in words:
-            if w == "\n":
-                lines.append(current)
-                current = ""
-                continue
-
-            test = current + (" " if current else "") + w
-            if self.font.size(test)[0] <= max_width:
-                current = test
-            else:
-                lines.append(current)
-                current = w
-
-        if current:
-            lines.append(current)
-
-        return lines
+        return wrap_text(self.font, text, max_width)
 
     def draw(self, screen):
         hovered = self.is_hovered()
@@ -105,7 +87,7 @@ class ImageButton:
         start_y = self.rect.bottom - total_height - 18
 
         for i, line in enumerate(lines):
-            surf = self.font.render(line, True, (255, 255, 255))
+            surf = render_text(self.font, line, (255, 255, 255))
             screen.blit(
                 surf,
                 (self.rect.centerx - surf.get_width() // 2,
@@ -113,7 +95,27 @@ class ImageButton:
             )
 
     def is_hovered(self):
-        return self.rect.collidepoint(pygame.mouse.get_pos())
+        return self.rect.collidepoint(INPUT.mouse_pos())
+
+
+# --------------------------
+# ESCENAS
+# --------------------------
+# Una instancia por escena durante toda la sesión: volver al menú no pierde
+# la simulación (estelas, sliders, vista); al reabrirla sigue donde estaba.
+# F5 / F9 dentro de la escena la guardan / recuperan en disco (checkpoint.py).
+SCENES = {}
+
+
+def open_scene(name):
+    if name not in SCENES:
+        if name == "perihelio":
+            from perihelio import PerihelioSim
+            SCENES[name] = PerihelioSim(screen)
+        else:
+            from gps import GPSSim
+            SCENES[name] = GPSSim(screen)
+    return SCENES[name]
 
 
 # --------------------------
@@ -122,49 +124,96 @@ class ImageButton:
 def main_menu():
     clock = pygame.time.Clock()
 
+    # el fondo (JPEG grande) y las imágenes de las escenas se decodifican en
+    # segundo plano; el primer frame sale con un relleno liso
+    ASSETS.preload((BG_PATH,) + SCENE_IMAGES)
+    if INPUT.deterministic:
+        ASSETS.image(BG_PATH)     # grabando / repitiendo: sin carrera con el hilo
+    bg_ready = ASSETS.ready(BG_PATH)
+
     peri_btn = ImageButton(
         WIDTH // 2 - 320, 300, 260, 220,
         "Precesión del Perihelio de Mercurio",
-        peri_img
+        ASSETS.fit(PERI_IMG_PATH, 130, 130)
     )
 
     gps_btn = ImageButton(
         WIDTH // 2 + 60, 300, 260, 220,
         "Navegación por GPS",
-        gps_img
+        ASSETS.fit(GPS_IMG_PATH, 130, 130)
     )
 
-    running = True
-    while running:
-        screen.blit(bg_space, (0, 0))
+    profiler = FrameProfiler("menu")
+    STARTUP.mark("menu setup")
+
+    # capas estáticas: se componen una vez y sólo se repintan las zonas
+    # de los botones cuando cambia el hover
+    def paint_base(surface):
+        if ASSETS.ready(BG_PATH):
+            surface.blit(ASSETS.scaled(BG_PATH, (WIDTH, HEIGHT)), (0, 0))
+        else:
+            surface.fill(MENU_FILL)
 
         # Oscurecer fondo suavemente
         overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
         overlay.fill((0, 0, 0, 90))
-        screen.blit(overlay, (0, 0))
+        surface.blit(overlay, (0, 0))
 
+    def paint_overlay(surface):
         # Título
-        title = TITLE_FONT.render("Simulador de Relatividad General", True, (241, 194, 50))
-        screen.blit(title, (WIDTH//2 - title.get_width()//2, 120))
+        title = render_text(ASSETS.font(*TITLE_FONT), "Simulador de Relatividad General", (241, 194, 50))
+        surface.blit(title, (WIDTH//2 - title.get_width()//2, 120))
 
         # Botones
-        peri_btn.draw(screen)
-        gps_btn.draw(screen)
+        peri_btn.draw(surface)
+        gps_btn.draw(surface)
+
+    renderer = DirtyRenderer(screen, paint_base, paint_overlay, mark=profiler.mark)
 
-        for event in pygame.event.get():
+    running = True
+    while running:
+        profiler.begin_frame()
+        if not bg_ready and ASSETS.ready(BG_PATH):
+            bg_ready = True
+            renderer.invalidate()
+        renderer.region("peri", peri_btn.rect.inflate(40, 40), peri_btn.is_hovered())
+        renderer.region("gps", gps_btn.rect.inflate(40, 40), gps_btn.is_hovered())
+        profiler.mark("panels")
+
+        for event in INPUT.events():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
 
+            if profiler.handle_event(event):
+                continue
+
             if event.type == pygame.MOUSEBUTTONDOWN:
                 if peri_btn.is_hovered():
-                    PerihelioSim(screen).run()
+                    open_scene("perihelio").run()
+                    renderer.invalidate()
+                    profiler.begin_frame()   # no contar la escena como "events"
                 if gps_btn.is_hovered():
-                    GPSSim(screen).run()
+                    open_scene("gps").run()
+                    renderer.invalidate()
+                    profiler.begin_frame()
+        profiler.mark("events")
+
+        sprite = profiler.sprite()
+        renderer.render([sprite] if sprite else [])
+        profiler.mark("compose")
 
-        pygame.display.flip()
-        clock.tick(60)
+        renderer.present()
+        INPUT.frame_done(screen)
+        STARTUP.finish()
+        profiler.mark("flip")
+        profiler.end_frame()
+        INPUT.tick(clock, 60)
 
 
 if __name__ == "__main__":
-    main_menu()
+    try:
+        main_menu()
+    except SystemExit:    # QUIT: las escenas y el menú salen con sys.exit()
+        pass
+    sys.exit(INPUT.close())
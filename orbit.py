@@ -0,0 +1,131 @@
+# orbit.py
+import math
+import numpy as np
+
+# ================================
+# UNIDADES DE SIMULACIÓN
+# ================================
+# GM de la masa central de referencia = 1 y semieje mayor de referencia = 1.
+# Con esas unidades la velocidad de la luz es c / sqrt(GM_sol / a_mercurio).
+GM_SUN = 1.32712440018e20     # m^3/s^2
+A_MERCURY = 5.7909e10         # m
+C_LIGHT = 299792458.0         # m/s
+C_SIM = C_LIGHT / math.sqrt(GM_SUN / A_MERCURY)   # ≈ 6262
+
+STEPS_PER_ORBIT = 360
+DT = 2 * math.pi / STEPS_PER_ORBIT
+
+_W1 = 1 / (2 - 2 ** (1 / 3))
+_W0 = -(2 ** (1 / 3)) * _W1
+# (coeficiente de drift, coeficiente de kick) de cada subpaso
+_YOSHIDA = ((_W1 / 2, _W1), ((_W0 + _W1) / 2, _W0), ((_W0 + _W1) / 2, _W1), (_W1 / 2, 0.0))
+
+
+# ================================
+# INTEGRADOR 1PN (SCHWARZSCHILD)
+# ================================
+# Ecuación de movimiento post-newtoniana de una partícula de prueba:
+#
+#     a = -GM r / |r|^3 * (1 + k * 3 h^2 / (c^2 |r|^2))
+#
+# con h = |r x v| (se conserva) y k el acoplamiento relativista
+# (k = 1 es la relatividad real, k = 0 es Newton). Como h es constante
+# por cuerpo la fuerza sólo depende de la posición y un integrador
+# simpléctico (Yoshida, 4º orden) conserva la energía: la precesión sale de
+# la dinámica y la precesión numérica espuria queda muy por debajo de la
+# relativista. Todos los cuerpos avanzan juntos en arrays.
+class OrbitBatch:
+    def __init__(self, n, mass=1.0, c=C_SIM, dt=DT):
+        self.n = n
+        self.mass = float(mass)
+        self.c = c
+        self.dt = dt
+        self.time = 0.0
+
+        self.pos = np.zeros((n, 2))
+        self.prev_pos = self.pos.copy()    # estado un paso antes (interpolación)
+        self.vel = np.zeros((n, 2))
+        self.coupling = np.zeros(n)
+        self.h2 = np.zeros(n)
+
+    # ---- condiciones iniciales ----
+    def set_kepler(self, idx, a, e, omega=0.0):
+        # cuerpo(s) en el perihelio, girando en el sentido de +theta
+        a = np.asarray(a, dtype=float)
+        e = np.asarray(e, dtype=float)
+        omega = np.asarray(omega, dtype=float)
+        rp = a * (1 - e)
+        vp = np.sqrt(self.mass * (1 + e) / rp)
+        cw, sw = np.cos(omega), np.sin(omega)
+        self.pos[idx, 0] = rp * cw
+        self.pos[idx, 1] = rp * sw
+        self.vel[idx, 0] = -vp * sw
+        self.vel[idx, 1] = vp * cw
+        self.prev_pos[idx] = self.pos[idx]
+        self._update_h()
+
+    def set_mass(self, mass):
+        # misma geometría de órbita, reescalando velocidades: v ~ sqrt(GM)
+        mass = float(mass)
+        if mass == self.mass:
+            return
+        self.vel *= math.sqrt(mass / self.mass)
+        self.mass = mass
+        self._update_h()
+
+    def _update_h(self):
+        h = self.pos[:, 0] * self.vel[:, 1] - self.pos[:, 1] * self.vel[:, 0]
+        self.h2 = h * h
+
+    # ---- dinámica ----
+    def acceleration(self, pos):
+        r2 = np.einsum("ij,ij->i", pos, pos)
+        inv_r3 = r2 ** -1.5
+        corr = 1 + self.coupling * 3 * self.h2 / (self.c * self.c * r2)
+        return pos * (-self.mass * inv_r3 * corr)[:, None]
+
+    def step(self, nsteps=1):
+        # Yoshida de 4º orden: 3 evaluaciones de fuerza por paso
+        dt = self.dt
+        pos, vel = self.pos, self.vel
+        for i in range(nsteps):
+            if i == nsteps - 1:
+                self.prev_pos[:] = pos
+            for c, d in _YOSHIDA:
+                pos += (c * dt) * vel
+                if d:
+                    vel += (d * dt) * self.acceleration(pos)
+        self.time += nsteps * dt
+
+    def rotate(self, idx, angle):
+        # gira órbitas enteras alrededor de la masa central (h no cambia)
+        c, s = np.cos(angle), np.sin(angle)
+        for arr in (self.pos, self.vel, self.prev_pos):
+            x, y = arr[idx, 0].copy(), arr[idx, 1].copy()
+            arr[idx, 0] = c * x - s * y
+            arr[idx, 1] = s * x + c * y
+
+    def interpolated(self, alpha):
+        # posición entre el paso anterior y el actual (0 = anterior, 1 = actual)
+        return self.prev_pos + alpha * (self.pos - self.prev_pos)
+
+    # ---- observables ----
+    def perihelion_angle(self):
+        # dirección del perihelio de la órbita 1PN actual. Con h constante la
+        # órbita cumple u'' + u = GM/h^2 + 3 k GM u^2 / c^2 (u = 1/r); alrededor
+        # de la solución circular u0 es u - u0 = A cos(nu theta - w), así que
+        # el perihelio está en theta - fase / nu. Con k = 0 coincide con el
+        # vector de Runge-Lenz, y a diferencia de él no oscila dentro de cada
+        # vuelta en órbitas casi circulares.
+        x, y = self.pos[:, 0], self.pos[:, 1]
+        vx, vy = self.vel[:, 0], self.vel[:, 1]
+        r = np.hypot(x, y)
+        h = x * vy - y * vx
+        eps = self.coupling * 3 * self.mass / (self.c * self.c)
+        u_newton = self.mass / (h * h)
+        u0 = 2 * u_newton / (1 + np.sqrt(np.maximum(1 - 4 * eps * u_newton, 0.0)))
+        nu = np.sqrt(np.maximum(1 - 2 * eps * u0, 1e-6))
+        du = -(x * vx + y * vy) / (r * h)       # du/dtheta = -r'/h
+        phase = np.arctan2(-du / nu, 1 / r - u0)
+        return np.arctan2(y, x) - phase / nu
+
@@ -1,16 +1,33 @@
 # perihelio.py
 import pygame
 import math
-import random
-import sys
-from ui_elements import BackButtonUI
+import queue
+import numpy as np
+from ui_elements import Slider, CheckboxUI, ButtonUI, WidgetGroup
+from background import draw_background
+from text_cache import render_text
+from assets import ASSETS
+from orbit import OrbitBatch, DT, A_MERCURY
+from precession import arcsec_per_century, perihelion_at, SIM_TIME_UNIT, JULIAN_YEAR, CENTURY, ARCSEC
+from dirty import DirtyRenderer
+from sim_clock import SimClock
+from ring_buffer import RingBuffer
+from trail_canvas import TrailCanvas, MultiTrailCanvas
+from viewport import Viewport
+from scene import Scene, draw_stars
 from config import BACKGROUND, WHITE, YELLOW, RED
 
 # ================================
 # VISUAL CONSTANTS
 # ================================
 ECCENTRICITY = 0.3
-A = 200
+A = 200                  # píxeles por unidad de semieje mayor
+ANIM_RATE = 0.54         # tiempo simulado por segundo a warp 1 (≈ 11.6 s por órbita)
+MAX_WARP_DECADES = 6     # slider de warp: 10^0 … 10^6
+TRAIL_SAMPLE_STEPS = 2   # la estela guarda un punto cada 2 pasos (2°), a cualquier warp
+REPLAY_MAX_STEPS = 128   # grabando / repitiendo: tope fijo de pasos por frame, sin hilo
+GR_DECADES = 6           # precisión 0.0 → acoplamiento relativista 10^6 veces el real
+JUMP_YEARS = 10_000      # tecla J: salto de época con la fórmula cerrada
 SCREEN_CENTER = (450, 350)
 
 COLOR_SOL = YELLOW
@@ -18,290 +35,643 @@ COLOR_NEWTON = RED
 COLOR_REL = (60, 220, 140)
 COLOR_PLANET = (100, 200, 255)
 COLOR_TEXT = WHITE
-MAX_TRAIL_POINTS = 6000
-
+MAX_TRAIL_POINTS = 300_000   # varias revoluciones completas de la roseta
+TRAIL_CHUNK = 256            # puntos por caja del índice espacial de las estelas
+ZOOM_RANGE = (0.25, 40.0)
+TRAIL_FADE_HALF_LIFE = None  # segundos; None = estela permanente
+PANEL_TEXT_Y = 46
+
+EXPLANATION = [
+    "• Newton: órbita kepleriana estable.",
+    "• Relativista: el eje mayor rota lentamente.",
+    "• Precisión = cuánta precesión exageramos.",
+    "• 1.0 = real, 0.0 = súper exagerado.",
+    "• Warp = tiempo simulado por segundo real.",
+    "• Tecla J: saltar 10.000 años de golpe.",
+    "• F5 guarda el estado, F9 lo recupera."
+]
 
 # ================================
-# PREMIUM BACKGROUND HELPERS
+# MULTI-BODY MODES
 # ================================
-def draw_radial_gradient(surface, center, radius, inner_color, outer_color):
-    cx, cy = center
-    for r in range(radius, 0, -1):
-        t = r / radius
-        color = (
-            int(inner_color[0] * t + outer_color[0] * (1 - t)),
-            int(inner_color[1] * t + outer_color[1] * (1 - t)),
-            int(inner_color[2] * t + outer_color[2] * (1 - t)),
-        )
-        pygame.draw.circle(surface, color, (cx, cy), r)
-
-
-def gen_stars(w, h, n=120):
-    return [(random.randint(0, w), random.randint(0, h), random.choice([1, 1, 2])) for _ in range(n)]
-
+# La tecla M recorre los modos. Cada cuerpo relativista tiene una copia
+# newtoniana invisible con la misma órbita inicial: la precesión se mide
+# respecto de ella, igual que en el modo de comparación.
+MODES = ("compare", "planets", "eccentricities", "swarm")
+MODE_LABELS = {
+    "compare": "Newton vs. relatividad",
+    "planets": "Planetas interiores",
+    "eccentricities": "Barrido de excentricidades",
+    "swarm": "Enjambre de partículas",
+}
+# (semieje en unidades del de Mercurio, excentricidad)
+INNER_PLANETS = ((1.0, 0.2056), (1.868, 0.0068), (2.583, 0.0167), (3.935, 0.0934))
+SWARM_SIZE = 400
+SWARM_SEED = 7
+MULTI_TRAIL_VALUES = 4_000_000   # floats de estela repartidos entre los cuerpos
+LINE_TRAIL_MAX_BODIES = 16       # con más cuerpos la estela se dibuja por píxeles
 
-def draw_stars(surface, stars, twinkle_phase):
-    for x, y, s in stars:
-        offset = 0.5 + 0.5 * math.sin((x * 12 + y * 7 + twinkle_phase) * 0.002)
-        size = max(1, int(s * offset))
-        pygame.draw.circle(surface, WHITE, (x, y), size)
+# ================================
+# CHECKPOINTS (F5 / F9, ver checkpoint.py)
+# ================================
+CHECKPOINT_CHECKS = ("chk_newton", "chk_rel", "chk_p_new", "chk_p_rel")
 
 
-def draw_sun_glow(surface, x, y):
+# ================================
+# HELPERS
+# ================================
+def mode_bodies(mode):
+    # (a, e, omega, px por unidad) de los cuerpos relativistas del modo
+    if mode == "planets":
+        a, e = np.array(INNER_PLANETS).T
+        omega = np.radians([77.5, 131.6, 102.9, 336.0])
+        return a, e, omega, 300 / (a[-1] * (1 + e[-1]))
+    if mode == "eccentricities":
+        e = np.linspace(0.05, 0.75, 8)
+        return np.ones_like(e), e, np.zeros_like(e), A
+    if mode == "swarm":
+        rng = np.random.default_rng(SWARM_SEED)
+        a = rng.uniform(0.4, 1.4, SWARM_SIZE)
+        e = rng.uniform(0.0, 0.6, SWARM_SIZE)
+        return a, e, rng.uniform(0, 2 * math.pi, SWARM_SIZE), 300 / (1.4 * 1.6)
+    return np.ones(1), np.full(1, ECCENTRICITY), np.zeros(1), A
+
+
+def body_colors(n):
+    colors = []
+    for i in range(n):
+        c = pygame.Color(0)
+        c.hsva = (360 * i / n, 65, 100, 100)
+        colors.append((c.r, c.g, c.b))
+    return colors
+
+
+def make_dot(radius, color):
+    dot = pygame.Surface((radius * 2 + 1, radius * 2 + 1), pygame.SRCALPHA)
+    pygame.draw.circle(dot, color, (radius, radius), radius)
+    return dot
+
+
+def gr_coupling(precision):
+    # 1.0 = relatividad real, cada 1/GR_DECADES menos exagera 10 veces
+    return 10 ** (GR_DECADES * (1 - precision))
+
+
+def make_glow(r, color, alpha):
+    glow = pygame.Surface((r * 2, r * 2), pygame.SRCALPHA)
+    pygame.draw.circle(glow, (color[0], color[1], color[2], alpha), (r, r), r)
+    return glow
+
+
+def draw_sun_glow(surface, x, y, halos=3):
+    # halos: cuántos de los tres halos se dibujan (calidad, ver quality.py)
     pygame.draw.circle(surface, COLOR_SOL, (x, y), 18)
-    for r, a in ((30, 40), (50, 18), (80, 8)):
-        glow = pygame.Surface((r * 2, r * 2), pygame.SRCALPHA)
-        pygame.draw.circle(glow, (COLOR_SOL[0], COLOR_SOL[1], COLOR_SOL[2], a), (r, r), r)
+    for r, a in ((30, 40), (50, 18), (80, 8))[:halos]:
+        glow = ASSETS.surface(("sun_glow", r, a), lambda: make_glow(r, COLOR_SOL, a))
         surface.blit(glow, (x - r, y - r))
 
 
 # ================================
-# UI COMPONENTS — ORIGINAL GPS SLIDER
-# ================================
-class Slider:
-    def __init__(self, x, y, w, min_val, max_val, start_val, step=0.1, label="", ticks=None):
-        # visible bar
-        self.rect = pygame.Rect(x, y, w, 12)
-
-        # BIG clickable area
-        self.grab_rect = pygame.Rect(x, y - 12, w, 36)
-
-        self.min = min_val
-        self.max = max_val
-        self.value = start_val
-        self.label = label
-        self.step = step
-        self.grabbed = False
-        self.ticks = ticks or []
-        self.font = pygame.font.SysFont("arial", 18)
-
-    def handle(self, event):
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            if self.grab_rect.collidepoint(event.pos):     # ← use big hitbox
-                self.grabbed = True
-
-        elif event.type == pygame.MOUSEBUTTONUP:
-            self.grabbed = False
-
-        elif event.type == pygame.MOUSEMOTION and self.grabbed:
-            mx = max(self.rect.left, min(event.pos[0], self.rect.right))
-            t = (mx - self.rect.left) / self.rect.width
-            raw = self.min + t * (self.max - self.min)
-            self.value = round(raw / self.step) * self.step
-
-    def draw(self, screen):
-        # label
-        txt = f"{self.label}: {self.value:.2f}"
-        screen.blit(self.font.render(txt, True, (230, 230, 250)), (self.rect.x, self.rect.y - 25))
-
-        # baseline
-        pygame.draw.rect(screen, (220, 220, 240), self.rect)
-
-        # ticks
-        for tval in self.ticks:
-            px = self.rect.x + (tval - self.min) / (self.max - self.min) * self.rect.width
-            pygame.draw.line(screen, (150, 150, 200), (px, self.rect.y - 6), (px, self.rect.y + 6), 2)
-
-        # handle
-        t = (self.value - self.min) / (self.max - self.min)
-        hx = self.rect.x + int(t * self.rect.width)
-        pygame.draw.circle(screen, (100, 150, 255), (hx, self.rect.y + 6), 10)
-
-# ================================
-# Checkbox + Button
+# PHYSICS MODEL
 # ================================
-class CheckboxUI:
-    def __init__(self, x, y, label, checked=True):
-        self.rect = pygame.Rect(x, y, 18, 18)
-        self.label = label
-        self.checked = checked
-        self.font = pygame.font.SysFont("arial", 16)
-
-    def draw(self, screen):
-        pygame.draw.rect(screen, (80, 85, 100), self.rect, border_radius=3)
-        if self.checked:
-            pygame.draw.rect(screen, (220, 220, 220), self.rect.inflate(-4, -4), border_radius=3)
-
-        screen.blit(self.font.render(self.label, True, WHITE), (self.rect.right + 6, self.rect.y - 2))
-
-
-class ButtonUI:
-    def __init__(self, x, y, w, h, label):
-        self.rect = pygame.Rect(x, y, w, h)
-        self.label = label
-        self.font = pygame.font.SysFont("arial", 16)
-
-    def draw(self, screen):
-        pygame.draw.rect(screen, (70, 75, 90), self.rect, border_radius=8)
-        t = self.font.render(self.label, True, WHITE)
-        screen.blit(t, (self.rect.centerx - t.get_width() // 2, self.rect.centery - t.get_height() // 2))
+# Todo el estado físico de la escena, sin pygame: lo avanza PerihelioSim en
+# el mismo hilo (frame(), benchmarks, export) o un SimWorker en run(). Los
+# sliders llegan como comandos con apply(); las muestras de estela salen por
+# la cola `samples` etiquetadas con la generación (cada cambio de modo es
+# una generación nueva) y el resto del estado visible por write_snapshot().
+# Las muestras están en coordenadas de mundo (unidades de semieje); el
+# Viewport de la escena las lleva a pantalla.
+class PerihelioPhysics:
+    def __init__(self, mode, coupling, mass, warp=1.0):
+        self.clock = SimClock(DT, rate=ANIM_RATE, warp=warp)
+        self.samples = queue.SimpleQueue()
+        self.generation = 0
+        self.coupling = coupling
+        self.mass = mass
+        self.trail_steps = TRAIL_SAMPLE_STEPS
+        self.set_mode(mode)
+
+    def set_mode(self, mode):
+        # cuerpos 0..n-1 = copias newtonianas (acoplamiento 0),
+        # cuerpos n..2n-1 = relativistas; todos avanzan en el mismo OrbitBatch
+        self.mode = mode
+        a, e, omega, self.scale = mode_bodies(mode)
+        n = self.n = len(a)
+        self.body_a = a
+        self.body_e = e
+        self.orbits = OrbitBatch(2 * n, mass=self.mass)
+        self.orbits.set_kepler(slice(None), np.tile(a, 2), np.tile(e, 2), np.tile(omega, 2))
+        self.orbits.coupling[n:] = self.coupling
+        self.phi_rel = np.zeros(n)       # precesión medida en la integración (rad)
+        self.phi_jump = np.zeros(n)      # precesión saltada con la tecla J (rad)
+        self.jump_time = 0.0             # tiempo saltado (unidades de orbit.py)
+        self._peri_delta = self.peri_delta()
+        self._since_sample = 0
+        self.clock.reset()
+        self.generation += 1
+
+    def apply(self, name, value):
+        if name == "mode":
+            self.set_mode(value)
+        elif name == "warp":
+            self.clock.set_warp(value)
+        elif name == "jump":
+            self.jump(value)
+        elif name == "trail_steps":
+            self.trail_steps = value
+        elif name in ("coupling", "mass"):
+            # cambia la forma de la órbita 1PN: se vuelve a tomar la referencia
+            # para no sumar ese salto como precesión
+            setattr(self, name, value)
+            self.orbits.coupling[self.n:] = self.coupling
+            self.orbits.set_mass(self.mass)
+            self._peri_delta = self.peri_delta()
+
+    def jump(self, years):
+        # salto de época en O(1): la fórmula cerrada dice cuánto giró cada
+        # perihelio (con la misma exageración que la integración) y se giran
+        # las órbitas relativistas enteras; la fase dentro de la órbita no se
+        # toca. Ángulo y tiempo saltados van aparte de phi_rel y orbits.time:
+        # la tasa "medida" sale sólo de lo integrado, no de la fórmula.
+        # Es una generación nueva, así la estela vieja no se une a la nueva
+        n = self.n
+        dphi = perihelion_at(0.0, self.mass, self.body_a * A_MERCURY, self.body_e, years, self.coupling)
+        self.orbits.rotate(slice(n, None), dphi)
+        self.jump_time += years * JULIAN_YEAR / SIM_TIME_UNIT
+        self.phi_jump += dphi
+        self._peri_delta = self.peri_delta()
+        self.clock.reset()
+        self.generation += 1
+
+    def peri_delta(self):
+        # perihelio relativista respecto del newtoniano (así se cancela el
+        # error numérico común a los dos cuerpos)
+        peri = self.orbits.perihelion_angle()
+        return peri[self.n:] - peri[:self.n]
+
+    def advance(self, real_dt):
+        clock = self.clock
+        samples = clock.timed(self.run_steps, clock.tick(real_dt))
+        if samples:
+            self.samples.put((self.generation, np.array(samples)))
+
+    def run_steps(self, steps):
+        # avanza de a trail_steps pasos (TRAIL_SAMPLE_STEPS, más con calidad
+        # reducida); en cada muestra se mide la precesión y se guarda la
+        # posición de las estelas, así ni el desenrollado del ángulo ni la
+        # estela dependen del warp
+        drawn = slice(0, 2) if self.mode == "compare" else slice(self.n, None)
+        samples = []
+        while steps > 0:
+            k = min(steps, max(self.trail_steps - self._since_sample, 1))
+            self.orbits.step(k)
+            steps -= k
+            self._since_sample += k
+            if self._since_sample >= self.trail_steps:
+                self._since_sample = 0
+                delta = self.peri_delta()
+                self.phi_rel += (delta - self._peri_delta + math.pi) % (2 * math.pi) - math.pi
+                self._peri_delta = delta
+                samples.append(self.orbits.pos[drawn].copy())
+        return samples
+
+    # ---- checkpoints ----
+    def checkpoint(self):
+        # (escalares, arrays); el modo reconstruye cuerpos, escala y colores
+        o = self.orbits
+        state = {"mode": self.mode, "coupling": self.coupling, "mass": self.mass,
+                 "time": o.time, "jump_time": self.jump_time, "since_sample": self._since_sample,
+                 "clock": self.clock.checkpoint()}
+        arrays = {"orbit_pos": o.pos, "orbit_prev_pos": o.prev_pos, "orbit_vel": o.vel, "orbit_h2": o.h2,
+                  "phi_rel": self.phi_rel, "phi_jump": self.phi_jump, "peri_delta": self._peri_delta}
+        return state, arrays
+
+    def restore(self, state, arrays):
+        self.coupling = state["coupling"]
+        self.mass = state["mass"]
+        self.set_mode(state["mode"])     # generación nueva: se descartan las muestras viejas
+        o = self.orbits
+        o.pos[:] = arrays["orbit_pos"]
+        o.prev_pos[:] = arrays["orbit_prev_pos"]
+        o.vel[:] = arrays["orbit_vel"]
+        o.time = state["time"]
+        self.jump_time = state["jump_time"]
+        o.h2[:] = arrays["orbit_h2"]
+        self.phi_rel[:] = arrays["phi_rel"]
+        self.phi_jump[:] = arrays["phi_jump"]
+        self._peri_delta[:] = arrays["peri_delta"]
+        self._since_sample = state["since_sample"]
+        self.clock.restore(state["clock"])
+
+    # ---- snapshots ----
+    def make_snapshot(self):
+        return {}
+
+    def write_snapshot(self, snap):
+        # el dibujo interpola entre el último paso y el anterior
+        pos = snap.get("pos")
+        if pos is None or pos.shape != self.orbits.pos.shape:
+            pos = snap["pos"] = np.empty_like(self.orbits.pos)
+            snap["phi_rel"] = np.empty(self.n)
+            snap["phi_jump"] = np.empty(self.n)
+        np.copyto(pos, self.orbits.interpolated(self.clock.alpha))
+        np.copyto(snap["phi_rel"], self.phi_rel)
+        np.copyto(snap["phi_jump"], self.phi_jump)
+        snap.update(generation=self.generation, mode=self.mode, n=self.n, scale=self.scale,
+                    body_a=self.body_a, body_e=self.body_e, coupling=self.coupling,
+                    time=self.orbits.time, jump_time=self.jump_time, mass=self.orbits.mass,
+                    warp=self.clock.warp, effective_warp=self.clock.effective_warp)
 
 
 # ================================
 # MAIN SIMULATOR
 # ================================
-class PerihelioSim:
-    def __init__(self, screen):
-        self.screen = screen
-        self.W, self.H = screen.get_size()
-        self.clock = pygame.time.Clock()
-        self.btn_back = BackButtonUI()
+class PerihelioSim(Scene):
+    SCENE = "perihelio"
+    CHECKPOINT_SLIDERS = ("slider_warp", "slider_precision", "slider_mass")
+
+    def __init__(self, screen, mode="compare"):
+        super().__init__(screen)
 
-        # stars
-        self.stars = gen_stars(self.W, self.H, 140)
-        self.star_phase = 0
+        # vista: mundo (unidades de semieje) → pantalla; la escala base la fija el modo
+        self.viewport = Viewport(SCREEN_CENTER, A, ZOOM_RANGE, (self.W, self.H))
+        self._view_version = self.viewport.version
 
-        # physics
-        self.theta = 0
-        self.phi_rel = 0
+        self.init_stars(140)
 
-        # trails
-        self.trail_newton = []
-        self.trail_rel = []
+        self.frame_dt = 0.0
+
+        # trails (modo de comparación; los multi-cuerpo se crean en set_view)
+        self.trail_newton = RingBuffer(MAX_TRAIL_POINTS, chunk=TRAIL_CHUNK)
+        self.trail_rel = RingBuffer(MAX_TRAIL_POINTS, chunk=TRAIL_CHUNK)
+        self.canvas_newton = TrailCanvas((self.W, self.H), COLOR_NEWTON, style="dots",
+                                         width=2, dot_spacing=4, fade_half_life=TRAIL_FADE_HALF_LIFE)
+        self.canvas_rel = TrailCanvas((self.W, self.H), COLOR_REL, style="line",
+                                      width=2, fade_half_life=TRAIL_FADE_HALF_LIFE)
 
         # sliders (GPS STYLE)
-        self.slider_speed = Slider(120, self.H - 72, 420, 1, 30, 1, step=1, label="Velocidad (x)")
-        self.slider_precision = Slider(560, self.H - 72, 320, 0, 1, 0.5, step=0.01, label="Precisión", ticks=[0.5])
+        self.slider_warp = Slider(60, self.H - 72, 260, 0, MAX_WARP_DECADES, 0, step=0.1,
+                                  label="Warp (10^x)", ticks=[3])
+        self.slider_precision = Slider(360, self.H - 72, 260, 0, 1, 0.1, step=0.01, label="Precisión", ticks=[0.5])
+        self.slider_mass = Slider(660, self.H - 72, 260, 0.5, 2.0, 1.0, step=0.05,
+                                  label="Masa central (M_sol)", ticks=[1.0])
 
         # toggles & button
         self.chk_newton = CheckboxUI(0, 0, "Newton (punteado)", True)
         self.chk_rel = CheckboxUI(0, 0, "Relativista (línea)", True)
         self.chk_p_new = CheckboxUI(0, 0, "Planeta Newton", True)
         self.chk_p_rel = CheckboxUI(0, 0, "Planeta Rel", True)
-        self.btn_clear = ButtonUI(0, 0, 120, 36, "Limpiar Trails")
+        self.btn_clear = ButtonUI(0, 0, 120, 36, "Limpiar Trails", on_click=self.clear_trails)
+        self.ui = WidgetGroup([self.slider_warp, self.slider_precision, self.slider_mass,
+                               self.chk_newton, self.chk_rel, self.chk_p_new, self.chk_p_rel,
+                               self.btn_clear, self.btn_back])
 
         # fonts
-        self.font = pygame.font.SysFont("arial", 18)
-        self.small = pygame.font.SysFont("arial", 14)
-
-    def ellipse_point(self, f1, phi, theta, a=A, e=ECCENTRICITY):
-        r = (a * (1 - e * e)) / (1 + e * math.cos(theta - phi))
-        return int(f1[0] + r * math.cos(theta)), int(f1[1] + r * math.sin(theta))
+        self.font = ASSETS.font("arial", 18)
+        self.small = ASSETS.font("arial", 14)
+
+        self.layout()
+        self.renderer = DirtyRenderer(screen, self.paint_base, self.paint_overlay, mark=self.profiler.mark)
+
+        self.physics = PerihelioPhysics(mode, gr_coupling(self.slider_precision.value),
+                                        self.slider_mass.value, 10 ** self.slider_warp.value)
+        self.sim_clock = self.physics.clock
+        self.snapshot = self.physics.make_snapshot()
+        self.physics.write_snapshot(self.snapshot)
+        self.generation = None
+        self.set_view(self.snapshot)
+
+    def set_view(self, snap):
+        # estelas y sprites para el modo del snapshot (nueva generación)
+        self.generation = snap["generation"]
+        self.mode = mode = snap["mode"]
+        n = self.n = snap["n"]
+        self.viewport.set_base_scale(snap["scale"])
+        self.pos_new = self.pos_rel = self.viewport.point((0, 0))
+        self.body_px = np.tile(self.pos_new, (n, 1)).astype(float)
+
+        if mode == "compare":
+            self.trail_bodies = self.canvas_bodies = None
+        else:
+            colors = body_colors(n)
+            capacity = min(MAX_TRAIL_POINTS, MULTI_TRAIL_VALUES // (2 * n))
+            self.trail_bodies = RingBuffer(capacity, width=2 * n, chunk=TRAIL_CHUNK)
+            self.canvas_bodies = MultiTrailCanvas(
+                (self.W, self.H), colors, width=1, fade_half_life=TRAIL_FADE_HALF_LIFE,
+                style="line" if n <= LINE_TRAIL_MAX_BODIES else "pixels")
+            radius = 5 if n <= LINE_TRAIL_MAX_BODIES else 2
+            self.body_dot_r = radius
+            self.body_dots = [make_dot(radius, c) for c in colors]
+            self.trail_quality(self.canvas_bodies)
+        self.clear_trails()
+
+    def trail_quality(self, canvas):
+        q = self.quality.settings
+        canvas.set_quality(q["downscale"], q["trail_px"])
+
+    def apply_quality(self, q):
+        # nivel nuevo del gobernador: estrellas, halos, estelas y muestreo
+        self.show_stars(q["stars"])
+        for canvas in (self.canvas_newton, self.canvas_rel, self.canvas_bodies):
+            if canvas is not None:
+                self.trail_quality(canvas)
+        self.command("trail_steps", TRAIL_SAMPLE_STEPS * q["trail_steps"])
+        self.renderer.set_downscale(q["downscale"])
+        self.renderer.invalidate()
+
+    def set_mode(self, mode):
+        self.command("mode", mode, force=True)
+
+    def cycle_mode(self):
+        self.set_mode(MODES[(MODES.index(self.mode) + 1) % len(MODES)])
+
+    def layout(self):
+        box_w, box_h = 340, 312
+        box_x, box_y = self.W - box_w - 20, 40
+        self.panel_rect = pygame.Rect(box_x, box_y, box_w, box_h)
+        self._panel_bg = None
+        self.warp_rect = pygame.Rect(box_x + 12, box_y + PANEL_TEXT_Y, box_w - 24, 18)
+        self.rate_rect = pygame.Rect(box_x + 12, box_y + PANEL_TEXT_Y + 40, box_w - 24, 18)
+        self.epoch_rect = pygame.Rect(box_x + 12, box_y + PANEL_TEXT_Y + 60, box_w - 24, 18)
+        self.precision_rect = pygame.Rect(box_x + 12, box_y + PANEL_TEXT_Y + 20, box_w - 24, 18)
+        self.slider_panel_rect = pygame.Rect(0, self.H - 110, self.W, 110)
+        self.mode_rect = pygame.Rect(20, self.H - 136, 420, 20)
+        self.zoom_rect = pygame.Rect(20, self.H - 156, 420, 20)
+
+        # checkboxes + button positions
+        yy = PANEL_TEXT_Y + 84 + 16 * len(EXPLANATION)
+        offset = 78   # las casillas quedan debajo del panel, no sobre la explicación
+
+        self.chk_newton.place(box_x + 12, box_y + yy + 6  + offset)
+        self.chk_rel.place(box_x + 12, box_y + yy + 32 + offset)
+        self.chk_p_new.place(box_x + 12, box_y + yy + 58 + offset)
+        self.chk_p_rel.place(box_x + 12, box_y + yy + 84 + offset)
+
+        self.btn_clear.place(box_x + box_w - 140, box_y + box_h - 48)
+
+    def measured_rate(self):
+        # ″/siglo medidos por la integración, uno por cuerpo relativista (sin
+        # los saltos de la tecla J, que salen de la fórmula)
+        snap = self.snapshot
+        if snap["time"] <= 0:
+            return np.zeros(snap["n"])
+        seconds = snap["time"] * SIM_TIME_UNIT
+        return snap["phi_rel"] / seconds * CENTURY / ARCSEC
+
+    def theory_rate(self):
+        # ″/siglo de la fórmula cerrada con la exageración actual (precisión
+        # 1.0 → acoplamiento 1 → la tasa real, 42.98″/siglo para Mercurio)
+        snap = self.snapshot
+        return snap["coupling"] * arcsec_per_century(snap["mass"], snap["body_a"] * A_MERCURY, snap["body_e"])
+
+    def epoch_years(self):
+        snap = self.snapshot
+        return (snap["time"] + snap["jump_time"]) * SIM_TIME_UNIT / JULIAN_YEAR
 
     def clear_trails(self):
         self.trail_newton.clear()
         self.trail_rel.clear()
-
-    def run(self):
-        running = True
-        while running:
-            dt = self.clock.tick(60)
-
-            # ---- EVENTS ----
-            for ev in pygame.event.get():
-                if ev.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                if ev.type == pygame.KEYDOWN and ev.key == pygame.K_ESCAPE:
-                    return
-                if self.btn_back.handle(ev):
-                    return
-
-                self.slider_speed.handle(ev)
-                self.slider_precision.handle(ev)
-
-                if ev.type == pygame.MOUSEBUTTONDOWN:
-                    for chk in [self.chk_newton, self.chk_rel, self.chk_p_new, self.chk_p_rel]:
-                        if chk.rect.collidepoint(ev.pos):
-                            chk.checked = not chk.checked
-
-                    if self.btn_clear.rect.collidepoint(ev.pos):
-                        self.clear_trails()
-
-            # ---- UPDATE ----
-            self.star_phase += dt * 0.02
-
-            speed = self.slider_speed.value
-            self.theta += 0.009 * speed
-
-            precision = self.slider_precision.value
-            exaggeration = (1 - precision) * 25
-            self.phi_rel += 0.0007 * exaggeration
-
-            x_new, y_new = self.ellipse_point(SCREEN_CENTER, 0, self.theta)
-            x_rel, y_rel = self.ellipse_point(SCREEN_CENTER, self.phi_rel, self.theta)
-
-            self.trail_newton.append((x_new, y_new))
-            if len(self.trail_newton) > MAX_TRAIL_POINTS:
-                self.trail_newton.pop(0)
-
-            self.trail_rel.append((x_rel, y_rel))
-            if len(self.trail_rel) > MAX_TRAIL_POINTS:
-                self.trail_rel.pop(0)
-
-            # ---- DRAW ----
-            draw_radial_gradient(self.screen, (self.W // 2, self.H // 2), max(self.W, self.H),
-                                 (20, 24, 40), BACKGROUND)
-            draw_stars(self.screen, self.stars, self.star_phase)
-
-            draw_sun_glow(self.screen, SCREEN_CENTER[0], SCREEN_CENTER[1])
-
-            # Trails
+        self.canvas_newton.invalidate()
+        self.canvas_rel.invalidate()
+        if self.trail_bodies is not None:
+            self.trail_bodies.clear()
+            self.canvas_bodies.invalidate()
+        self.renderer.invalidate()
+
+    # ---- EVENTS ----
+    def scene_event(self, ev):
+        if ev.type == pygame.KEYDOWN and ev.key == pygame.K_m:
+            self.cycle_mode()
+        elif ev.type == pygame.KEYDOWN and ev.key == pygame.K_j:
+            self.command("jump", JUMP_YEARS, force=True)
+        else:
+            self.viewport.handle_event(ev)
+
+    # ---- UPDATE ----
+    def update(self, dt):
+        self.frame_dt = dt / 1000
+        self.star_phase += dt * 0.02
+
+        self.command("coupling", gr_coupling(self.slider_precision.value))
+        self.command("mass", self.slider_mass.value)
+        self.command("warp", 10 ** self.slider_warp.value)
+
+        if self.worker is None:
+            self.physics.advance(dt / 1000)
+            self.physics.write_snapshot(self.snapshot)
+        else:
+            self.snapshot = self.worker.latest() or self.snapshot
+        snap = self.snapshot
+        if snap["generation"] != self.generation:
+            self.set_view(snap)
+
+        # muestras de estela de la generación actual (las de un modo
+        # anterior se descartan)
+        samples = []
+        while True:
+            try:
+                generation, pts = self.physics.samples.get_nowait()
+            except queue.Empty:
+                break
+            if generation == self.generation:
+                samples.append(pts)
+        pts = np.concatenate(samples) if samples else None
+
+        pos = self.viewport.to_screen(snap["pos"])
+        if self.mode == "compare":
+            if pts is not None:
+                self.trail_newton.extend(pts[:, 0])
+                self.trail_rel.extend(pts[:, 1])
+            self.pos_new = int(pos[0, 0]), int(pos[0, 1])
+            self.pos_rel = int(pos[1, 0]), int(pos[1, 1])
+        else:
+            # una fila (x0, y0, x1, y1, ...) por muestra para todas las estelas
+            if pts is not None:
+                self.trail_bodies.extend(pts.reshape(len(pts), -1))
+            self.body_px = pos[self.n:]
+
+    # ---- CHECKPOINTS ----
+    def trails(self):
+        if self.mode == "compare":
+            return {"trail_newton": self.trail_newton, "trail_rel": self.trail_rel}
+        return {"trail_bodies": self.trail_bodies}
+
+    def save_state(self, state, arrays):
+        trails = self.trails()
+        state["checks"] = {name: getattr(self, name).checked for name in CHECKPOINT_CHECKS}
+        state["trail_totals"] = {name: trail.total for name, trail in trails.items()}
+        for name, trail in trails.items():
+            arrays[name] = trail.view()
+            arrays[name + "_bounds"] = trail._bounds
+
+    def restore_state(self, state, arrays):
+        # física, sliders y vista ya están; set_view arma las estelas del modo
+        # y recién ahí se llenan con las del archivo (los canvas se rehacen
+        # solos en el próximo draw, con el culling y el LOD de siempre)
+        for name, value in state["checks"].items():
+            getattr(self, name).checked = value
+        self._sent = {"coupling": gr_coupling(self.slider_precision.value),
+                      "mass": self.slider_mass.value,
+                      "warp": 10 ** self.slider_warp.value}
+        self.physics.write_snapshot(self.snapshot)
+        self.set_view(self.snapshot)
+        for name, trail in self.trails().items():
+            trail.restore(arrays[name], state["trail_totals"][name], arrays[name + "_bounds"])
+
+    # ---- DRAW ----
+    def paint_base(self, surface):
+        draw_background(surface, (20, 24, 40), BACKGROUND)
+        draw_stars(surface, self.view_stars, self.star_sizes)
+        draw_sun_glow(surface, *self.viewport.point((0, 0)), halos=self.quality.settings["glow"])
+
+    def panel_background(self):
+        if self._panel_bg is None:
+            box_w, box_h = self.panel_rect.size
+            panel = self._panel_bg = pygame.Surface((box_w, box_h), pygame.SRCALPHA)
+            pygame.draw.rect(panel, (25, 25, 40, 220), (0, 0, box_w, box_h), border_radius=12)
+            panel.blit(render_text(self.font, "Precesión del Perihelio", WHITE), (12, 12))
+            yy = PANEL_TEXT_Y + 84
+            for line in EXPLANATION:
+                panel.blit(render_text(self.small, line, WHITE), (12, yy))
+                yy += 16
+        return self._panel_bg
+
+    def paint_overlay(self, surface):
+        precision = self.slider_precision.value
+        box_x, box_y, box_w, box_h = self.panel_rect
+
+        # ---- RIGHT PANEL ----
+        # fondo, título y explicación no cambian: se arman una sola vez
+        surface.blit(self.panel_background(), (box_x, box_y))
+
+        yv = box_y + PANEL_TEXT_Y
+        surface.blit(render_text(self.small, self.warp_text(), WHITE), (box_x + 12, yv))
+        surface.blit(render_text(self.small, self.precision_text(precision), WHITE), (box_x + 12, yv + 20))
+        surface.blit(render_text(self.small, self.rate_text(), WHITE), (box_x + 12, yv + 40))
+        surface.blit(render_text(self.small, self.epoch_text(), WHITE), (box_x + 12, yv + 60))
+
+        # bottom slider panel
+        pygame.draw.rect(surface, (18, 18, 28), self.slider_panel_rect)
+
+        surface.blit(render_text(self.small, self.mode_text(), (200, 200, 220)), self.mode_rect.topleft)
+        surface.blit(render_text(self.small, self.zoom_text(), (160, 160, 190)), self.zoom_rect.topleft)
+
+        # widgets: un blit de la superficie cacheada de cada uno
+        self.profiler.mark("panels")
+        self.ui.draw(surface)
+        self.profiler.mark("sliders")
+
+    def warp_text(self):
+        snap = self.snapshot
+        achieved = float(f"{snap['effective_warp']:.2g}")
+        return f"Warp: ×{snap['warp']:,.0f}  (logrado ×{achieved:,.0f})"
+
+    def precision_text(self, precision):
+        return f"Precisión vis.: {precision:.2f}  (×{gr_coupling(precision):,.0f} la real)"
+
+    def rate_text(self):
+        theory, measured = self.theory_rate(), self.measured_rate()
+        if self.n == 1:
+            return f'Teoría {theory[0]:,.2f}"/siglo · medida {measured[0]:,.2f}"/siglo'
+        err = np.abs(measured / theory - 1).max()
+        return f'Teoría {theory.min():,.0f}–{theory.max():,.0f}"/siglo (medida ±{err:.1%})'
+
+    def epoch_text(self):
+        # con saltos J, cuánto giró el perihelio en ellos (fórmula cerrada)
+        text = f"Época: +{self.epoch_years():,.1f} años"
+        jumped = np.abs(self.snapshot["phi_jump"]).max() / ARCSEC
+        if not jumped:
+            return text
+        if jumped >= 360 * 3600:            # exagerado: vueltas enteras
+            angle = f"{jumped / (360 * 3600):,.1f} vueltas"
+        elif jumped >= 3600:
+            angle = f"{jumped / 3600:,.2f}°"
+        else:
+            angle = f'{jumped:,.2f}"'
+        return f"{text}  (J: {'' if self.n == 1 else 'hasta '}+{angle})"
+
+    def mode_text(self):
+        bodies = "1 cuerpo" if self.n == 1 else f"{self.n} cuerpos"
+        return f"Modo: {MODE_LABELS[self.mode]} ({bodies}) — tecla M cambia"
+
+    def zoom_text(self):
+        return f"Zoom ×{self.viewport.zoom:.2f} — rueda / + - acerca, clic derecho arrastra, 0 centra"
+
+    def draw_bodies(self, screen):
+        # un único blits con el punto de cada cuerpo
+        topleft = (self.body_px - self.body_dot_r).astype(np.int32).tolist()
+        screen.blits(zip(self.body_dots, topleft), doreturn=False)
+
+    def bodies_rect(self):
+        lo = self.body_px.min(axis=0) - self.body_dot_r - 1
+        hi = self.body_px.max(axis=0) + self.body_dot_r + 2
+        return pygame.Rect(int(lo[0]), int(lo[1]), int(hi[0] - lo[0]), int(hi[1] - lo[1]))
+
+    def draw(self):
+        prof = self.profiler
+        r = self.renderer
+
+        # zoom / pan: el fondo (sol, estrellas con parallax) se rehace entero;
+        # las estelas se rehacen solas al ver la versión nueva del viewport
+        view = self.viewport
+        if view.version != self._view_version:
+            self._view_version = view.version
+            self.place_stars()
+            r.invalidate()
+        prof.mark("background")
+
+        self.twinkle()
+        prof.mark("stars")
+
+        # Trails (sólo se rasterizan y recomponen los puntos nuevos)
+        layers = []
+        if self.mode == "compare":
+            r.touch(self.canvas_newton.update(self.trail_newton, self.frame_dt, view))
+            r.touch(self.canvas_rel.update(self.trail_rel, self.frame_dt, view))
             if self.chk_newton.checked:
-                s = pygame.Surface((self.W, self.H), pygame.SRCALPHA)
-                for i, p in enumerate(self.trail_newton):
-                    if i % 3 == 0:
-                        pygame.draw.circle(s, COLOR_NEWTON, p, 2)
-                self.screen.blit(s, (0, 0))
-
-            if self.chk_rel.checked and len(self.trail_rel) > 1:
-                pygame.draw.lines(self.screen, COLOR_REL, False, self.trail_rel, 2)
-
-            # planets
+                layers.append(self.canvas_newton.surface)
+            if self.chk_rel.checked:
+                layers.append(self.canvas_rel.surface)
+        else:
+            r.touch(self.canvas_bodies.update(self.trail_bodies, self.frame_dt, view))
+            if self.chk_rel.checked:
+                layers.append(self.canvas_bodies.surface)
+        r.set_layers(layers)
+        prof.mark("trails")
+
+        # UI: cada región se repinta sólo si su contenido cambió
+        r.region("precision", self.precision_rect, self.slider_precision.value)
+        r.region("warp", self.warp_rect, self.warp_text())
+        r.region("rate", self.rate_rect, self.rate_text())
+        r.region("epoch", self.epoch_rect, self.epoch_text())
+        r.region("mode", self.mode_rect, self.mode_text())
+        r.region("zoom", self.zoom_rect, view.zoom)
+        prof.mark("panels")
+        for w in self.ui.widgets:
+            r.region(w, w.bounds(), w.state())
+        prof.mark("sliders")
+
+        # planets (sprites móviles)
+        sprites = []
+        if self.mode != "compare":
+            if self.chk_p_rel.checked:
+                sprites.append((self.bodies_rect(), self.draw_bodies))
+        else:
             if self.chk_p_new.checked:
-                pygame.draw.circle(self.screen, (200, 200, 200), (x_new, y_new), 6)
-
+                sprites.append((pygame.Rect(0, 0, 15, 15).move(self.pos_new[0] - 7, self.pos_new[1] - 7),
+                                lambda s: pygame.draw.circle(s, (200, 200, 200), self.pos_new, 6)))
             if self.chk_p_rel.checked:
-                pygame.draw.circle(self.screen, COLOR_PLANET, (x_rel, y_rel), 7)
-
-            # ---- RIGHT PANEL ----
-            box_w, box_h = 340, 260
-            box_x, box_y = self.W - box_w - 20, 40
-
-            panel = pygame.Surface((box_w, box_h), pygame.SRCALPHA)
-            pygame.draw.rect(panel, (25, 25, 40, 220), (0, 0, box_w, box_h), border_radius=12)
-
-            panel.blit(self.font.render("Precesión del Perihelio", True, WHITE), (12, 12))
-
-            yv = 46
-            panel.blit(self.small.render(f"Velocidad anim.: {speed:.1f}×", True, WHITE), (12, yv))
-            panel.blit(self.small.render(f"Precisión vis.: {precision:.2f}", True, WHITE), (12, yv + 20))
-
-            explanation = [
-                "• Newton: órbita kepleriana estable.",
-                "• Relativista: el eje mayor rota lentamente.",
-                "• Precisión = cuánta precesión exageramos.",
-                "• 1.0 = real, 0.0 = súper exagerado.",
-                "• Velocidad = rapidez de animación."
-            ]
-            yy = yv + 52
-            for line in explanation:
-                panel.blit(self.small.render(line, True, WHITE), (12, yy))
-                yy += 16
-
-            # checkboxes + button positions
-            offset = 90   # ← bajarlos 50 px
-
-            self.chk_newton.rect.topleft = (box_x + 12, box_y + yy + 6  + offset)
-            self.chk_rel.rect.topleft    = (box_x + 12, box_y + yy + 32 + offset)
-            self.chk_p_new.rect.topleft  = (box_x + 12, box_y + yy + 58 + offset)
-            self.chk_p_rel.rect.topleft  = (box_x + 12, box_y + yy + 84 + offset)
-
-            self.btn_clear.rect.topleft = (box_x + box_w - 140, box_y + box_h - 48)
-
-            # draw UI
-            self.screen.blit(panel, (box_x, box_y))
-            self.chk_newton.draw(self.screen)
-            self.chk_rel.draw(self.screen)
-            self.chk_p_new.draw(self.screen)
-            self.chk_p_rel.draw(self.screen)
-            self.btn_clear.draw(self.screen)
-
-            # bottom slider panel
-            pygame.draw.rect(self.screen, (18, 18, 28, 220), (0, self.H - 110, self.W, 110))
-
-            self.slider_speed.draw(self.screen)
-            self.slider_precision.draw(self.screen)
-
-            self.btn_back.draw(self.screen)
-            pygame.display.flip()
+                sprites.append((pygame.Rect(0, 0, 17, 17).move(self.pos_rel[0] - 8, self.pos_rel[1] - 8),
+                                lambda s: pygame.draw.circle(s, COLOR_PLANET, self.pos_rel, 7)))
+        overlay = prof.sprite()
+        if overlay:
+            sprites.append(overlay)
+
+        r.render(sprites)
+        prof.mark("compose")
+
+    def prepare_replay(self):
+        # la física avanza en este hilo con un tope de pasos que no depende
+        # del tiempo real
+        self.sim_clock.budget_ms = None
+        self.sim_clock.max_steps = REPLAY_MAX_STEPS
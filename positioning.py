@@ -0,0 +1,183 @@
+# positioning.py
+# Posicionamiento con los satélites de la constelación sin la corrección
+# relativista de sus relojes, vectorizado con NumPy para miles de receptores
+# a la vez. GPSSim lo usa para el mapa de error (tecla H).
+#
+# Cada satélite i emite con un reloj que se adelanta drift_i µs/día (drift.py)
+# desde su última sincronización, más el término excéntrico. El segmento de
+# control sincroniza cada reloj una vez por SYNC_INTERVAL, en turnos: los
+# offsets no son iguales para todos, así que el sesgo de reloj del receptor
+# no los absorbe y aparecen como error de posición.
+import math
+
+import numpy as np
+
+from drift import C, eccentric_term
+
+C_KM = C / 1000                      # km/s
+ELEVATION_MASK = math.radians(10)    # satélites más bajos no se usan
+SYNC_INTERVAL = 86400.0              # s entre sincronizaciones de cada reloj
+SOLVER_SATELLITES = 32               # subconjunto fijo de las constelaciones grandes
+GN_ITERATIONS = 10
+GN_TOL_KM = 1e-3      # 1 m: el mapa empieza en 1 m
+
+HEAT_RES = 48        # receptores por lado del mapa
+HEAT_EXTENT = 1.6    # radio del mapa en radios del planeta
+HEAT_ALPHA = 160
+
+# error (log10 de metros) → color
+HEAT_STOPS = np.array([0.0, 1.5, 3.0, 4.0, 5.0])
+HEAT_COLORS = np.array([(40, 90, 220), (40, 200, 130), (240, 220, 60), (245, 130, 40), (220, 40, 40)])
+
+
+def format_distance(km):
+    return f"{km * 1000:,.1f} m" if km < 1 else f"{km:,.1f} km"
+
+
+# ================================
+# RECEPTORES
+# ================================
+def receiver_grid(planet_r_km, res=HEAT_RES, extent=HEAT_EXTENT):
+    # grilla res x res (fila = y) alrededor del planeta, en km: dentro del
+    # disco los receptores están sobre el hemisferio visible (z > 0, hacia
+    # la pantalla), afuera en el plano z = 0 (en el aire, hasta `extent` R)
+    u = ((np.arange(res) + 0.5) / res * 2 - 1) * extent * planet_r_km
+    x, y = np.meshgrid(u, u)
+    z = np.sqrt(np.maximum(planet_r_km ** 2 - x * x - y * y, 0.0))
+    pos = np.stack((x, y, z), axis=-1).reshape(-1, 3)
+    inside = np.hypot(x, y).ravel() <= extent * planet_r_km
+    return pos, inside
+
+
+def solver_subset(n, limit=SOLVER_SATELLITES):
+    # índices fijos repartidos por toda la constelación
+    return np.unique(np.linspace(0, n - 1, min(n, limit)).round().astype(int))
+
+
+# ================================
+# RELOJES Y PSEUDODISTANCIAS
+# ================================
+def clock_errors(drift_us_day, mass_earths, a_km, e, E, elapsed, sync=SYNC_INTERVAL):
+    # adelanto de cada reloj en segundos; el satélite k de n se sincronizó
+    # por última vez hace (elapsed + k/n · sync) mod sync
+    n = len(drift_us_day)
+    age = np.remainder(elapsed + np.arange(n) / n * sync, sync)
+    offset = np.asarray(drift_us_day) * age / 86400
+    if e:
+        offset = offset + eccentric_term(mass_earths, a_km, e, E)
+    return offset * 1e-6
+
+
+# Los arrays satélite x receptor son (S, N): una fila por satélite, así las
+# sumas por receptor recorren el eje 0 (mucho más rápido que filas cortas).
+# Se rehacen en cada frame, así que van en float32 (la mitad de memoria que
+# recorrer); el solver sólo resta cantidades chicas y no pierde precisión.
+def line_of_sight(receivers, satellites, mask=ELEVATION_MASK):
+    # geometría receptor → satélite: vectores (3, S, N) y distancias (S, N)
+    # en km, y peso 1 para los satélites sobre el horizonte local de cada
+    # receptor (elevación >= mask), 0 para el resto. Depende sólo de las
+    # posiciones: si cambian nada más los relojes se vuelve a usar la misma
+    recv = receivers.T.astype(np.float32, order="C")
+    los = satellites.T.astype(np.float32)[:, :, None] - recv[:, None, :]
+    dist = np.sqrt(np.einsum("ksn,ksn->sn", los, los))
+    up = recv / np.sqrt((recv * recv).sum(axis=0))
+    visible = np.einsum("ksn,kn->sn", los, up) >= dist * np.float32(math.sin(mask))
+    return los, dist, visible.astype(np.float32)
+
+
+def observe(sat_clock_s):
+    # pseudodistancia menos distancia geométrica, en km: el receptor tiene el
+    # reloj perfecto y el satélite adelantado, así que queda sólo el adelanto
+    # de cada satélite (S,), igual para todos los receptores
+    return (-C_KM * np.asarray(sat_clock_s)).astype(np.float32)
+
+
+# ================================
+# GAUSS-NEWTON POR LOTES
+# ================================
+# Incógnitas por receptor: el corrimiento respecto de su posición nominal y
+# el sesgo de reloj, (dx, dy, dz, c·sesgo) en km; el corrimiento es
+# directamente el error de posición. Con L el vector al satélite y δ el
+# corrimiento, |L| - |L - δ| = (2 L·δ - |δ|²) / (|L| + |L - δ|): el residuo
+# sale de cantidades del tamaño del error y no de restar distancias de
+# miles de km, por eso alcanza float32. Los satélites bajo el horizonte
+# tienen peso 0.
+#
+# En las ecuaciones normales JᵀWJ la columna del sesgo es toda 1, así que
+# el sesgo se elimina (complemento de Schur) y queda un sistema 3x3
+# simétrico por receptor que se resuelve por cofactores: todo son sumas
+# sobre S y operaciones sobre arrays de N, sin bucles ni linalg por lotes.
+# Los receptores con menos de 4 satélites o geometría degenerada
+# (determinante ~0) no tienen solución (ok = False).
+#
+# `guess` es la solución del frame anterior: los satélites se movieron poco y
+# se hace una sola iteración por llamada (llamada tras llamada es la misma
+# iteración de Gauss-Newton, repartida en frames). Sin ella se arranca de
+# la posición nominal y se itera hasta converger.
+def solve_positions(sight, excess, guess=None, iterations=None, tol=GN_TOL_KM):
+    los, dist, w = sight
+    n = dist.shape[1]
+    count = w.sum(axis=0)
+    ok = count >= 4
+    x = np.zeros((4, n)) if guess is None else guess.T.copy()    # (dx, dy, dz, c·sesgo) por fila
+    if not ok.any():
+        return x.T, ok
+    if iterations is None:
+        iterations = GN_ITERATIONS if guess is None else 1
+    m = np.maximum(count, 1).astype(float)
+    dot = lambda a, b: np.einsum("kn,kn->n", a, b).astype(float)
+
+    for _ in range(iterations):
+        shift = x.astype(np.float32)
+        clock = shift[3]
+        num = np.einsum("ksn,kn->sn", los, 2 * shift[:3]) - (shift[:3] ** 2).sum(axis=0)
+        d = np.sqrt(dist * dist - num)       # |L - δ|
+        res = num / (dist + d)
+        res += excess[:, None] - clock
+        res *= w
+        # filas de J: (δ - L) / |L - δ|, con el peso (0 en los no visibles)
+        ux, uy, uz = rows = np.subtract(shift[:3, None, :], los)
+        rows *= w / d
+        bx, by, bz = ux.sum(axis=0).astype(float), uy.sum(axis=0).astype(float), uz.sum(axis=0).astype(float)
+        gc = res.sum(axis=0).astype(float)
+
+        # JᵀWJ y JᵀWr con el sesgo eliminado (productos por receptor sin temporales)
+        sxx = dot(ux, ux) - bx * bx / m
+        sxy = dot(ux, uy) - bx * by / m
+        sxz = dot(ux, uz) - bx * bz / m
+        syy = dot(uy, uy) - by * by / m
+        syz = dot(uy, uz) - by * bz / m
+        szz = dot(uz, uz) - bz * bz / m
+        hx = dot(ux, res) - bx * gc / m
+        hy = dot(uy, res) - by * gc / m
+        hz = dot(uz, res) - bz * gc / m
+
+        c00, c01, c02 = syy * szz - syz * syz, sxz * syz - sxy * szz, sxy * syz - sxz * syy
+        c11, c12, c22 = sxx * szz - sxz * sxz, sxy * sxz - sxx * syz, sxx * syy - sxy * sxy
+        det = sxx * c00 + sxy * c01 + sxz * c02
+        ok &= np.abs(det) > 1e-9 * m ** 3
+        det = np.where(ok, det, 1.0)
+
+        step = np.empty((4, n))
+        step[0] = (c00 * hx + c01 * hy + c02 * hz) / det
+        step[1] = (c01 * hx + c11 * hy + c12 * hz) / det
+        step[2] = (c02 * hx + c12 * hy + c22 * hz) / det
+        step[3] = (gc - bx * step[0] - by * step[1] - bz * step[2]) / m
+        step[:, ~ok] = 0.0
+        x += step
+        # convergencia cuadrática: después de un paso s queda un error de
+        # ~s² / distancia (con margen 1000 por la geometría)
+        size = np.abs(step).max()
+        if size < tol or size * size / dist.min() < tol * 1e-3:
+            break
+    return x.T, ok
+
+
+def error_colors(error_km, valid):
+    # RGBA uint8 por receptor; sin solución = transparente
+    level = np.log10(np.maximum(error_km * 1000, 1.0))
+    rgba = np.zeros((len(error_km), 4), dtype=np.uint8)
+    for ch in range(3):
+        rgba[:, ch] = np.interp(level, HEAT_STOPS, HEAT_COLORS[:, ch])
+    rgba[:, 3] = np.where(valid, HEAT_ALPHA, 0)
+    return rgba
@@ -0,0 +1,104 @@
+# precession.py
+# Precesión relativista del perihelio en forma cerrada, vectorizada con NumPy:
+#
+#     Δφ = 6π G M / (c² a (1 − e²))   por órbita
+#
+# Sirve para cualquier cuerpo y para arrays de (M, a, e) con broadcasting, y
+# saltar a cualquier época es una sola evaluación (no hace falta integrar).
+# PerihelioSim toma de acá los números de pantalla; también se puede usar
+# sin la UI:
+#
+#   python precession.py                     # planetas interiores
+#   python precession.py --a 0.387 --e 0.2056 --mass 1 --years 10000
+import argparse
+import math
+import sys
+
+import numpy as np
+
+from orbit import GM_SUN, A_MERCURY, C_LIGHT
+
+AU = 1.495978707e11                  # m
+JULIAN_YEAR = 365.25 * 86400         # s
+CENTURY = 100 * JULIAN_YEAR
+ARCSEC = math.pi / (180 * 3600)      # rad
+
+# nombre: (semieje en UA, excentricidad)
+BODIES = {
+    "mercurio": (0.387098, 0.205630),
+    "venus": (0.723332, 0.006772),
+    "tierra": (1.000001, 0.016709),
+    "marte": (1.523679, 0.093400),
+    "icarus": (1.077926, 0.826967),
+}
+
+# unidad de tiempo de orbit.py (GM = 1, a = a_mercurio) en segundos
+SIM_TIME_UNIT = math.sqrt(A_MERCURY ** 3 / GM_SUN)
+
+
+# ================================
+# MODELO (broadcasting de arrays)
+# ================================
+# M en masas solares, a en metros; aceptan escalares o arrays.
+def precession_per_orbit(mass_suns, a_m, e):
+    # rad por órbita
+    gm = GM_SUN * np.asarray(mass_suns, dtype=float)
+    a = np.asarray(a_m, dtype=float)
+    e = np.asarray(e, dtype=float)
+    return 6 * math.pi * gm / (C_LIGHT * C_LIGHT * a * (1 - e * e))
+
+
+def orbital_period(mass_suns, a_m):
+    # segundos
+    gm = GM_SUN * np.asarray(mass_suns, dtype=float)
+    return 2 * math.pi * np.sqrt(np.asarray(a_m, dtype=float) ** 3 / gm)
+
+
+def precession_rate(mass_suns, a_m, e):
+    # rad por segundo
+    return precession_per_orbit(mass_suns, a_m, e) / orbital_period(mass_suns, a_m)
+
+
+def arcsec_per_century(mass_suns, a_m, e):
+    return precession_rate(mass_suns, a_m, e) * CENTURY / ARCSEC
+
+
+def perihelion_at(omega0, mass_suns, a_m, e, years, coupling=1.0):
+    # dirección del perihelio (rad) después de `years` años: O(1) para
+    # cualquier época; `coupling` exagera la tasa como en la simulación
+    return omega0 + coupling * precession_rate(mass_suns, a_m, e) * np.asarray(years, dtype=float) * JULIAN_YEAR
+
+
+def parse_values(text):
+    # "a:b:n" → linspace(a, b, n); "a,b,c" → lista; "a" → un valor
+    if ":" in text:
+        start, stop, num = text.split(":")
+        return np.linspace(float(start), float(stop), int(num))
+    return np.array([float(v) for v in text.split(",")])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precesión relativista del perihelio (fórmula cerrada)")
+    parser.add_argument("--a", help="semieje mayor en UA: a:b:n o lista (por defecto los planetas interiores)")
+    parser.add_argument("--e", default="0", help="excentricidad: a:b:n o lista")
+    parser.add_argument("--mass", default="1", help="masa central en masas solares")
+    parser.add_argument("--years", type=float, default=100.0, help="años a adelantar")
+    args = parser.parse_args(argv)
+
+    if args.a is None:
+        names = list(BODIES)
+        a, e = np.array([BODIES[n] for n in names]).T
+        mass = parse_values(args.mass)
+    else:
+        a, e, mass = np.broadcast_arrays(parse_values(args.a), parse_values(args.e), parse_values(args.mass))
+        names = [f"a={x:g} UA" for x in a]
+
+    rate = arcsec_per_century(mass, a * AU, e)
+    shift = np.degrees(perihelion_at(0.0, mass, a * AU, e, args.years))
+    for name, r, s in zip(names, np.broadcast_to(rate, np.shape(a)), np.broadcast_to(shift, np.shape(a))):
+        print(f"{name:>14}: {r:10.4f}″/siglo   en {args.years:,.0f} años: {s:.6f}°")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+# profiler.py
+import csv
+import os
+import sys
+import time
+from collections import deque
+
+import pygame
+from text_cache import render_text
+from assets import ASSETS
+
+# ================================
+# PER-STAGE FRAME PROFILER
+# ================================
+# Cada bucle de frame llama begin_frame(), luego mark(etapa) al terminar cada
+# etapa y end_frame() después de display.flip(). F3 muestra/oculta un overlay
+# con los promedios móviles; con RELATIVITY_PROFILE_CSV=archivo.csv cada
+# frame se escribe como una fila del CSV.
+#
+#   background  fondo: cambios de vista y repintado completo de la base
+#   stars       titileo de las estrellas
+#   trails      estelas (sólo perihelio)
+#   panels      textos y paneles del overlay (paint_overlay)
+#   sliders     sliders, casillas y botones (paint_overlay)
+#   compose     mezcla de base, capas, sprites y overlay
+STAGES = ("events", "physics", "background", "stars", "trails",
+          "panels", "sliders", "compose", "flip")
+FRAME_BUDGET_MS = 1000 / 60
+TOGGLE_KEY = pygame.K_F3
+CSV_ENV = "RELATIVITY_PROFILE_CSV"
+STARTUP_ENV = "RELATIVITY_STARTUP_REPORT"
+
+_csv_files = {}
+
+
+def _csv_writer(path):
+    # un solo archivo compartido por todas las escenas del proceso
+    entry = _csv_files.get(path)
+    if entry is None:
+        f = open(path, "w", newline="")
+        writer = csv.writer(f)
+        writer.writerow(("scene", "frame") + STAGES + ("total_ms",))
+        entry = _csv_files[path] = (f, writer)
+    return entry
+
+
+def close_csv():
+    for f, _ in _csv_files.values():
+        f.close()
+    _csv_files.clear()
+
+
+class FrameProfiler:
+    def __init__(self, scene, window=120, csv_path=None):
+        self.scene = scene
+        self.window = window
+        self.csv_path = csv_path or os.environ.get(CSV_ENV)
+        self.show_overlay = False
+        self.frame_index = 0
+
+        self._font = None
+        self.reset()
+
+    def reset(self, window=None):
+        if window is not None:
+            self.window = window
+        self._history = {name: deque(maxlen=self.window) for name in STAGES}
+        self._totals = deque(maxlen=self.window)
+        self._current = {}
+        self._frame_start = self._last = time.perf_counter()
+
+    # ---- medición ----
+    def begin_frame(self):
+        self._current = {}
+        self._frame_start = self._last = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self._current[stage] = self._current.get(stage, 0.0) + (now - self._last) * 1000
+        self._last = now
+
+    def end_frame(self):
+        total = (time.perf_counter() - self._frame_start) * 1000
+        for name in STAGES:
+            self._history[name].append(self._current.get(name, 0.0))
+        self._totals.append(total)
+
+        if self.csv_path:
+            f, writer = _csv_writer(self.csv_path)
+            writer.writerow([self.scene, self.frame_index]
+                            + [round(self._current.get(name, 0.0), 4) for name in STAGES]
+                            + [round(total, 4)])
+            if self.frame_index % 60 == 0:
+                f.flush()
+        self.frame_index += 1
+        return total
+
+    def averages(self):
+        out = {name: sum(h) / len(h) for name, h in self._history.items() if h and any(h)}
+        if self._totals:
+            out["total"] = sum(self._totals) / len(self._totals)
+        return out
+
+    # ---- overlay ----
+    def handle_event(self, ev):
+        if ev.type == pygame.KEYDOWN and ev.key == TOGGLE_KEY:
+            self.show_overlay = not self.show_overlay
+            return True
+        return False
+
+    def _overlay_box(self):
+        if self._font is None:
+            self._font = ASSETS.font("consolas", 14)
+
+        avgs = self.averages()
+        total = avgs.pop("total", 0.0)
+        lines = [f"{name:<11}{ms:6.2f} ms" for name, ms in avgs.items()]
+        lines.append(f"{'total':<11}{total:6.2f} ms")
+
+        line_h = self._font.get_height()
+        box = pygame.Surface((170, 10 + line_h * len(lines)), pygame.SRCALPHA)
+        box.fill((0, 0, 0, 170))
+        over = total > FRAME_BUDGET_MS
+        for i, line in enumerate(lines):
+            color = (255, 120, 120) if over and i == len(lines) - 1 else (200, 255, 200)
+            box.blit(render_text(self._font, line, color), (8, 5 + i * line_h))
+        return box
+
+    def sprite(self, x=64, y=12):
+        # (rect, draw) para DirtyRenderer; None si el overlay está oculto
+        if not self.show_overlay:
+            return None
+        box = self._overlay_box()
+        rect = box.get_rect(topleft=(x, y))
+        return rect, lambda screen: screen.blit(box, rect)
+
+
+# ================================
+# STARTUP TIMER
+# ================================
+# Tiempo hasta el primer frame del menú, por etapas (imports, ventana,
+# fuentes, imágenes...). Con RELATIVITY_STARTUP_REPORT=1 el reporte sale
+# por stderr al presentar el primer frame.
+class StartupTimer:
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self._last = self.start
+        self.stages = []
+        self.finished = False
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.stages.append((name, (now - self._last) * 1000))
+        self._last = now
+
+    def total_ms(self):
+        return (self._last - self.start) * 1000
+
+    def report(self):
+        lines = [f"{name:<14}{ms:8.1f} ms" for name, ms in self.stages]
+        lines.append(f"{'primer frame':<14}{self.total_ms():8.1f} ms")
+        return "\n".join(lines)
+
+    def finish(self, name="first frame"):
+        if self.finished:
+            return
+        self.mark(name)
+        self.finished = True
+        if os.environ.get(STARTUP_ENV):
+            print(self.report(), file=sys.stderr)
@@ -0,0 +1,115 @@
+# quality.py
+from collections import deque
+
+from profiler import FRAME_BUDGET_MS
+
+# ================================
+# NIVELES DE CALIDAD
+# ================================
+# De más caro a más barato. Cada escena usa los campos que le corresponden:
+#
+#   stars        fracción de las estrellas de fondo que se dibujan
+#   trail_steps  pasos de física entre muestras de estela (multiplica el de
+#                la escena: menos muestras que medir, encolar y rasterizar)
+#   trail_px     px de recorrido en pantalla entre vértices dibujados
+#   downscale    el fondo y las estelas se componen a 1/downscale de la
+#                resolución y se amplían (DirtyRenderer.set_downscale)
+#   glow         halos alrededor del sol; 0 además deja los efectos del GPS
+#                planos (mapa de error sin suavizar, satélites de un color)
+#   position_hz  soluciones por segundo del mapa de error del GPS
+QUALITY_LEVELS = (
+    {"name": "alta", "stars": 1.0, "trail_steps": 1, "trail_px": 1.0, "downscale": 1, "glow": 3,
+     "position_hz": 60},
+    {"name": "media", "stars": 0.6, "trail_steps": 1, "trail_px": 2.0, "downscale": 1, "glow": 2,
+     "position_hz": 30},
+    {"name": "baja", "stars": 0.35, "trail_steps": 2, "trail_px": 3.0, "downscale": 2, "glow": 1,
+     "position_hz": 15},
+    {"name": "mínima", "stars": 0.15, "trail_steps": 4, "trail_px": 4.0, "downscale": 2, "glow": 0,
+     "position_hz": 8},
+)
+GOVERNOR_WINDOW = 30         # frames medidos antes de decidir (~0.5 s a 60 fps)
+LOAD_PERCENTILE = 0.9        # la decisión mira el p90 de la ventana, no el promedio
+HEADROOM = 0.6               # sube de nivel si el p90 queda bajo 60 % del presupuesto
+RESTORE_FRAMES = 120         # frames con margen antes de probar un nivel más caro
+MAX_RESTORE_FRAMES = 1800    # tope de la espera cuando subir vuelve a bajar
+
+
+# ================================
+# GOBERNADOR ADAPTATIVO
+# ================================
+# Recibe el tiempo de trabajo de cada frame (FrameProfiler.end_frame, sin la
+# espera del reloj) y lo compara con el presupuesto. Si el p90 de una
+# ventana se pasa, baja un nivel; si sobra margen durante RESTORE_FRAMES,
+# sube uno. Cuando una subida se deshace enseguida (ese nivel no entra) la
+# próxima espera se duplica, así no oscila entre dos niveles. Cada cambio
+# vacía la ventana: se vuelve a medir ya con el nivel nuevo.
+#
+# La escena lee `level` / `settings` y aplica los cambios al empezar el
+# frame siguiente. Grabando / repitiendo (replay.py) se desactiva: los
+# frames deben salir iguales en las dos corridas.
+class QualityGovernor:
+    def __init__(self, budget_ms=FRAME_BUDGET_MS, levels=QUALITY_LEVELS, window=GOVERNOR_WINDOW):
+        self.budget_ms = budget_ms
+        self.levels = levels
+        self.level = 0
+        self.enabled = True
+        self.changes = 0
+        self.frames = deque(maxlen=window)
+
+        self._since_change = 0
+        self._last_step = 0          # +1 bajó la calidad, -1 la subió
+        self._restore_frames = RESTORE_FRAMES
+
+    @property
+    def settings(self):
+        return self.levels[self.level]
+
+    @property
+    def name(self):
+        return self.settings["name"]
+
+    def set_level(self, level, enabled=None):
+        # nivel fijo (benchmarks, corridas deterministas); enabled=False lo congela
+        self.level = min(max(int(level), 0), len(self.levels) - 1)
+        if enabled is not None:
+            self.enabled = enabled
+        self.frames.clear()
+        self._since_change = 0
+
+    def load(self):
+        # p90 de la ventana en ms (None hasta que se llena)
+        if len(self.frames) < self.frames.maxlen:
+            return None
+        return sorted(self.frames)[int(LOAD_PERCENTILE * (len(self.frames) - 1))]
+
+    def record(self, frame_ms):
+        # devuelve True si el nivel cambió
+        if not self.enabled:
+            return False
+        self.frames.append(frame_ms)
+        self._since_change += 1
+        load = self.load()
+        if load is None:
+            return False
+
+        if load > self.budget_ms and self.level < len(self.levels) - 1:
+            if self._last_step < 0 and self._since_change < self._restore_frames:
+                self._restore_frames = min(2 * self._restore_frames, MAX_RESTORE_FRAMES)
+            return self._change(+1)
+        if (load < HEADROOM * self.budget_ms and self.level > 0
+                and self._since_change >= self._restore_frames):
+            return self._change(-1)
+        if self._since_change >= MAX_RESTORE_FRAMES:
+            self._restore_frames = RESTORE_FRAMES     # estable un buen rato: vuelve a probar rápido
+        return False
+
+    def _change(self, step):
+        self.level += step
+        self.changes += 1
+        self._last_step = step
+        self._since_change = 0
+        self.frames.clear()
+        return True
+
+    def report(self):
+        return {"level": self.level, "name": self.name, "enabled": self.enabled, "changes": self.changes}
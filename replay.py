@@ -0,0 +1,217 @@
+# replay.py
+# Grabación y repetición de la entrada, para corridas reproducibles:
+#
+#   python main.py --record sesion.jsonl --checksums
+#   python main.py --replay sesion.jsonl            # sin ventana, sin esperar
+#
+# Los bucles de frame (menú, Scene.run en scene.py) le piden a INPUT
+# los eventos, la posición del mouse y el dt en vez de pedírselos a pygame.
+# En vivo INPUT sólo pasa lo de pygame; grabando además escribe una línea
+# JSON por frame (eventos, mouse, dt, checksum); repitiendo lee esas líneas
+# con el driver dummy de SDL y sin dormir entre frames.
+#
+# Para que la repetición dé los mismos frames que la grabación, en los dos
+# modos (INPUT.deterministic) la física corre en el hilo de la UI con un tope
+# fijo de pasos por frame en vez de un presupuesto medido en tiempo real, y
+# `random` arranca con la semilla guardada en la cabecera. Con --checksums
+# cada frame guarda el CRC32 de la pantalla y la repetición informa el primer
+# frame distinto además de los tiempos por frame. (El overlay F3 del profiler
+# muestra tiempos reales: si se abre durante la grabación esos frames no
+# coinciden.)
+import json
+import os
+import random
+import time
+import zlib
+from collections import deque
+
+import pygame
+
+FORMAT = "relativity-replay"
+VERSION = 1
+FRAME_MS = 1000 / 60    # dt de repuesto si la grabación se corta
+
+# eventos que afectan a las escenas; el resto (ventana, audio, texto) no se graba
+RECORDED_EVENTS = (pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP, pygame.MOUSEBUTTONDOWN,
+                   pygame.MOUSEBUTTONUP, pygame.MOUSEMOTION, pygame.MOUSEWHEEL)
+EVENT_TYPES = {pygame.event.event_name(t): t for t in RECORDED_EVENTS}
+
+
+def encode_event(ev):
+    attrs = {}
+    for k, v in ev.dict.items():
+        if isinstance(v, (bool, int, float, str)):
+            attrs[k] = v
+        elif isinstance(v, tuple):
+            attrs[k] = list(v)
+    return [pygame.event.event_name(ev.type), attrs]
+
+
+def decode_event(item):
+    name, attrs = item
+    return pygame.event.Event(EVENT_TYPES[name],
+                              {k: tuple(v) if isinstance(v, list) else v for k, v in attrs.items()})
+
+
+def screen_checksum(screen):
+    # sólo RGB: el byte de relleno de la pantalla puede variar entre drivers
+    return zlib.crc32(pygame.image.tobytes(screen, "RGB"))
+
+
+# ================================
+# FUENTE DE ENTRADA
+# ================================
+class InputSource:
+    def __init__(self):
+        self.mode = "live"        # "live", "record" o "replay"
+        self.checksums = False
+        self.seed = None
+        self._file = None
+        self._frame = None        # línea en curso (grabando)
+        self._index = -1
+        self._mouse = (0, 0)
+
+        # repitiendo
+        self._frames = deque()
+        self._ticks = deque()
+        self._expected = []       # (frame, checksum) grabados, en orden
+        self._crcs = []
+        self._times = []
+        self._last_done = None
+
+    @property
+    def deterministic(self):
+        return self.mode != "live"
+
+    def configure(self, argv):
+        import argparse    # ~16 ms de import: sólo cuando main.py corre como script
+        parser = argparse.ArgumentParser(description="Simulador de Relatividad General")
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument("--record", metavar="ARCHIVO", help="grabar la entrada en un .jsonl")
+        group.add_argument("--replay", metavar="ARCHIVO", help="repetir una grabación sin ventana")
+        parser.add_argument("--checksums", action="store_true", help="grabar el CRC32 de cada frame")
+        parser.add_argument("--seed", type=int, help="semilla de random (por defecto al azar)")
+        args = parser.parse_args(argv)
+        if args.record:
+            self.start_record(args.record, args.checksums, args.seed)
+        elif args.replay:
+            self.start_replay(args.replay)
+        return args
+
+    def start_record(self, path, checksums=False, seed=None):
+        self.mode = "record"
+        self.checksums = checksums
+        self.seed = random.randrange(2 ** 31) if seed is None else seed
+        random.seed(self.seed)
+        self._file = open(path, "w")
+
+    def start_replay(self, path):
+        # antes de pygame.init(): sin ventana ni audio
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+        with open(path) as f:
+            header = json.loads(f.readline())
+            if header.get("format") != FORMAT:
+                raise ValueError(f"{path}: no es una grabación ({FORMAT})")
+            for line in f:
+                frame = json.loads(line)
+                self._frames.append(frame)
+                self._ticks.extend(frame.get("dt", ()))
+                if "crc" in frame:
+                    self._expected.append((frame["f"], frame["crc"]))
+        self.mode = "replay"
+        self.seed = header["seed"]
+        self.checksums = bool(self._expected)
+        random.seed(self.seed)
+
+    # ---- lo que piden los bucles de frame ----
+    def events(self):
+        self._index += 1
+        if self.mode == "live":
+            return pygame.event.get()
+        if self.mode == "record":
+            self._write_frame()
+            events = [ev for ev in pygame.event.get() if ev.type in RECORDED_EVENTS]
+            self._mouse = pygame.mouse.get_pos()
+            self._frame = {"f": self._index, "mouse": list(self._mouse),
+                           "events": [encode_event(ev) for ev in events], "dt": []}
+            return events
+        pygame.event.pump()
+        if not self._frames:
+            return [pygame.event.Event(pygame.QUIT)]    # grabación cortada: salir
+        frame = self._frames.popleft()
+        self._mouse = tuple(frame["mouse"])
+        return [decode_event(item) for item in frame["events"]]
+
+    def mouse_pos(self):
+        # grabando / repitiendo: la posición que había al leer los eventos
+        if self.mode == "live":
+            return pygame.mouse.get_pos()
+        return self._mouse
+
+    def tick(self, clock, fps):
+        # ms desde el frame anterior; repitiendo no espera
+        if self.mode == "replay":
+            return self._ticks.popleft() if self._ticks else FRAME_MS
+        dt = clock.tick(fps)
+        if self.mode == "record":
+            if self._frame is None:
+                self._frame = {"f": self._index, "mouse": list(self._mouse), "events": [], "dt": []}
+            self._frame["dt"].append(dt)
+        return dt
+
+    def frame_done(self, screen):
+        # después de presentar el frame: checksum y, repitiendo, su tiempo
+        if self.mode == "live":
+            return
+        now = time.perf_counter()
+        if self.mode == "replay":
+            if self._last_done is not None:
+                self._times.append((now - self._last_done) * 1000)
+            if self.checksums:
+                self._crcs.append(screen_checksum(screen))
+            self._last_done = time.perf_counter()
+        elif self.checksums and self._frame is not None:
+            self._frame["crc"] = screen_checksum(screen)
+
+    # ---- archivo / resumen ----
+    def _write_frame(self):
+        if self._file is None:
+            return
+        if self._index == 0:
+            surface = pygame.display.get_surface()
+            size = list(surface.get_size()) if surface is not None else None
+            self._file.write(json.dumps({"format": FORMAT, "version": VERSION, "seed": self.seed,
+                                         "size": size, "checksums": self.checksums}) + "\n")
+        if self._frame is not None:
+            self._file.write(json.dumps(self._frame, separators=(",", ":")) + "\n")
+            self._frame = None
+
+    def close(self):
+        # devuelve el código de salida: 1 si la repetición no dio los mismos frames
+        if self.mode == "record" and self._file is not None:
+            self._write_frame()
+            self._file.close()
+            self._file = None
+            return 0
+        if self.mode != "replay":
+            return 0
+        report = {"frames": self._index + 1, "seed": self.seed}
+        if self._times:
+            import numpy as np    # el menú arranca sin numpy; sólo hace falta acá
+            t = np.asarray(self._times)
+            report.update(mean_ms=round(float(t.mean()), 4),
+                          p50_ms=round(float(np.percentile(t, 50)), 4),
+                          p95_ms=round(float(np.percentile(t, 95)), 4),
+                          max_ms=round(float(t.max()), 4),
+                          total_s=round(float(t.sum()) / 1000, 3))
+        mismatches = [f for crc, (f, expected) in zip(self._crcs, self._expected) if crc != expected]
+        if self.checksums:
+            report.update(checksums=min(len(self._crcs), len(self._expected)),
+                          mismatches=len(mismatches),
+                          first_mismatch=mismatches[0] if mismatches else None)
+        print(json.dumps(report, indent=2))
+        return 1 if mismatches else 0
+
+
+INPUT = InputSource()
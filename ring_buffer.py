@@ -0,0 +1,136 @@
+# ring_buffer.py
+import numpy as np
+
+
+# ================================
+# FIXED-CAPACITY RING BUFFER
+# ================================
+# Cada punto se escribe dos veces (en i y en i + capacity). Así los últimos
+# `len(self)` puntos siempre están contiguos en memoria y `view()` devuelve
+# un slice ordenado sin copiar nada, listo para pygame.draw.lines.
+#
+# Con `chunk` además se guarda la caja envolvente de cada bloque de `chunk`
+# puntos consecutivos (filas (x0, y0, x1, y1, ...) → una caja por fila
+# entera). visible_ranges(rect) usa esas cajas para devolver sólo los
+# tramos de view() que caen dentro de un rectángulo.
+class RingBuffer:
+    def __init__(self, capacity, width=2, dtype=np.float64, chunk=None):
+        if chunk:
+            capacity = -(-int(capacity) // chunk) * chunk
+        self.capacity = int(capacity)
+        self.width = width
+        self.chunk = chunk
+        self._data = np.zeros((2 * self.capacity, width), dtype=dtype)
+        self._head = 0     # próxima posición de escritura
+        self._size = 0
+        self.total = 0     # puntos añadidos desde el último clear()
+
+        # una caja más que bloques: el bloque más viejo (parcialmente pisado)
+        # y el más nuevo nunca comparten lugar
+        self._nbounds = self.capacity // chunk + 1 if chunk else 0
+        self._bounds = np.zeros((self._nbounds, 4))
+
+    def __len__(self):
+        return self._size
+
+    def append(self, item):
+        self._data[self._head] = item
+        self._data[self._head + self.capacity] = item
+        self._head = (self._head + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        self.total += 1
+        if self.chunk:
+            self._update_bounds(self.total - 1)
+
+    def extend(self, items):
+        items = np.asarray(items, dtype=self._data.dtype).reshape(-1, self.width)
+        n = len(items)
+        if n == 0:
+            return
+        first_new = self.total
+        self.total += n
+        if n >= self.capacity:
+            items = items[-self.capacity:]
+            self._data[:self.capacity] = items
+            self._data[self.capacity:] = items
+            self._head = 0
+            self._size = self.capacity
+        else:
+            first = min(n, self.capacity - self._head)
+            for base in (0, self.capacity):
+                self._data[base + self._head: base + self._head + first] = items[:first]
+                self._data[base: base + n - first] = items[first:]
+            self._head = (self._head + n) % self.capacity
+            self._size = min(self._size + n, self.capacity)
+        if self.chunk:
+            self._update_bounds(max(first_new, self.total - self._size))
+
+    def view(self):
+        start = (self._head - self._size) % self.capacity
+        return self._data[start: start + self._size]
+
+    def last(self):
+        return self._data[(self._head - 1) % self.capacity]
+
+    def clear(self):
+        self._head = 0
+        self._size = 0
+        self.total = 0
+
+    def restore(self, rows, total, bounds=None):
+        # vuelve a llenar el buffer con `rows` (lo que devolvía view()) como
+        # si se hubieran añadido `total` puntos; checkpoints. Las filas quedan
+        # en [0, n) con la cabeza en n: view() nunca lee su copia espejo
+        # (los append siguientes escriben las dos), así que no se copia.
+        # `bounds` son las cajas guardadas con el mismo capacity y chunk
+        rows = np.asarray(rows).reshape(-1, self.width)[-self.capacity:]
+        n = len(rows)
+        self._data[:n] = rows
+        self._head = n % self.capacity
+        self._size = n
+        self.total = max(int(total), n)
+        if self.chunk and n:
+            if bounds is not None and len(bounds) == self._nbounds:
+                self._bounds[:] = bounds
+            else:
+                self._update_bounds(self.total - n)
+
+    # ---- índice por bloques ----
+    def _update_bounds(self, first):
+        # recalcula las cajas de los bloques que contienen los puntos
+        # absolutos [first, total); el slice puede entrar en la copia espejo
+        c = self.chunk
+        j0, j1 = first // c, (self.total - 1) // c
+        oldest = self.total - self._size
+        start = max(j0 * c, oldest)
+        rows = self._data[start - oldest + (self._head - self._size) % self.capacity:][:self.total - start]
+        xs = rows[:, 0::2].min(axis=1), rows[:, 0::2].max(axis=1)
+        ys = rows[:, 1::2].min(axis=1), rows[:, 1::2].max(axis=1)
+        cuts = np.maximum(np.arange(j0, j1 + 1) * c - start, 0)
+        slots = np.arange(j0, j1 + 1) % self._nbounds
+        self._bounds[slots, 0] = np.minimum.reduceat(xs[0], cuts)
+        self._bounds[slots, 1] = np.minimum.reduceat(ys[0], cuts)
+        self._bounds[slots, 2] = np.maximum.reduceat(xs[1], cuts)
+        self._bounds[slots, 3] = np.maximum.reduceat(ys[1], cuts)
+
+    def visible_ranges(self, rect):
+        # tramos [a, b) de view() cuyos bloques tocan rect = (x0, y0, x1, y1)
+        if not self._size:
+            return []
+        if not self.chunk:
+            return [(0, self._size)]
+        c = self.chunk
+        oldest = self.total - self._size
+        j = np.arange(oldest // c, (self.total - 1) // c + 1)
+        b = self._bounds[j % self._nbounds]
+        hit = (b[:, 0] <= rect[2]) & (b[:, 2] >= rect[0]) & (b[:, 1] <= rect[3]) & (b[:, 3] >= rect[1])
+
+        ranges = []
+        for k in np.flatnonzero(hit):
+            a = max(int(j[k]) * c, oldest) - oldest
+            e = min((int(j[k]) + 1) * c, self.total) - oldest
+            if ranges and ranges[-1][1] == a:
+                ranges[-1] = (ranges[-1][0], e)
+            else:
+                ranges.append((a, e))
+        return ranges
@@ -0,0 +1,221 @@
+# scene.py
+import math
+import os
+import random
+import sys
+
+import pygame
+from ui_elements import BackButtonUI
+from profiler import FrameProfiler
+from quality import QualityGovernor
+from sim_worker import SimWorker
+from viewport import parallax_stars
+from replay import INPUT
+import checkpoint
+
+WORKER_HZ = 120          # iteraciones por segundo del hilo de física (run())
+
+
+# ================================
+# ESTRELLAS DE FONDO
+# ================================
+def gen_stars(w, h, n=120):
+    return [(random.randint(0, w), random.randint(0, h), random.choice([1, 1, 2])) for _ in range(n)]
+
+
+def star_sizes(stars, phase, twinkle=(12, 7)):
+    # `twinkle` pondera x e y en la fase: cada escena titila con su patrón
+    kx, ky = twinkle
+    sizes = []
+    for x, y, s in stars:
+        offset = 0.5 + 0.5 * math.sin((x * kx + y * ky + phase) * 0.002)
+        sizes.append(max(1, int(s * offset)))
+    return sizes
+
+
+def draw_stars(surface, stars, sizes):
+    for (x, y, _), size in zip(stars, sizes):
+        pygame.draw.circle(surface, (255, 255, 255), (x, y), size)
+
+
+# ================================
+# ESCENA BASE
+# ================================
+# Lo que comparten PerihelioSim y GPSSim: comandos al modelo físico (en el
+# mismo hilo o por un SimWorker), estrellas con titileo y parallax, calidad
+# adaptativa, checkpoints F5 / F9 y el bucle de frame. Cada escena arma en
+# su __init__ `physics` (ver SimWorker), `viewport`, `ui` (con btn_back) y
+# `renderer`, y provee:
+#
+#   update(dt), draw(), paint_base(surface), paint_overlay(surface)
+#   scene_event(ev)               teclas y mouse propios de la escena
+#   apply_quality(settings)       nivel nuevo del gobernador (quality.py)
+#   save_state / restore_state    lo propio de la escena en el checkpoint
+#   prepare_replay()              ajustes al grabar / repetir (replay.py) o exportar
+class Scene:
+    SCENE = None                  # nombre del profiler y de los checkpoints
+    CHECKPOINT_SLIDERS = ()
+    STAR_TWINKLE = (12, 7)
+
+    def __init__(self, screen):
+        self.screen = screen
+        self.W, self.H = screen.get_size()
+        self.clock = pygame.time.Clock()
+        self.btn_back = BackButtonUI()
+        self.profiler = FrameProfiler(self.SCENE)
+        # calidad adaptativa (quality.py): la mide run(), se aplica en frame()
+        self.quality = QualityGovernor()
+        self._quality_level = 0
+
+        # la física corre en el mismo hilo salvo dentro de run(), donde la
+        # avanza un SimWorker; los sliders le llegan como comandos
+        self.physics = None
+        self.worker = None
+        self._sent = {}
+
+    # ---- comandos a la física ----
+    def command(self, name, value, force=False):
+        # los sliders se consultan cada frame; sólo se manda lo que cambió
+        if not force and self._sent.get(name) == value:
+            return
+        self._sent[name] = value
+        if self.worker is not None:
+            self.worker.send(name, value)
+        else:
+            self.physics.apply(name, value)
+
+    def start_worker(self):
+        self.worker = SimWorker(self.physics, hz=WORKER_HZ)
+        self.worker.start()
+
+    def stop_worker(self):
+        if self.worker is not None:
+            self.worker.stop()
+            self.worker = None
+
+    # ---- estrellas ----
+    def init_stars(self, n):
+        # con calidad reducida se dibuja sólo un prefijo de all_stars
+        self.all_stars = self.stars = gen_stars(self.W, self.H, n)
+        self.view_stars = self.stars
+        self.star_phase = 0
+        self.star_sizes = star_sizes(self.stars, self.star_phase, self.STAR_TWINKLE)
+
+    def show_stars(self, fraction):
+        self.stars = self.all_stars[:max(1, round(len(self.all_stars) * fraction))]
+        self.place_stars()
+        self.star_sizes = star_sizes(self.stars, self.star_phase, self.STAR_TWINKLE)
+
+    def place_stars(self):
+        self.view_stars = parallax_stars(self.stars, self.viewport, (self.W, self.H))
+
+    def twinkle(self):
+        # sólo se repintan las estrellas que cambiaron de tamaño
+        sizes = star_sizes(self.stars, self.star_phase, self.STAR_TWINKLE)
+        changed = [(x, y) for (x, y, _), old, new in zip(self.view_stars, self.star_sizes, sizes) if old != new]
+        self.star_sizes = sizes
+        for x, y in changed:
+            self.renderer.repaint_base((x - 3, y - 3, 7, 7))
+
+    # ---- eventos ----
+    def handle_event(self, ev):
+        # devuelve True cuando hay que volver al menú
+        if ev.type == pygame.QUIT:
+            pygame.quit()
+            sys.exit()
+        if ev.type == pygame.KEYDOWN and ev.key == pygame.K_ESCAPE:
+            return True
+        if ev.type == pygame.KEYDOWN and ev.key == pygame.K_F5:
+            self.save_checkpoint()
+            return False
+        if ev.type == pygame.KEYDOWN and ev.key == pygame.K_F9:
+            if os.path.exists(checkpoint.default_path(self.SCENE)):
+                self.load_checkpoint()
+            return False
+        if self.profiler.handle_event(ev):
+            return False
+        hit = self.ui.handle_event(ev)
+        if hit is not None:
+            return hit[0] is self.btn_back
+        self.scene_event(ev)
+        return False
+
+    # ---- checkpoints ----
+    def save_checkpoint(self, path=None):
+        path = path or checkpoint.default_path(self.SCENE)
+        with checkpoint.paused(self):
+            physics, arrays = self.physics.checkpoint()
+            state = {
+                "physics": physics,
+                "sliders": {name: getattr(self, name).value for name in self.CHECKPOINT_SLIDERS},
+                "view": {"zoom": self.viewport.zoom, "center": self.viewport.center.tolist()},
+            }
+            self.save_state(state, arrays)
+            return checkpoint.save(path, self.SCENE, state, arrays)
+
+    def load_checkpoint(self, path=None):
+        # sliders, vista y física; el resto (y los comandos ya aplicados,
+        # `_sent`) lo repone restore_state de cada escena
+        ckpt = checkpoint.load_scene(path or checkpoint.default_path(self.SCENE), self.SCENE)
+        state = ckpt.state
+        with checkpoint.paused(self):
+            for name, value in state["sliders"].items():
+                getattr(self, name).value = value
+            self.viewport.set_view(state["view"]["zoom"], state["view"]["center"])
+            self.physics.restore(state["physics"], ckpt.arrays)
+            self.restore_state(state, ckpt.arrays)
+        return ckpt
+
+    def save_state(self, state, arrays):
+        pass
+
+    def restore_state(self, state, arrays):
+        pass
+
+    # ---- bucle ----
+    def present(self):
+        self.renderer.present()
+
+    def frame(self, events, dt):
+        # un frame completo sin bloquear ni esperar al reloj (benchmarks);
+        # quien llama hace display.flip() y profiler.end_frame()
+        self.profiler.begin_frame()
+        for ev in events:
+            if self.handle_event(ev):
+                return False
+        self.profiler.mark("events")
+        if self.quality.level != self._quality_level:
+            self._quality_level = self.quality.level
+            self.apply_quality(self.quality.settings)
+        self.update(dt)
+        self.profiler.mark("physics")
+        self.draw()
+        return True
+
+    def prepare_replay(self):
+        pass
+
+    def run(self):
+        # la física corre en su hilo; este bucle sólo procesa eventos y dibuja.
+        # Al volver desde el menú la pantalla se recompone entera y el tiempo
+        # pasado fuera de la escena no cuenta como un frame
+        self.renderer.invalidate()
+        self.clock.tick()
+        if INPUT.deterministic:
+            # grabando / repitiendo (replay.py) la física avanza en este hilo
+            # y la calidad queda fija
+            self.prepare_replay()
+            self.quality.set_level(0, enabled=False)
+        else:
+            self.start_worker()
+        try:
+            while True:
+                dt = INPUT.tick(self.clock, 60)
+                if not self.frame(INPUT.events(), dt):
+                    return
+                self.present()
+                INPUT.frame_done(self.screen)
+                self.profiler.mark("flip")
+                self.quality.record(self.profiler.end_frame())
+        finally:
+            self.stop_worker()
@@ -0,0 +1,116 @@
+# sim_clock.py
+import time
+
+import pygame
+
+# ================================
+# SIMULATION CLOCK (FIXED TIMESTEP)
+# ================================
+# Desacopla los pasos de simulación de los frames dibujados. Cada frame el
+# tiempo real (recortado a MAX_FRAME_DT) multiplicado por rate * warp entra
+# en un acumulador y se devuelven los pasos enteros de tamaño `step` que
+# caben; la fracción que sobra (alpha) sirve para interpolar al dibujar.
+#
+# Si los pasos no entran en el presupuesto de cómputo del frame se ejecutan
+# en los frames siguientes (recuperación tras un frame lento); lo que supere
+# MAX_LAG segundos de atraso se descarta para no entrar en espiral.
+MAX_WARP = 1e6
+MAX_FRAME_DT = 0.25     # s reales por frame como máximo (pausas, arrastre de ventana)
+MAX_LAG = 0.5           # s reales de simulación pendiente como máximo
+PROBE_STEPS = 64        # pasos del primer frame, antes de conocer el costo por paso
+WARP_KEYS = {pygame.K_PERIOD: 10.0, pygame.K_COMMA: 0.1}
+
+
+class SimClock:
+    def __init__(self, step, rate=1.0, warp=1.0, budget_ms=8.0, max_steps=None):
+        self.step = step              # tiempo simulado por paso
+        self.rate = rate              # tiempo simulado por segundo real a warp 1
+        self.warp = warp
+        self.budget_ms = budget_ms    # None = sin límite de tiempo (determinista)
+        self.max_steps = max_steps    # tope fijo de pasos por frame (None = sin tope)
+
+        self.accumulator = 0.0        # tiempo simulado pendiente
+        self.steps_total = 0
+        self.dropped = 0.0            # tiempo simulado descartado por atraso
+        self.effective_warp = warp
+        self._step_cost = None        # s reales por paso (promedio móvil)
+
+    def set_warp(self, warp):
+        self.warp = min(max(float(warp), 1.0), MAX_WARP)
+
+    def reset(self):
+        self.accumulator = 0.0
+        self.steps_total = 0
+        self.dropped = 0.0
+
+    # ---- checkpoints ----
+    def checkpoint(self):
+        return {"warp": self.warp, "accumulator": self.accumulator, "steps_total": self.steps_total,
+                "dropped": self.dropped, "effective_warp": self.effective_warp}
+
+    def restore(self, state):
+        self.warp = state["warp"]
+        self.accumulator = state["accumulator"]
+        self.steps_total = state["steps_total"]
+        self.dropped = state["dropped"]
+        self.effective_warp = state["effective_warp"]
+
+    # ---- frame ----
+    def tick(self, real_dt):
+        # pasos a ejecutar en este frame
+        real_dt = min(max(real_dt, 0.0), MAX_FRAME_DT)
+        self.accumulator += real_dt * self.rate * self.warp
+
+        steps = int(self.accumulator / self.step)
+        limit = self.step_limit()
+        if limit is not None:
+            steps = min(steps, limit)
+        self.accumulator -= steps * self.step
+
+        max_pending = MAX_LAG * self.rate * self.warp
+        if self.accumulator > max_pending:
+            self.dropped += self.accumulator - max_pending
+            self.accumulator = max_pending
+
+        if real_dt > 0:
+            achieved = steps * self.step / (real_dt * self.rate)
+            self.effective_warp += 0.1 * (achieved - self.effective_warp)
+        self.steps_total += steps
+        return steps
+
+    def step_limit(self):
+        limits = []
+        if self.max_steps is not None:
+            limits.append(self.max_steps)
+        if self.budget_ms is not None:
+            if self._step_cost:
+                limits.append(max(1, int(self.budget_ms / 1000 / self._step_cost)))
+            else:
+                limits.append(PROBE_STEPS)
+        return min(limits) if limits else None
+
+    def timed(self, run, steps):
+        # ejecuta run(steps) y actualiza el costo por paso para el presupuesto
+        if steps <= 0:
+            return run(0)
+        t0 = time.perf_counter()
+        out = run(steps)
+        cost = (time.perf_counter() - t0) / steps
+        self._step_cost = cost if self._step_cost is None else 0.8 * self._step_cost + 0.2 * cost
+        return out
+
+    @property
+    def alpha(self):
+        # fracción del próximo paso ya transcurrida (para interpolar)
+        return min(self.accumulator / self.step, 1.0)
+
+    @property
+    def time(self):
+        return self.steps_total * self.step
+
+
+def warp_from_key(ev, warp):
+    # teclas , y . dividen / multiplican el warp por 10; None si no es una de ellas
+    if ev.type == pygame.KEYDOWN and ev.key in WARP_KEYS:
+        return min(max(warp * WARP_KEYS[ev.key], 1.0), MAX_WARP)
+    return None
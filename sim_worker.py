@@ -0,0 +1,110 @@
+# sim_worker.py
+import queue
+import threading
+import time
+
+# ================================
+# TRIPLE BUFFER SIN LOCKS
+# ================================
+# Tres snapshots preasignados: el escritor siempre llena uno que no está
+# publicado ni siendo leído, y lo publica con una sola asignación. El lector
+# marca cuál está leyendo y confirma que siga publicado; con el GIL cada
+# asignación es atómica, así que ninguno de los dos espera al otro.
+class TripleBuffer:
+    def __init__(self, make):
+        self._buffers = [make() for _ in range(3)]
+        self._published = None
+        self._reading = None
+        self.version = 0
+
+    def write_buffer(self):
+        busy = (self._published, self._reading)
+        index = next(i for i in range(3) if i not in busy)
+        return index, self._buffers[index]
+
+    def publish(self, index):
+        self._published = index
+        self.version += 1
+
+    def read(self):
+        while True:
+            index = self._published
+            if index is None:
+                return None
+            self._reading = index
+            if self._published == index:
+                return self._buffers[index]
+
+
+# ================================
+# SIMULATION WORKER THREAD
+# ================================
+# Corre el modelo físico en su propio hilo a `hz` iteraciones por segundo.
+# El modelo expone:
+#
+#   clock                    SimClock (se le fija el presupuesto por iteración)
+#   apply(name, value)       comandos (sliders, modo, warp)
+#   advance(real_dt)         avanza la física
+#   make_snapshot()          snapshot vacío para el triple buffer
+#   write_snapshot(snap)     copia el estado visible al snapshot
+#
+# La UI manda comandos con send() y lee el último estado con latest().
+class SimWorker:
+    def __init__(self, model, hz=120, budget_share=0.5):
+        self.model = model
+        self.hz = hz
+        self.budget_share = budget_share
+        self.buffer = TripleBuffer(model.make_snapshot)
+        self._commands = queue.SimpleQueue()
+        self._thread = None
+        self._running = False
+        self._budget_before = None
+
+    def start(self):
+        clock = self.model.clock
+        self._budget_before = clock.budget_ms
+        if clock.budget_ms is not None:
+            clock.budget_ms = 1000 / self.hz * self.budget_share
+        self._publish()
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name="sim-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._drain()
+        self.model.clock.budget_ms = self._budget_before
+
+    def send(self, name, value):
+        self._commands.put((name, value))
+
+    def latest(self):
+        return self.buffer.read()
+
+    # ---- hilo ----
+    def _drain(self):
+        while True:
+            try:
+                name, value = self._commands.get_nowait()
+            except queue.Empty:
+                return
+            self.model.apply(name, value)
+
+    def _publish(self):
+        index, snap = self.buffer.write_buffer()
+        self.model.write_snapshot(snap)
+        self.buffer.publish(index)
+
+    def _loop(self):
+        period = 1 / self.hz
+        last = time.perf_counter()
+        while self._running:
+            start = time.perf_counter()
+            self._drain()
+            self.model.advance(start - last)
+            last = start
+            self._publish()
+            time.sleep(max(0.0, period - (time.perf_counter() - start)))
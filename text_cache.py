@@ -0,0 +1,67 @@
+# text_cache.py
+from collections import OrderedDict
+
+# ================================
+# LRU CACHE FOR RENDERED TEXT
+# ================================
+# Font.render es caro; los textos estáticos (etiquetas, paneles, menú) se
+# rasterizan una sola vez. Sólo los textos que cambian (p.ej. los números
+# de deriva) generan superficies nuevas, y las viejas salen por LRU.
+MAX_CACHED_TEXTS = 512
+MAX_CACHED_LAYOUTS = 64
+
+_surfaces = OrderedDict()
+_layouts = OrderedDict()
+
+
+def _lookup(cache, key, limit, build):
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache[key] = value
+        if len(cache) > limit:
+            cache.popitem(last=False)
+    else:
+        cache.move_to_end(key)
+    return value
+
+
+def render_text(font, text, color, antialias=True):
+    key = (font, text, tuple(color), antialias)
+    return _lookup(_surfaces, key, MAX_CACHED_TEXTS,
+                   lambda: font.render(text, antialias, color))
+
+
+def _wrap(font, text, max_width):
+    words = text.replace("\n", " \n ").split(" ")
+    lines = []
+    current = ""
+
+    for w in words:
+        if w == "\n":
+            lines.append(current)
+            current = ""
+            continue
+
+        test = current + (" " if current else "") + w
+        if font.size(test)[0] <= max_width:
+            current = test
+        else:
+            lines.append(current)
+            current = w
+
+    if current:
+        lines.append(current)
+
+    return tuple(lines)
+
+
+def wrap_text(font, text, max_width):
+    key = (font, text, max_width)
+    return _lookup(_layouts, key, MAX_CACHED_LAYOUTS,
+                   lambda: _wrap(font, text, max_width))
+
+
+def clear():
+    _surfaces.clear()
+    _layouts.clear()
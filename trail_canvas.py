@@ -0,0 +1,265 @@
+# trail_canvas.py
+import numpy as np
+import pygame
+
+SIMPLIFY_PX = 1.0            # distancia mínima en pantalla entre vértices dibujados
+PIXEL_PLOT_POINTS = 40_000   # reconstrucciones con más puntos se plotean como píxeles
+REBUILD_MAX_POINTS = 600_000 # tope de puntos proyectados al rehacer un canvas
+
+
+# ================================
+# LOD HELPERS
+# ================================
+def simplify(pts, min_px, carry=0.0):
+    # deja un punto cada `min_px` de recorrido en pantalla: el costo de
+    # dibujo depende de lo que mide la estela en pantalla, no de cuántas
+    # muestras tiene. `carry` es el recorrido desde el último punto dejado
+    # (para continuar entre frames); devuelve (máscara, carry nuevo)
+    if len(pts) == 0:
+        return np.zeros(0, bool), carry
+    seg = np.hypot(*np.diff(pts, axis=0).T)
+    arc = carry + np.concatenate(([0.0], np.cumsum(seg)))
+    bucket = (arc // min_px).astype(np.int64)
+    keep = np.empty(len(pts), bool)
+    keep[0] = carry == 0.0
+    keep[1:] = bucket[1:] != bucket[:-1]
+    last = np.flatnonzero(keep)
+    carry = arc[-1] - arc[last[-1]] if len(last) else arc[-1]
+    return keep, carry
+
+
+def lod_step(rows, scale, min_px=SIMPLIFY_PX, probe=64):
+    # cada cuántas muestras quedarse para que entre dos consecutivas haya
+    # ~min_px en pantalla: lejos (zoom chico) se salta la mayoría antes de
+    # proyectar, así el costo de reconstruir no crece con el largo de la estela
+    if len(rows) < 2:
+        return 1
+    tail = rows[-probe:].reshape(min(len(rows), probe), -1, 2)
+    spacing = np.median(np.hypot(*np.diff(tail, axis=0).T)) * scale
+    return max(1, int(min_px / spacing)) if spacing > 0 else 1
+
+
+def plot_pixels(surface, xy, colors, size=2):
+    # cuadrados de size x size en cada punto, escritos de una vez sobre
+    # pixels2d con los colores ya mapeados a enteros (un solo scatter por
+    # desplazamiento, sin tocar canales por separado); devuelve el rect tocado
+    w, h = surface.get_size()
+    xy = np.asarray(xy).astype(np.intp)
+    x, y = xy[..., 0], xy[..., 1]
+    inside = (x >= 0) & (x < w - size + 1) & (y >= 0) & (y < h - size + 1)
+    if not inside.any():
+        return None
+
+    rgb = np.asarray(colors, dtype=np.uint32).reshape(-1, 3)
+    rs, gs, bs, as_ = surface.get_shifts()[:4]
+    mapped = (rgb[:, 0] << rs) | (rgb[:, 1] << gs) | (rgb[:, 2] << bs) | np.uint32(255 << as_)
+    values = np.broadcast_to(mapped if len(mapped) > 1 else mapped[0], x.shape)[inside]
+    x, y = x[inside], y[inside]
+
+    pixels = pygame.surfarray.pixels2d(surface)
+    for dx in range(size):
+        for dy in range(size):
+            pixels[x + dx, y + dy] = values
+    del pixels
+
+    x0, y0 = int(x.min()), int(y.min())
+    return pygame.Rect(x0, y0, int(x.max()) - x0 + size, int(y.max()) - y0 + size)
+
+
+def _union(a, b):
+    if a is None:
+        return b
+    return a if b is None else a.union(b)
+
+
+# ================================
+# PERSISTENT TRAIL CANVAS
+# ================================
+# Guarda la estela ya rasterizada en una superficie propia. En cada frame
+# sólo se dibujan los puntos que el RingBuffer recibió desde el frame
+# anterior, así el coste es O(puntos nuevos) y no O(largo de la estela).
+#
+# Los puntos están en coordenadas de mundo: con un Viewport se proyectan al
+# dibujar, y cuando la vista cambia (zoom / pan) el canvas se rehace sólo con
+# los bloques del buffer que caen en pantalla, submuestreados y simplificados
+# según el zoom.
+#
+# Con calidad reducida (set_quality, ver quality.py) el canvas tiene
+# 1/downscale de la resolución de la pantalla (como las layers reducidas de
+# DirtyRenderer) y deja más px entre vértices; los rects que devuelve
+# update() siguen siendo de pantalla.
+class TrailCanvas:
+    def __init__(self, size, color, style="line", width=2, dot_spacing=6, fade_half_life=None):
+        self.size = tuple(size)
+        self.downscale = 1
+        self.spacing = 1.0            # multiplica SIMPLIFY_PX y dot_spacing
+        self.surface = pygame.Surface(self.size, pygame.SRCALPHA)
+        self.color = color
+        self.style = style            # "line" o "dots"
+        self.width = width
+        self.dot_spacing = dot_spacing   # px de recorrido entre puntos (estilo "dots")
+        self.fade_half_life = fade_half_life   # segundos, None = sin desvanecer
+
+        self._drawn = 0               # buffer.total ya rasterizado
+        self._rebuilt_at = 0
+        self._fade_time = 0.0
+        self._carry = 0.0
+        self._view_version = None
+
+    def invalidate(self):
+        self.surface.fill((0, 0, 0, 0))
+        self._drawn = 0
+        self._rebuilt_at = 0
+        self._fade_time = 0.0
+        self._carry = 0.0
+
+    def set_quality(self, downscale, spacing):
+        # el próximo update() rehace el canvas entero con los valores nuevos
+        if (downscale, spacing) == (self.downscale, self.spacing):
+            return
+        if downscale != self.downscale:
+            self.downscale = downscale
+            w, h = self.size
+            self.surface = pygame.Surface((-(-w // downscale), -(-h // downscale)), pygame.SRCALPHA)
+        self.spacing = spacing
+        self.invalidate()
+
+    def _px(self, value):
+        # medida en px de pantalla → px del canvas
+        return max(1, round(value / self.downscale))
+
+    def update(self, trail, dt=0.0, view=None):
+        # devuelve el rect de pantalla que cambió (o None)
+        dirty = self._update(trail, dt, view)
+        f = self.downscale
+        if dirty is None or f == 1:
+            return dirty
+        return pygame.Rect(dirty.x * f, dirty.y * f, dirty.w * f, dirty.h * f)
+
+    def _update(self, trail, dt, view):
+        dirty = None
+        if self.fade_half_life and self._fade(dt):
+            dirty = self.surface.get_rect()
+
+        if view is not None and view.version != self._view_version:
+            self._view_version = view.version
+            self._rebuild(trail, view)
+            return self.surface.get_rect()
+
+        new = trail.total - self._drawn
+        if new <= 0:
+            if new < 0:   # el buffer se vació por fuera (clear)
+                self.invalidate()
+                dirty = self.surface.get_rect()
+            return dirty
+
+        # sin fade, los puntos que el buffer ya descartó deben desaparecer:
+        # se reconstruye el canvas entero una vez por cada `capacity` puntos
+        stale = trail.total > trail.capacity and trail.total - self._rebuilt_at >= trail.capacity
+        if new >= len(trail) or (stale and not self.fade_half_life):
+            self._rebuild(trail, view)
+            dirty = self.surface.get_rect()
+        else:
+            rows = trail.view()[-(new + 1):]    # +1 para unir con el segmento anterior
+            dirty = _union(dirty, self._rasterize(self._project(rows, view), joined=True))
+
+        self._drawn = trail.total
+        return dirty
+
+    def _project(self, rows, view):
+        pts = rows if view is None else view.to_screen(rows)
+        return pts if self.downscale == 1 else pts / self.downscale
+
+    def _rebuild(self, trail, view):
+        self.surface.fill((0, 0, 0, 0))
+        self._carry = 0.0
+        data = trail.view()
+        ranges = trail.visible_ranges(view.world_rect()) if view is not None else [(0, len(data))]
+        # submuestreo por zoom, y además un tope fijo (menor con calidad
+        # reducida): con cientos de cuerpos el costo de rehacer la vista
+        # queda acotado a cualquier escala
+        visible = sum(b - a for a, b in ranges) * (data.shape[1] // 2)
+        scale = (view.scale if view is not None else 1.0) / self.downscale
+        step = max(lod_step(data, scale, SIMPLIFY_PX * self.spacing),
+                   -(-visible // int(REBUILD_MAX_POINTS / self.spacing)))
+        pieces = [self._project(data[max(a - 1, 0):b:step], view) for a, b in ranges]
+        count = sum(len(p) for p in pieces)
+        for pts in pieces:
+            self._carry = 0.0
+            self._rasterize(pts, joined=False, bulk=count > PIXEL_PLOT_POINTS)
+        self._rebuilt_at = trail.total
+        self._drawn = trail.total
+
+    def _rasterize(self, pts, joined, bulk=False):
+        # pts en pantalla; joined = el primer punto ya estaba dibujado
+        width = self._px(self.width)
+        if self.style == "dots":
+            spacing = self.dot_spacing * self.spacing / self.downscale
+            keep, self._carry = simplify(pts, spacing, self._carry if joined else 0.0)
+            pts = pts[keep].astype(np.int32)
+            if bulk:
+                return plot_pixels(self.surface, pts - width // 2, self.color, width + 1)
+            if not len(pts):
+                return None
+            # la órbita newtoniana se repite: sin duplicados por píxel, las
+            # vueltas ya dibujadas no cuestan nada (cada (x, y) int32 se ve
+            # como un solo int64, mucho más barato de ordenar que por filas)
+            pts = np.unique(pts.view(np.int64)).view(np.int32).reshape(-1, 2)
+            for p in pts.tolist():
+                pygame.draw.circle(self.surface, self.color, p, width)
+            lo, hi = pts.min(axis=0) - width, pts.max(axis=0) + width + 1
+            return pygame.Rect(int(lo[0]), int(lo[1]), int(hi[0] - lo[0]), int(hi[1] - lo[1]))
+
+        keep, _ = simplify(pts, SIMPLIFY_PX * self.spacing)
+        keep[-1] = True
+        pts = pts[keep]
+        if bulk:
+            return plot_pixels(self.surface, pts, self.color, width)
+        if len(pts) > 1:
+            return pygame.draw.lines(self.surface, self.color, False, pts, width)
+        return None
+
+    def _fade(self, dt):
+        # una sola mezcla por frame; se acumula dt hasta que el factor
+        # sea representable en 8 bits
+        self._fade_time += dt
+        keep = 0.5 ** (self._fade_time / self.fade_half_life)
+        if keep * 255 <= 254:
+            self.surface.fill((255, 255, 255, int(keep * 255)),
+                              special_flags=pygame.BLEND_RGBA_MULT)
+            self._fade_time = 0.0
+            return True
+        return False
+
+
+# ================================
+# MULTI-BODY TRAIL CANVAS
+# ================================
+# Una sola superficie para las estelas de n cuerpos. El RingBuffer guarda una
+# fila por muestra con (x0, y0, x1, y1, ...), así un append por frame alcanza
+# para todos. Con pocos cuerpos se dibuja una polilínea por cuerpo; con
+# muchos ("pixels") todas las muestras nuevas se escriben de una vez con
+# surfarray, sin bucles por cuerpo.
+class MultiTrailCanvas(TrailCanvas):
+    def __init__(self, size, colors, style="line", width=1, fade_half_life=None):
+        super().__init__(size, None, style, width, fade_half_life=fade_half_life)
+        self.colors = np.asarray(colors, dtype=np.uint8).reshape(-1, 3)
+
+    def _project(self, rows, view):
+        return super()._project(rows.reshape(len(rows), len(self.colors), 2), view)
+
+    def _rasterize(self, pts, joined, bulk=False):
+        width = self._px(self.width)
+        if self.style == "pixels" or bulk:
+            return plot_pixels(self.surface, pts, self.colors, 1 if self.style == "pixels" else width + 1)
+
+        rect = None
+        if len(pts) > 1:
+            for i, color in enumerate(self.colors.tolist()):
+                body = pts[:, i]
+                keep, _ = simplify(body, SIMPLIFY_PX * self.spacing)
+                keep[-1] = True
+                body = body[keep]
+                if len(body) > 1:
+                    rect = _union(rect, pygame.draw.lines(self.surface, color, False, body, width))
+        return rect
@@ -1,43 +1,293 @@
+from abc import ABC, abstractmethod
+
 import pygame
-pygame.font.init()
+from text_cache import render_text
+from assets import ASSETS
+from replay import INPUT
 
 
-FONT = pygame.font.SysFont("arial", 28)
+INDEX_CELL = 64     # lado de las celdas del índice de hit-test (px)
 
 
-class Button:
-    def __init__(self, x, y, w, h, text):
-        self.rect = pygame.Rect(x, y, w, h)
-        self.text = text
+# ================================
+# RETAINED-MODE WIDGETS
+# ================================
+# Cada widget se dibuja una vez en su propia superficie y la vuelve a
+# dibujar sólo cuando cambia state() (valor, hover, etc.) o su posición.
+# draw() es un blit (pygame compone alpha sobre alpha sin premultiplicar,
+# así el resultado es el mismo que dibujar las primitivas directo).
+#
+# Los eventos de mouse no se reparten a todos: WidgetGroup busca el widget
+# bajo el cursor en un índice por celdas y sólo ése recibe press/drag/release.
+class Widget(ABC):
+    draggable = False
+
+    def __init__(self, rect):
+        self.rect = pygame.Rect(rect)
+        self.hovered = False
+        self.group = None
+        self._surface = None
+        self._key = None
+
+    # ---- estado / render ----
+    def state(self):
+        # todo lo que cambia el aspecto del widget
+        return self.hovered
+
+    def bounds(self):
+        # zona que ocupa en pantalla (puede exceder rect: etiquetas, perillas)
+        return self.rect
+
+    def hit_rect(self):
+        return self.bounds()
+
+    @abstractmethod
+    def render(self, surface, origin):
+        # dibuja el widget con `origin` como esquina de bounds()
+        ...
+
+    @property
+    def surface(self):
+        key = (self.state(), self.rect.size)
+        if key != self._key:
+            self._key = key
+            area = self.bounds()
+            self._surface = pygame.Surface(area.size, pygame.SRCALPHA)
+            self.render(self._surface, (self.rect.x - area.x, self.rect.y - area.y))
+        return self._surface
 
     def draw(self, screen):
-        color = (180, 180, 255) if self.is_hovered() else (120, 120, 200)
-        pygame.draw.rect(screen, color, self.rect, border_radius=12)
+        screen.blit(self.surface, self.bounds().topleft)
+
+    def place(self, x, y):
+        self.rect.topleft = (x, y)
+        if self.group is not None:
+            self.group.relayout()
+
+    # ---- eventos (los llama WidgetGroup) ----
+    def press(self, pos):
+        return None
+
+    def drag(self, pos):
+        pass
+
+    def release(self, pos):
+        pass
+
+
+class Slider(Widget):
+    draggable = True
+
+    def __init__(self, x, y, w, min_val, max_val, start_val, step=0.1, label="", ticks=None,
+                 label_color=(230, 230, 250), tick_color=(150, 150, 200)):
+        super().__init__((x, y, w, 12))
+        self.min = min_val
+        self.max = max_val
+        self.value = start_val
+        self.label = label
+        self.step = step
+        self.ticks = ticks or []
+        self.label_color = label_color
+        self.tick_color = tick_color
+        self.font = ASSETS.font("arial", 18)
+        self.grabbed = False
+
+    def state(self):
+        return self.value
+
+    def bounds(self):
+        # etiqueta arriba, perilla de radio 10 a los costados
+        return pygame.Rect(self.rect.x - 10, self.rect.y - 26, self.rect.w + 20, 44)
+
+    def hit_rect(self):
+        # zona grande para agarrarlo
+        return pygame.Rect(self.rect.x, self.rect.y - 12, self.rect.w, 36)
+
+    def render(self, surface, origin):
+        x, y = origin
+        w = self.rect.w
+        surface.blit(render_text(self.font, f"{self.label}: {self.value:.2f}", self.label_color), (x, y - 25))
+        pygame.draw.rect(surface, (220, 220, 240), (x, y, w, 12))
+        for tval in self.ticks:
+            px = x + (tval - self.min) / (self.max - self.min) * w
+            pygame.draw.line(surface, self.tick_color, (px, y - 6), (px, y + 6), 2)
+        t = (self.value - self.min) / (self.max - self.min)
+        pygame.draw.circle(surface, (100, 150, 255), (x + int(t * w), y + 6), 10)
+
+    def press(self, pos):
+        self.grabbed = True
+        return None
+
+    def drag(self, pos):
+        mx = max(self.rect.left, min(pos[0], self.rect.right))
+        t = (mx - self.rect.left) / self.rect.width
+        raw = self.min + t * (self.max - self.min)
+        self.value = round(raw / self.step) * self.step
+
+    def release(self, pos):
+        self.grabbed = False
+
+
+class CheckboxUI(Widget):
+    def __init__(self, x, y, label, checked=True):
+        super().__init__((x, y, 18, 18))
+        self.label = label
+        self.checked = checked
+        self.font = ASSETS.font("arial", 16)
+        self._text_w, self._text_h = self.font.size(label)
+
+    def state(self):
+        return self.checked
+
+    def bounds(self):
+        return pygame.Rect(self.rect.x, self.rect.y - 2, 24 + self._text_w, max(20, self._text_h))
 
-        label = FONT.render(self.text, True, (10, 10, 20))
-        screen.blit(label, (self.rect.x + self.rect.width//2 - label.get_width()//2,
-                            self.rect.y + self.rect.height//2 - label.get_height()//2))
+    def hit_rect(self):
+        return self.rect
+
+    def render(self, surface, origin):
+        box = pygame.Rect(origin, self.rect.size)
+        pygame.draw.rect(surface, (80, 85, 100), box, border_radius=3)
+        if self.checked:
+            pygame.draw.rect(surface, (220, 220, 220), box.inflate(-4, -4), border_radius=3)
+        surface.blit(render_text(self.font, self.label, (255, 255, 255)), (box.right + 6, box.y - 2))
+
+    def press(self, pos):
+        self.checked = not self.checked
+        return self.checked
+
+
+class ButtonUI(Widget):
+    def __init__(self, x, y, w, h, label, on_click=None):
+        super().__init__((x, y, w, h))
+        self.label = label
+        self.on_click = on_click
+        self.font = ASSETS.font("arial", 16)
+
+    def state(self):
+        return self.label
+
+    def render(self, surface, origin):
+        box = pygame.Rect(origin, self.rect.size)
+        pygame.draw.rect(surface, (70, 75, 90), box, border_radius=8)
+        t = render_text(self.font, self.label, (255, 255, 255))
+        surface.blit(t, (box.centerx - t.get_width() // 2, box.centery - t.get_height() // 2))
+
+    def press(self, pos):
+        if self.on_click is not None:
+            self.on_click()
+        return True
+
+
+class Button(ButtonUI):
+    # botón grande con hover (menú)
+    def __init__(self, x, y, w, h, text, on_click=None):
+        super().__init__(x, y, w, h, text, on_click)
+        self.text = text
+
+    def state(self):
+        return self.hovered, self.text
+
+    def render(self, surface, origin):
+        box = pygame.Rect(origin, self.rect.size)
+        color = (180, 180, 255) if self.hovered else (120, 120, 200)
+        pygame.draw.rect(surface, color, box, border_radius=12)
+        label = render_text(ASSETS.font("arial", 28), self.text, (10, 10, 20))
+        surface.blit(label, (box.x + box.width//2 - label.get_width()//2,
+                             box.y + box.height//2 - label.get_height()//2))
 
     def is_hovered(self):
-        mx, my = pygame.mouse.get_pos()
-        return self.rect.collidepoint(mx, my)
+        return self.rect.collidepoint(INPUT.mouse_pos())
+
 
-class BackButtonUI:
+class BackButtonUI(Widget):
     def __init__(self, x=12, y=12):
-        self.rect = pygame.Rect(x, y, 42, 42)
+        super().__init__((x, y, 42, 42))
 
-    def draw(self, screen):
+    def state(self):
+        return None
+
+    def render(self, surface, origin):
         # círculo
-        pygame.draw.circle(screen, (30, 30, 30, 180), self.rect.center, 21)
-        pygame.draw.circle(screen, (80, 80, 90), self.rect.center, 21, 2)
+        center = (origin[0] + 21, origin[1] + 21)
+        pygame.draw.circle(surface, (30, 30, 30), center, 21)
+        pygame.draw.circle(surface, (80, 80, 90), center, 21, 2)
 
         # flecha "<"
-        cx, cy = self.rect.center
-        pygame.draw.line(screen, (240, 240, 255), (cx + 6, cy - 10), (cx - 6, cy), 3)
-        pygame.draw.line(screen, (240, 240, 255), (cx - 6, cy), (cx + 6, cy + 10), 3)
-
-    def handle(self, event):
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            if self.rect.collidepoint(event.pos):
-                return True
-        return False
+        cx, cy = center
+        pygame.draw.line(surface, (240, 240, 255), (cx + 6, cy - 10), (cx - 6, cy), 3)
+        pygame.draw.line(surface, (240, 240, 255), (cx - 6, cy), (cx + 6, cy + 10), 3)
+
+    def press(self, pos):
+        return True
+
+
+# ================================
+# WIDGET GROUP (HIT-TEST INDEX)
+# ================================
+# Índice de celdas de INDEX_CELL px → widgets cuya zona de click las toca.
+# Un click consulta una sola celda; mientras un widget arrastrable está
+# agarrado recibe el movimiento y el soltar aunque el cursor salga de él.
+class WidgetGroup:
+    def __init__(self, widgets=()):
+        self.widgets = []
+        self._index = {}
+        self._captured = None
+        self._hovered = None
+        for w in widgets:
+            self.add(w)
+
+    def add(self, widget):
+        widget.group = self
+        self.widgets.append(widget)
+        self.relayout()
+        return widget
+
+    def relayout(self):
+        self._index = {}
+        for w in self.widgets:
+            r = w.hit_rect()
+            for cx in range(r.left // INDEX_CELL, (r.right - 1) // INDEX_CELL + 1):
+                for cy in range(r.top // INDEX_CELL, (r.bottom - 1) // INDEX_CELL + 1):
+                    self._index.setdefault((cx, cy), []).append(w)
+
+    def hit(self, pos):
+        cell = self._index.get((pos[0] // INDEX_CELL, pos[1] // INDEX_CELL), ())
+        for w in reversed(cell):     # el último agregado queda arriba
+            if w.hit_rect().collidepoint(pos):
+                return w
+        return None
+
+    def handle_event(self, ev):
+        # devuelve (widget, resultado de press) si el evento era de la UI,
+        # o None si hay que pasarlo a la escena
+        if ev.type == pygame.MOUSEBUTTONDOWN and ev.button == 1:
+            w = self.hit(ev.pos)
+            if w is None:
+                return None
+            if w.draggable:
+                self._captured = w
+            return w, w.press(ev.pos)
+        if ev.type == pygame.MOUSEMOTION:
+            if self._captured is not None:
+                self._captured.drag(ev.pos)
+                return self._captured, None
+            self._hover(self.hit(ev.pos))
+            return None
+        if ev.type == pygame.MOUSEBUTTONUP and ev.button == 1 and self._captured is not None:
+            w, self._captured = self._captured, None
+            w.release(ev.pos)
+            return w, None
+        return None
+
+    def _hover(self, w):
+        if w is not self._hovered:
+            if self._hovered is not None:
+                self._hovered.hovered = False
+            if w is not None:
+                w.hovered = True
+            self._hovered = w
+
+    def draw(self, screen):
+        for w in self.widgets:
+            w.draw(screen)
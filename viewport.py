@@ -0,0 +1,122 @@
+# viewport.py
+import numpy as np
+import pygame
+from replay import INPUT
+
+# ================================
+# WORLD ↔ SCREEN VIEWPORT
+# ================================
+# Las escenas guardan todo en coordenadas de mundo (unidades de órbita o km)
+# y el viewport las lleva a píxeles: `center` es el punto del mundo que se ve
+# en `origin` (px) y `scale` los px por unidad ya multiplicados por el zoom.
+# Rueda = zoom hacia el cursor, botón derecho o central arrastrado = mover,
+# + / - = zoom, 0 = volver a la vista inicial. `version` cambia con cada
+# movimiento para que las capas cacheadas sepan cuándo rehacerse.
+ZOOM_STEP = 1.25
+PAN_BUTTONS = (2, 3)
+
+
+class Viewport:
+    def __init__(self, origin, base_scale, zoom_range=(0.1, 50.0), size=None):
+        self.origin = np.array(origin, dtype=float)
+        self.base_scale = float(base_scale)
+        self.zoom_range = zoom_range
+        self.size = size or (int(2 * origin[0]), int(2 * origin[1]))
+        self.zoom = 1.0
+        self.center = np.zeros(2)
+        self.version = 0
+        self._drag = None
+
+    @property
+    def scale(self):
+        return self.base_scale * self.zoom
+
+    def set_base_scale(self, base_scale):
+        if base_scale != self.base_scale:
+            self.base_scale = float(base_scale)
+            self.version += 1
+
+    # ---- transformaciones ----
+    def to_screen(self, pts):
+        # acepta arrays (..., 2); una sola copia (las estelas tienen millones de puntos)
+        out = np.multiply(pts, self.scale, dtype=float)
+        out += self.origin - self.center * self.scale
+        return out
+
+    def point(self, p):
+        x, y = self.to_screen(p)
+        return int(x), int(y)
+
+    def to_world(self, px):
+        return self.center + (np.asarray(px, dtype=float) - self.origin) / self.scale
+
+    def world_rect(self, margin_px=4):
+        # (x0, y0, x1, y1) del mundo visible en pantalla
+        lo = self.to_world((-margin_px, -margin_px))
+        hi = self.to_world((self.size[0] + margin_px, self.size[1] + margin_px))
+        return lo[0], lo[1], hi[0], hi[1]
+
+    # ---- movimiento ----
+    def zoom_at(self, px, factor):
+        zoom = min(max(self.zoom * factor, self.zoom_range[0]), self.zoom_range[1])
+        if zoom == self.zoom:
+            return
+        anchor = self.to_world(px)
+        self.zoom = zoom
+        self.center = anchor - (np.asarray(px, dtype=float) - self.origin) / self.scale
+        self.version += 1
+
+    def pan(self, dx, dy):
+        if dx or dy:
+            self.center = self.center - np.array((dx, dy)) / self.scale
+            self.version += 1
+
+    def reset(self):
+        if self.zoom != 1.0 or self.center.any():
+            self.zoom = 1.0
+            self.center = np.zeros(2)
+            self.version += 1
+
+    def set_view(self, zoom, center):
+        # vista exacta (checkpoints)
+        self.zoom = min(max(float(zoom), self.zoom_range[0]), self.zoom_range[1])
+        self.center = np.array(center, dtype=float)
+        self.version += 1
+
+    def handle_event(self, ev):
+        # True si el evento era del viewport
+        if ev.type == pygame.MOUSEWHEEL:
+            self.zoom_at(INPUT.mouse_pos(), ZOOM_STEP ** ev.y)
+            return True
+        if ev.type == pygame.MOUSEBUTTONDOWN and ev.button in PAN_BUTTONS:
+            self._drag = ev.pos
+            return True
+        if ev.type == pygame.MOUSEBUTTONUP and ev.button in PAN_BUTTONS:
+            self._drag = None
+            return True
+        if ev.type == pygame.MOUSEMOTION and self._drag is not None:
+            self.pan(ev.pos[0] - self._drag[0], ev.pos[1] - self._drag[1])
+            self._drag = ev.pos
+            return True
+        if ev.type == pygame.KEYDOWN:
+            if ev.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+                self.zoom_at(self.origin, ZOOM_STEP)
+                return True
+            if ev.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                self.zoom_at(self.origin, 1 / ZOOM_STEP)
+                return True
+            if ev.key in (pygame.K_0, pygame.K_KP0, pygame.K_HOME):
+                self.reset()
+                return True
+        return False
+
+
+STAR_PARALLAX = 0.08   # las estrellas se mueven con el pan a esta fracción
+
+
+def parallax_stars(stars, view, size, depth=STAR_PARALLAX):
+    # estrellas de fondo corridas con el pan (sin escalar con el zoom) y
+    # envueltas en la pantalla, así el campo nunca se vacía
+    w, h = size
+    dx, dy = -view.center * view.base_scale * depth
+    return [(int(x + dx) % w, int(y + dy) % h, s) for x, y, s in stars]